@@ -4,41 +4,79 @@ Aplicación de escritorio que proporciona asistencia de IA en tiempo real durant
 """
 import sys
 import asyncio
-import threading
 import logging
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction
-from PyQt5.QtCore import QTimer, pyqtSignal, QObject
+from PyQt5.QtCore import pyqtSignal, QObject
 from PyQt5.QtGui import QIcon
 import keyboard
 from config import Config
 from overlay import OverlayWindow
-from asr_service import ASRService
-from ocr_service import OCRService
-from claude_service import ClaudeService
-from playbook_manager import PlaybookManager
+from engine import PipelineEngine
+from clock import SYSTEM_CLOCK
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class CluelyApp(QObject):
-    def __init__(self):
+    # Señales emitidas desde el loop de Claude; Qt las entrega en el hilo de la GUI.
+    # El primer argumento es la generación de la sugerencia (solo se muestra la última)
+    suggestion_started = pyqtSignal(int)
+    suggestion_delta = pyqtSignal(int, str)
+    suggestion_finished = pyqtSignal(int, str, str)
+    # Sin qasync: llamadas desde otros hilos (hotkeys) encoladas al hilo de la GUI
+    invoke_requested = pyqtSignal(object)
+
+    def __init__(self, clock=SYSTEM_CLOCK, seed=None):
         super().__init__()
         self.config = Config()
+        self.clock = clock
         self.overlay = None
-        self.asr_service = ASRService()
-        self.ocr_service = OCRService()
-        self.claude_service = ClaudeService()
-        self.playbook_manager = PlaybookManager()
+        self.loop = None  # Event loop asyncio integrado con Qt (qasync), si está disponible
+        self.invoke_requested.connect(self._invoke)
+        # Pipeline sin interfaz; la app solo añade overlay, hotkeys y bandeja del sistema
+        self.engine = PipelineEngine(
+            self.config,
+            on_started=self.suggestion_started.emit,
+            on_delta=self.suggestion_delta.emit,
+            on_finished=self.suggestion_finished.emit,
+            clock=clock,
+            seed=seed
+        )
+        self.asr_service = self.engine.asr_service
+        self.ocr_service = self.engine.ocr_service
+        self.claude_service = self.engine.claude_service
+        self.playbook_manager = self.engine.playbook_manager
+        self.displayed_generation = 0
 
         # Estado de la aplicación
         self.is_recording = False
-        self.current_context = ""
-        self.session_notes = []
 
-        # Timer para actualizaciones periódicas
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_context)
-        self.update_timer.start(2000)  # Actualizar cada 2 segundos
+    @property
+    def current_context(self):
+        return self.engine.current_context
+
+    @property
+    def session_notes(self):
+        return self.engine.session_notes
+
+    def attach_loop(self, loop):
+        """Unificar el loop de Qt y asyncio: las corrutinas de servicios corren en la GUI sin bloquearla"""
+        self.loop = loop
+        self.claude_service.attach_loop(loop)
+        self.ocr_service.attach_loop(loop)
+
+    def call_in_loop(self, callback):
+        """Ejecutar callback en el hilo de la GUI desde cualquier hilo"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(callback)
+        else:
+            self.invoke_requested.emit(callback)
+
+    def _invoke(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error ejecutando acción: {e}")
 
     def initialize(self):
         """Inicializar todos los componentes"""
@@ -46,6 +84,9 @@ class CluelyApp(QObject):
             # Crear overlay invisible
             self.overlay = OverlayWindow()
             self.overlay.suggestion_requested.connect(self.handle_suggestion_request)
+            self.suggestion_started.connect(self.on_suggestion_started)
+            self.suggestion_delta.connect(self.on_suggestion_delta)
+            self.suggestion_finished.connect(self.on_suggestion_finished)
 
             # Configurar hotkeys
             self.setup_hotkeys()
@@ -63,14 +104,19 @@ class CluelyApp(QObject):
     def setup_hotkeys(self):
         """Configurar atajos de teclado globales"""
         try:
+            # Los callbacks de keyboard llegan en su propio hilo: se pasan al loop de la GUI
+
             # Ctrl+Shift+C: Activar/desactivar grabación
-            keyboard.add_hotkey('ctrl+shift+c', self.toggle_recording)
+            keyboard.add_hotkey('ctrl+shift+c', self.call_in_loop, args=(self.toggle_recording,))
 
             # Ctrl+Shift+S: Solicitar sugerencia inmediata
-            keyboard.add_hotkey('ctrl+shift+s', self.request_suggestion)
+            keyboard.add_hotkey('ctrl+shift+s', self.call_in_loop, args=(self.request_suggestion,))
 
             # Ctrl+Shift+H: Mostrar/ocultar overlay
-            keyboard.add_hotkey('ctrl+shift+h', self.toggle_overlay)
+            keyboard.add_hotkey('ctrl+shift+h', self.call_in_loop, args=(self.toggle_overlay,))
+
+            # Ctrl+Shift+T: Volcar latencias por etapa (requiere tracing.enabled)
+            keyboard.add_hotkey('ctrl+shift+t', self.call_in_loop, args=(self.dump_trace,))
 
             logger.info("Hotkeys configurados")
 
@@ -113,7 +159,7 @@ class CluelyApp(QObject):
     def start_recording(self):
         """Iniciar grabación y procesamiento"""
         try:
-            self.asr_service.start_recording()
+            self.engine.start()
             self.is_recording = True
             self.overlay.set_status("Grabando...")
             logger.info("Grabación iniciada")
@@ -124,75 +170,51 @@ class CluelyApp(QObject):
     def stop_recording(self):
         """Detener grabación"""
         try:
-            self.asr_service.stop_recording()
+            self.engine.stop()
             self.is_recording = False
             self.overlay.set_status("Inactivo")
-            logger.info("Grabación detenida")
+            stats = self.engine.novelty.get_stats()
+            logger.info(
+                f"Grabación detenida - sugerencias automáticas: {stats['fired']} "
+                f"({stats['fire_rate_per_minute']:.1f}/min), suprimidas: "
+                f"{stats['suppressed_threshold']} por umbral, {stats['suppressed_refractory']} por periodo refractario"
+            )
+            notes = self.engine.session_notes.get_stats()
+            logger.info(
+                f"Notas de sesión: {notes['notes']} en {notes['memory_bytes'] / 1024:.1f} KB "
+                f"({notes['dedup_ratio']:.1f}x menos que sin deduplicar, "
+                f"{notes['bytes_per_hour'] / 1024:.1f} KB/hora)"
+            )
 
         except Exception as e:
             logger.error(f"Error deteniendo grabación: {e}")
 
-    def update_context(self):
-        """Actualizar contexto de pantalla periódicamente"""
-        if not self.is_recording:
-            return
-
-        try:
-            # Capturar texto de pantalla
-            screen_text = self.ocr_service.capture_screen_text()
-
-            # Obtener transcripción de audio reciente
-            audio_text = self.asr_service.get_recent_transcript()
-
-            # Combinar contextos
-            self.current_context = f"Pantalla: {screen_text}\nAudio: {audio_text}"
-
-            # Generar sugerencia automática si hay cambios significativos
-            if self.should_generate_suggestion():
-                self.generate_suggestion()
-
-        except Exception as e:
-            logger.error(f"Error actualizando contexto: {e}")
-
-    def should_generate_suggestion(self):
-        """Determinar si se debe generar una nueva sugerencia"""
-        # Lógica simple: si hay nueva transcripción o cambios en pantalla
-        return len(self.current_context.strip()) > 50
-
     def request_suggestion(self):
         """Solicitar sugerencia inmediata"""
-        self.generate_suggestion()
-
-    def generate_suggestion(self):
-        """Generar sugerencia basada en el contexto actual"""
-        try:
-            if not self.current_context:
-                return
+        self.engine.request_suggestion()
 
-            # Obtener playbook activo
-            active_playbook = self.playbook_manager.get_active_playbook()
-
-            # Generar sugerencia con Claude
-            suggestion = self.claude_service.generate_suggestion(
-                context=self.current_context,
-                playbook=active_playbook
-            )
+    def on_suggestion_started(self, generation):
+        """Empezar a mostrar una sugerencia si es más nueva que la actual"""
+        if generation < self.displayed_generation:
+            return
+        self.displayed_generation = generation
+        self.overlay.begin_suggestion()
 
-            if suggestion:
-                self.overlay.show_suggestion(suggestion)
-                self.session_notes.append({
-                    'timestamp': self.get_timestamp(),
-                    'context': self.current_context,
-                    'suggestion': suggestion
-                })
+    def on_suggestion_delta(self, generation, delta):
+        """Añadir un fragmento solo si pertenece a la sugerencia mostrada"""
+        if generation == self.displayed_generation:
+            self.overlay.append_suggestion_delta(delta)
 
-        except Exception as e:
-            logger.error(f"Error generando sugerencia: {e}")
+    def on_suggestion_finished(self, generation, suggestion, context):
+        """Cerrar el streaming en el overlay y registrar la sugerencia"""
+        if generation != self.displayed_generation:
+            return
+        self.overlay.end_suggestion()
 
     def handle_suggestion_request(self, request_type):
         """Manejar solicitudes del overlay"""
         if request_type == "new_suggestion":
-            self.generate_suggestion()
+            self.request_suggestion()
         elif request_type == "save_note":
             self.save_current_note()
 
@@ -204,6 +226,15 @@ class CluelyApp(QObject):
             else:
                 self.overlay.show()
 
+    def dump_trace(self):
+        """Volcar los histogramas de latencia por etapa a JSON y al log"""
+        try:
+            snapshot = self.engine.dump_trace()
+            if not snapshot['stages']:
+                logger.info("Tracing desactivado o sin muestras (activa tracing.enabled)")
+        except Exception as e:
+            logger.error(f"Error volcando trazas: {e}")
+
     def show_settings(self):
         """Mostrar ventana de configuración"""
         # TODO: Implementar ventana de configuración
@@ -212,28 +243,57 @@ class CluelyApp(QObject):
     def save_current_note(self):
         """Guardar nota actual"""
         try:
-            # TODO: Implementar guardado de notas
-            logger.info("Nota guardada")
+            # La sugerencia visible en el overlay; si no hay, el contexto actual
+            text = self.overlay.suggestion_area.toPlainText().strip() if self.overlay else ""
+            if self.engine.save_note(text or self.current_context):
+                logger.info("Nota guardada")
         except Exception as e:
             logger.error(f"Error guardando nota: {e}")
 
     def get_timestamp(self):
         """Obtener timestamp actual"""
         from datetime import datetime
-        return datetime.now().isoformat()
+        return datetime.fromtimestamp(self.clock.time()).isoformat()
 
     def quit_app(self):
         """Cerrar aplicación"""
         self.stop_recording()
-        QApplication.quit()
+        if self.loop is None:
+            self.engine.close()
+            QApplication.quit()
+            return
+        self.loop.create_task(self._close_async())
+
+    async def _close_async(self):
+        """Vaciar el almacenamiento y liberar servicios en un executor sin congelar la GUI"""
+        try:
+            await self.loop.run_in_executor(None, self.engine.close)
+        except Exception as e:
+            logger.error(f"Error cerrando servicios: {e}")
+        finally:
+            QApplication.quit()
+
+def create_event_loop(app):
+    """Event loop asyncio sobre el loop de Qt (qasync); None si no está instalado"""
+    try:
+        import qasync
+    except ImportError:
+        logger.warning("qasync no disponible - Claude usará un loop en segundo plano")
+        return None
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    return loop
 
 def main():
     """Función principal"""
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)  # No cerrar al cerrar ventanas
+    loop = create_event_loop(app)
 
     # Crear e inicializar aplicación
     cluely_app = CluelyApp()
+    if loop is not None:
+        cluely_app.attach_loop(loop)
 
     if not cluely_app.initialize():
         logger.error("Error inicializando aplicación")
@@ -244,9 +304,13 @@ def main():
     logger.info("  Ctrl+Shift+C: Activar/desactivar grabación")
     logger.info("  Ctrl+Shift+S: Solicitar sugerencia")
     logger.info("  Ctrl+Shift+H: Mostrar/ocultar overlay")
+    logger.info("  Ctrl+Shift+T: Volcar latencias por etapa")
 
     # Ejecutar aplicación
-    sys.exit(app.exec_())
+    if loop is None:
+        sys.exit(app.exec_())
+    with loop:
+        loop.run_forever()
 
 if __name__ == "__main__":
     main()
@@ -5,20 +5,35 @@ Incluye mock para testing y interfaz para servicios reales
 import asyncio
 import threading
 import queue
-import time
 import random
 from typing import Optional, List
 import logging
+import tracing
+from transcript_store import TranscriptStore
+from audio_pipeline import StreamingASRPipeline, WavFrameSource
+from event_bus import TRANSCRIPT_SEGMENT
+from clock import SYSTEM_CLOCK
 
 logger = logging.getLogger(__name__)
 
 class ASRService:
-    def __init__(self, use_mock=True):
+    def __init__(self, use_mock=True, buffer_capacity=2048, language='es-ES',
+                 frame_source=None, recognizer=None, event_bus=None, clock=SYSTEM_CLOCK,
+                 seed: Optional[int] = None):
         self.use_mock = use_mock
+        self.clock = clock  # Reloj inyectable (VirtualClock para simular sesiones)
+        self.random = random.Random(seed)  # Fuente aleatoria de los mocks (sembrable)
+        self.event_bus = event_bus  # Si existe, cada segmento se publica al llegar
         self.is_recording = False
         self.transcript_queue = queue.Queue()
         self.current_transcript = ""
-        self.session_transcript = []
+        self.transcript_store = TranscriptStore(capacity=buffer_capacity)
+
+        # Pipeline real: fuente de frames y reconocedor inyectables
+        self.language = language
+        self.frame_source = frame_source
+        self.recognizer = recognizer
+        self.pipeline = None
 
         # Mock data para demo
         self.mock_phrases = [
@@ -57,24 +72,21 @@ class ASRService:
         def mock_worker():
             while self.is_recording:
                 # Simular delay natural
-                time.sleep(random.uniform(3, 8))
+                self.clock.sleep(self.random.uniform(3, 8))
 
                 if not self.is_recording:
                     break
 
                 # Generar frase mock
-                phrase = random.choice(self.mock_phrases)
-                timestamp = time.time()
+                phrase = self.random.choice(self.mock_phrases)
+                timestamp = self.clock.time()
 
                 # Añadir a transcript
-                transcript_entry = {
+                self._add_segment({
                     'timestamp': timestamp,
                     'text': phrase,
-                    'confidence': random.uniform(0.8, 0.95)
-                }
-
-                self.session_transcript.append(transcript_entry)
-                self.current_transcript = phrase
+                    'confidence': self.random.uniform(0.8, 0.95)
+                })
 
                 logger.info(f"ASR Mock: '{phrase}'")
 
@@ -84,34 +96,83 @@ class ASRService:
 
     def _start_real_recording(self):
         """Iniciar grabación real (requiere configuración)"""
-        # TODO: Implementar con Whisper local o API externa
-        logger.warning("ASR real no configurado - usando mock")
-        self._start_mock_recording()
+        try:
+            source = self.frame_source or self._create_microphone_source()
+            recognizer = self.recognizer or self._create_recognizer()
+        except ImportError as e:
+            logger.warning(f"ASR real no disponible ({e}) - usando mock")
+            self._start_mock_recording()
+            return
 
-    def get_recent_transcript(self, seconds=30) -> str:
-        """Obtener transcripción reciente"""
-        if not self.session_transcript:
-            return ""
+        # Una fuente inyectada es de quien la creó: el pipeline solo cierra el micrófono propio
+        self.pipeline = StreamingASRPipeline(source, recognizer, on_segment=self._add_segment,
+                                             close_source=self.frame_source is None, clock=self.clock)
 
-        current_time = time.time()
-        recent_entries = [
-            entry for entry in self.session_transcript
-            if current_time - entry['timestamp'] <= seconds
-        ]
+        def pipeline_worker():
+            stats = self.pipeline.run(should_stop=lambda: not self.is_recording)
+            logger.info(
+                f"ASR: {stats['utterances']} enunciados, "
+                f"{self.pipeline.gating_ratio():.0%} de frames descartados por VAD"
+            )
+
+        thread = threading.Thread(target=pipeline_worker, daemon=True)
+        thread.start()
 
-        if not recent_entries:
-            return ""
+    def _create_microphone_source(self):
+        """Crear fuente de micrófono"""
+        from audio_pipeline import MicrophoneFrameSource
+        return MicrophoneFrameSource()
+
+    def _create_recognizer(self):
+        """Crear reconocedor local Whisper"""
+        from audio_pipeline import WhisperRecognizer
+        return WhisperRecognizer(language=self.language.split('-')[0])
+
+    def transcribe_wav(self, path: str, recognizer=None) -> dict:
+        """Procesar un archivo WAV con el mismo pipeline de frames que el micrófono"""
+        pipeline = StreamingASRPipeline(
+            WavFrameSource(path),
+            recognizer or self.recognizer or self._create_recognizer(),
+            on_segment=self._add_segment,
+            close_source=True,
+            clock=self.clock
+        )
+        stats = pipeline.run()
+        stats['gating_ratio'] = pipeline.gating_ratio()
+        return stats
+
+    def add_transcript(self, text: str, timestamp: Optional[float] = None, confidence=1.0):
+        """Incorporar texto ya transcrito (ficheros, repeticiones de sesión)"""
+        self._add_segment({
+            'timestamp': self.clock.time() if timestamp is None else timestamp,
+            'text': text,
+            'confidence': confidence
+        })
+
+    def _add_segment(self, entry: dict):
+        """Registrar un segmento transcrito"""
+        with tracing.span('asr.segment'):
+            seq = self.transcript_store.append(entry)
+            self.current_transcript = entry['text']
+            if self.event_bus is not None:
+                self.event_bus.publish(TRANSCRIPT_SEGMENT, {'seq': seq, 'entry': entry})
+
+    def get_recent_transcript(self, seconds=30, now: Optional[float] = None) -> str:
+        """Obtener transcripción reciente"""
+        # Búsqueda binaria + texto cacheado: coste independiente de la duración de la sesión
+        return self.transcript_store.recent_text(seconds, self.clock.time() if now is None else now)
 
-        # Combinar texto reciente
-        texts = [entry['text'] for entry in recent_entries]
-        return " ".join(texts)
+    def get_transcript_window(self, start: float, end: float) -> List[dict]:
+        """Obtener segmentos entre dos timestamps"""
+        return self.transcript_store.window(start, end)
 
     def get_full_transcript(self) -> List[dict]:
         """Obtener transcripción completa de la sesión"""
-        return self.session_transcript.copy()
+        # Incluye las entradas movidas al spill por el ring buffer
+        return self.transcript_store.to_list()
 
     def clear_transcript(self):
         """Limpiar transcripción actual"""
-        self.session_transcript.clear()
+        self.transcript_store.clear()
         self.current_transcript = ""
         logger.info("ASR: Transcripción limpiada")
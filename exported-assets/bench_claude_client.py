@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del cliente Claude contra el servidor mock local
+Reporta throughput y latencia p50/p95/p99
+"""
+import argparse
+import asyncio
+import time
+
+from claude_client import AsyncClaudeClient
+from mock_claude_server import MockClaudeServer
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run(args):
+    server = MockClaudeServer(latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, seed=args.seed)
+    await server.start()
+    client = AsyncClaudeClient('mock-key', base_url=server.base_url,
+                               max_connections=args.concurrency, timeout=args.timeout,
+                               max_retries=args.retries, backoff_base=0.05)
+
+    latencies = []
+    failures = 0
+    next_index = 0
+
+    async def worker():
+        # Carga en bucle cerrado: cada worker lanza la siguiente petición al terminar la anterior
+        nonlocal failures, next_index
+        while next_index < args.requests:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                await client.create_message(
+                    [{'role': 'user', 'content': f"Contexto de prueba {index}"}],
+                    model='claude-mock'
+                )
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    connections_opened = client.pool.connections_opened
+    await client.close()
+    await server.stop()
+
+    latencies.sort()
+    print(f"Peticiones: {args.requests} (concurrencia {args.concurrency}), fallos: {failures}")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} req/s en {elapsed:.2f}s")
+    print(
+        f"Latencia: p50 {percentile(latencies, 0.50) * 1000:.1f} ms, "
+        f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms"
+    )
+    print(
+        f"Conexiones abiertas: {connections_opened}, "
+        f"reutilizadas: {client.stats['reused_connections']}, reintentos: {client.stats['retries']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
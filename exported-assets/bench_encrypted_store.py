@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark del almacenamiento cifrado: MB/s del fichero cifrado por trozos
+frente a un fichero en claro, coste por append y por lectura aleatoria, y
+coste por entrada de la base de datos de sesiones cifrada frente a la normal
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from encrypted_store import ChunkedCipherFile
+from session_db import SessionDatabase, TRANSCRIPT
+
+
+def bench_appends(directory: str, record_size: int, count: int, chunk_size: int):
+    payload = os.urandom(record_size)
+    key = os.urandom(32)
+
+    plain_path = os.path.join(directory, f"plain_{record_size}.bin")
+    started = time.perf_counter()
+    with open(plain_path, 'ab') as f:
+        for _ in range(count):
+            f.write(payload)
+            f.flush()  # Misma visibilidad que el fichero cifrado tras cada append
+    plain = time.perf_counter() - started
+
+    store = ChunkedCipherFile(os.path.join(directory, f"enc_{record_size}.enc"), key, chunk_size)
+    started = time.perf_counter()
+    for _ in range(count):
+        store.append(payload)
+    encrypted = time.perf_counter() - started
+
+    megabytes = record_size * count / 1e6
+    print(f"  append {record_size:>6} B x {count:<6} claro {megabytes / plain:8.1f} MB/s "
+          f"{plain / count * 1e6:7.2f} us   cifrado {megabytes / encrypted:8.1f} MB/s "
+          f"{encrypted / count * 1e6:7.2f} us  (+{(encrypted - plain) / count * 1e6:.2f} us/append, "
+          f"{store.stats['chunks_written'] / count:.2f} trozos/append)")
+    return store
+
+
+def bench_reads(store: ChunkedCipherFile, length: int, count: int, seed: int):
+    rng = random.Random(seed)
+    offsets = [rng.randrange(0, store.size - length) for _ in range(count)]
+    before = store.stats['chunks_read']
+    started = time.perf_counter()
+    for offset in offsets:
+        store.read(offset, length)
+    elapsed = time.perf_counter() - started
+    print(f"  lectura aleatoria {length} B: {elapsed / count * 1e6:.2f} us, "
+          f"{(store.stats['chunks_read'] - before) / count:.2f} trozos descifrados "
+          f"de {store.chunks}")
+
+
+def bench_database(directory: str, entries: int, seed: int):
+    rng = random.Random(seed)
+    words = ("presupuesto contrato cliente propuesta siguiente paso revisión equipo plazo "
+             "descuento licencias soporte migración integración roadmap").split()
+    texts = [" ".join(rng.choice(words) for _ in range(rng.randint(6, 16))) for _ in range(entries)]
+
+    results = {}
+    for label, key in (('claro', None), ('cifrado', os.urandom(32))):
+        db = SessionDatabase(os.path.join(directory, f"{label}.db"), max_pending=entries + 10,
+                             encryption_key=key)
+        db.begin_session(started=1_700_000_000.0)
+        for index, text in enumerate(texts):
+            db.record(TRANSCRIPT, text, 1_700_000_000.0 + index * 3)
+        started = time.perf_counter()
+        db.flush(timeout=None)
+        elapsed = time.perf_counter() - started
+
+        search_started = time.perf_counter()
+        for word in words:
+            db.search(word, limit=20)
+        search = (time.perf_counter() - search_started) / len(words)
+        db.close()
+        results[label] = elapsed
+        print(f"  {label:<8} {entries} entradas: {elapsed / entries * 1e6:6.2f} us/entrada, "
+              f"búsqueda (20 resultados) {search * 1000:.2f} ms")
+    print(f"  sobrecoste del cifrado: {(results['cifrado'] - results['claro']) / entries * 1e6:+.2f} us/entrada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--appends', type=int, default=20000)
+    parser.add_argument('--chunk-size', type=int, default=4096)
+    parser.add_argument('--entries', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='cluely_enc_')
+    try:
+        print(f"Fichero por trozos (trozo de {args.chunk_size} B):")
+        for record_size in (200, 4096, 65536):
+            count = max(100, args.appends * 200 // record_size) if record_size > 200 else args.appends
+            store = bench_appends(directory, record_size, count, args.chunk_size)
+            if record_size == 200:
+                bench_reads(store, 200, 5000, args.seed)
+            store.close()
+
+        print("Base de datos de sesiones (un append cifrado por lote):")
+        bench_database(directory, args.entries, args.seed)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
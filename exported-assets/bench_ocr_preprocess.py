@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark del preprocesado de OCR: milisegundos por frame a 1080p y 4K
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ocr_preprocess import FramePreprocessor
+
+RESOLUTIONS = {
+    '1080p': (1080, 1920),
+    '4K': (2160, 3840)
+}
+
+
+def synthetic_frame(height: int, width: int, seed: int = 0) -> np.ndarray:
+    """Frame RGBA con fondo claro, bandas de "texto" oscuro y ruido"""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 4), 235, dtype=np.uint8)
+    for y in range(40, height - 40, 48):
+        frame[y:y + 18, 60:width - 60, :3] = rng.integers(0, 90, size=(18, width - 120, 3), dtype=np.uint8)
+    frame[..., :3] += rng.integers(0, 8, size=(height, width, 3), dtype=np.uint8)
+    return frame
+
+
+def bench(name: str, iterations: int):
+    height, width = RESOLUTIONS[name]
+    frame = synthetic_frame(height, width)
+    preprocessor = FramePreprocessor()
+
+    preprocessor.process(frame)  # Calentamiento: reserva de buffers
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        preprocessor.process(frame)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    out_height, out_width = preprocessor.out_height, preprocessor.out_width
+    print(
+        f"{name:>6} ({width}x{height} → {out_width}x{out_height}): "
+        f"media {sum(timings) / len(timings):.2f} ms, "
+        f"p50 {timings[len(timings) // 2]:.2f} ms, "
+        f"mín {timings[0]:.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=30)
+    args = parser.parse_args()
+
+    for name in RESOLUTIONS:
+        bench(name, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
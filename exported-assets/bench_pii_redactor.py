@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la anonimización: milisegundos por tick sobre un contexto de
+decenas de KB (pantalla + ventana de audio deslizante) frente a volver a
+analizarlo entero, y coste de restaurar la sugerencia en streaming
+"""
+import argparse
+import random
+import time
+
+from pii_redactor import PIIRedactor
+
+WORDS = ("presupuesto contrato cliente propuesta siguiente paso revisión equipo plazo descuento "
+         "licencias soporte migración integración roadmap reunión el la de que en con por 2026 "
+         "15% 1.250.000 € Q3 12:30 v2.4").split()
+TERMS = {'Juan Pérez': 'PERSONA', 'María López': 'PERSONA', 'Acme': 'EMPRESA', 'Globex': 'EMPRESA'}
+
+
+def synthetic_line(rng: random.Random) -> str:
+    """Línea de texto de pantalla con algún dato personal de vez en cuando"""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(5, 14))]
+    roll = rng.random()
+    if roll < 0.04:
+        words.insert(1, f"{rng.choice(['ana', 'luis', 'ventas'])}{rng.randint(1, 99)}@empresa.com")
+    elif roll < 0.06:
+        words.insert(2, f"6{rng.randint(10, 99)} {rng.randint(100, 999)} {rng.randint(100, 999)}")
+    elif roll < 0.07:
+        words.insert(2, "ES91 2100 0418 4502 0005 1332")
+    elif roll < 0.08:
+        words.insert(2, "4111 1111 1111 1111")
+    elif roll < 0.10:
+        words.insert(0, rng.choice(list(TERMS)))
+    return " ".join(words)
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return (timings[len(timings) // 2], timings[int(len(timings) * 0.95)], timings[-1])
+
+
+def bench_ticks(kilobytes: int, ticks: int, screen_change: float, seed: int):
+    rng = random.Random(seed)
+    screen = []
+    while sum(len(line) + 1 for line in screen) < kilobytes * 1024:
+        screen.append(synthetic_line(rng))
+    audio = [rng.choice(WORDS) for _ in range(80)]
+
+    # Contextos tal y como los compone el agregador: la ventana de audio avanza en
+    # cada tick y de vez en cuando cambian algunas líneas de la pantalla
+    contexts = []
+    for _ in range(ticks):
+        audio = audio[3:] + [rng.choice(WORDS) for _ in range(3)]
+        if rng.random() < screen_change:
+            for _ in range(rng.randint(1, 5)):
+                screen[rng.randrange(len(screen))] = synthetic_line(rng)
+        screen_text = "\n".join(screen)
+        contexts.append(f"Pantalla: {screen_text}\nAudio: {' '.join(audio)}")
+
+    redactor = PIIRedactor(terms=TERMS)
+    started = time.perf_counter()
+    redactor.redact(contexts[0])
+    cold = (time.perf_counter() - started) * 1000
+
+    incremental, full = [], []
+    for context in contexts[1:]:
+        started = time.perf_counter()
+        redacted = redactor.redact(context)
+        incremental.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        expected = redactor.sub(context)
+        full.append((time.perf_counter() - started) * 1000)
+        assert redacted == expected, "la versión incremental difiere del análisis completo"
+
+    size = sum(map(len, contexts)) / len(contexts) / 1024
+    print(f"Contexto de {size:.1f} KB, {ticks} ticks (cambio de pantalla en el {screen_change:.0%}):")
+    print(f"  primer tick (todo nuevo): {cold:.2f} ms")
+    print("  incremental  p50 {:.3f} ms  p95 {:.3f} ms  max {:.3f} ms".format(*percentiles(incremental)))
+    print("  completo     p50 {:.3f} ms  p95 {:.3f} ms  max {:.3f} ms".format(*percentiles(full)))
+    stats = redactor.get_stats()
+    print(f"  líneas reutilizadas {stats['lines_reused']}, de la memoria {stats['lines_cached']}, "
+          f"analizadas {stats['lines_scanned']}; valores distintos {stats['values']}")
+    return redactor
+
+
+def bench_restore(redactor: PIIRedactor, iterations: int):
+    placeholders = list(redactor._values)[:4] or ['[EMAIL_1]']
+    suggestion = (f"Confirma con {placeholders[0]} el presupuesto y envía la propuesta a "
+                  f"{placeholders[-1]} antes del viernes; pregunta por el siguiente paso.")
+    deltas = [suggestion[index:index + 4] for index in range(0, len(suggestion), 4)]
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        restorer = redactor.restorer()
+        out = "".join(restorer.feed(delta) for delta in deltas) + restorer.flush()
+    elapsed = time.perf_counter() - started
+    assert out == redactor.restore(suggestion)
+    print(f"Restauración en streaming: {elapsed / (iterations * len(deltas)) * 1e6:.2f} us/fragmento "
+          f"({len(deltas)} fragmentos de 4 caracteres)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kb', type=int, nargs='+', default=[16, 32, 64])
+    parser.add_argument('--ticks', type=int, default=500)
+    parser.add_argument('--screen-change', type=float, default=0.2,
+                        help="Fracción de ticks en los que cambia la pantalla")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    redactor = None
+    for kilobytes in args.kb:
+        redactor = bench_ticks(kilobytes, args.ticks, args.screen_change, args.seed)
+    bench_restore(redactor, 2000)
+
+
+if __name__ == "__main__":
+    main()
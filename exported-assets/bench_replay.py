@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark de repetición de sesiones
+Repite una sesión grabada (o sintética) por el pipeline y reporta throughput,
+latencia p50/p95/p99 por etapa y memoria pico; --output guarda el JSON para
+comparar ejecuciones
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+from session_replay import SessionPlayer, generate_session, simulate_live_session
+
+
+def print_report(result: dict, baseline: dict = None):
+    print(f"Sesión: {result['session']} ({result['events']} eventos, "
+          f"{result['session_seconds'] / 60:.1f} min, semilla {result['seed']})")
+    print(f"Tiempo: {result['wall_seconds']:.2f}s ({result['speedup']:.0f}x tiempo real), "
+          f"sugerencias: {result['suggestions']}, memoria pico: {result['peak_memory_mb']:.1f} MB")
+    for name, stage in result['stages'].items():
+        line = (f"  {name:<10} n={stage['count']:<6} {stage['throughput_per_s']:>10.0f}/s  "
+                f"p50 {stage['p50_ms']:.3f} ms  p95 {stage['p95_ms']:.3f} ms  p99 {stage['p99_ms']:.3f} ms")
+        previous = (baseline or {}).get('stages', {}).get(name)
+        if previous and previous['p95_ms'] > 0:
+            line += f"  (p95 {(stage['p95_ms'] / previous['p95_ms'] - 1) * 100:+.1f}%)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('session', nargs='?', help="Fichero de sesión (JSON lines)")
+    parser.add_argument('--generate', type=float, metavar='MINUTOS',
+                        help="Generar una sesión sintética de N minutos si no se indica fichero")
+    parser.add_argument('--soak', type=float, metavar='MINUTOS',
+                        help="Simular N minutos del pipeline en vivo con reloj virtual (soak/memoria)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help="0 = lo más rápido posible, 1 = tiempo real")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="No medir memoria pico (tracemalloc infla las latencias)")
+    parser.add_argument('--output', help="Guardar resultados en JSON")
+    parser.add_argument('--compare', help="JSON de una ejecución anterior para comparar p95")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.soak:
+        result = simulate_live_session(args.soak, seed=args.seed, track_memory=not args.no_memory)
+        print(f"Simulados {result['simulated_seconds'] / 60:.0f} min en {result['wall_seconds']:.2f}s "
+              f"({result['speedup']:.0f}x), segmentos: {result['transcript_segments']}, "
+              f"sugerencias: {result['suggestions']}, memoria pico: {result['peak_memory_mb']:.1f} MB")
+        notes = result['session_notes']
+        print(f"Notas: {notes['notes']} en {notes['memory_bytes'] / 1024:.1f} KB "
+              f"(sin deduplicar {notes['raw_bytes'] / 1024:.1f} KB), {notes['bytes_per_hour'] / 1024:.1f} KB/hora")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+        return
+
+    session = args.session
+    if session is None:
+        session = os.path.join(tempfile.gettempdir(), f"cluely_session_{args.seed}.jsonl")
+        generate_session(session, minutes=args.generate or 10, seed=args.seed)
+
+    result = SessionPlayer(session, seed=args.seed, speed=args.speed,
+                           track_memory=not args.no_memory).run()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
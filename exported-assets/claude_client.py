@@ -0,0 +1,369 @@
+"""
+Claude Client - Cliente asyncio para la Messages API
+HTTP/1.1 con pool de conexiones keep-alive, concurrencia limitada,
+timeouts, reintentos con backoff exponencial y streaming SSE
+"""
+import asyncio
+import json
+import random
+import ssl
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = '2023-06-01'
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504, 529}
+
+
+class ClaudeAPIError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer', 'loop')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()  # Los streams solo sirven en el loop que los abrió
+
+    def is_usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self):
+        try:
+            self.writer.close()
+        except RuntimeError:
+            pass  # Su loop ya está cerrado: el socket se liberó con él
+
+
+class ConnectionPool:
+    """Pool de conexiones keep-alive hacia un único host
+
+    Semáforo y conexiones pertenecen al loop que los usa: si el pool pasa a otro
+    loop (ClaudeService.attach_loop tras arrancar el de fondo) se crean de nuevo
+    """
+
+    def __init__(self, host: str, port: int, use_ssl: bool, max_connections=4):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl.create_default_context() if use_ssl else None
+        self.max_connections = max_connections
+        self._idle: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.connections_opened = 0
+        self.in_use = 0
+
+    def _bind(self) -> asyncio.Semaphore:
+        """Semáforo del loop en curso (las conexiones libres de otro loop se descartan)"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self.close()
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+            self.in_use = 0
+        return self._semaphore
+
+    async def acquire(self) -> Tuple[_Connection, bool]:
+        """Obtener conexión; devuelve (conexión, reutilizada)"""
+        await self._bind().acquire()
+        self.in_use += 1
+        try:
+            while self._idle:
+                connection = self._idle.pop()
+                if connection.is_usable():
+                    return connection, True
+                connection.close()
+
+            reader, writer = await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl_context
+            )
+            self.connections_opened += 1
+            return _Connection(reader, writer), False
+        except BaseException:
+            self.in_use -= 1
+            self._semaphore.release()
+            raise
+
+    def release(self, connection: _Connection, reusable: bool):
+        """Devolver la conexión al pool (o cerrarla si no se puede reutilizar)"""
+        if connection.loop is not self._loop:
+            # Adquirida antes de cambiar de loop: su plaza era del semáforo anterior
+            connection.close()
+            return
+        if reusable and connection.is_usable():
+            self._idle.append(connection)
+        else:
+            connection.close()
+        self.in_use -= 1
+        self._semaphore.release()
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+class HTTPResponse:
+    """Respuesta HTTP/1.1 con cuerpo leído bajo demanda (Content-Length, chunked o hasta EOF)"""
+
+    def __init__(self, status: int, headers: Dict[str, str], reader: asyncio.StreamReader):
+        self.status = status
+        self.headers = headers
+        self._reader = reader
+        self._chunked = headers.get('transfer-encoding', '').lower() == 'chunked'
+        # Sin chunked ni Content-Length el cuerpo termina cuando el servidor cierra
+        self._until_eof = not self._chunked and 'content-length' not in headers
+        self._remaining = int(headers['content-length']) if not self._chunked and not self._until_eof else 0
+        self.complete = False
+
+    @property
+    def keep_alive(self) -> bool:
+        return not self._until_eof and self.headers.get('connection', '').lower() != 'close'
+
+    async def iter_chunks(self):
+        """Leer el cuerpo por fragmentos a medida que llegan"""
+        if self._chunked:
+            while True:
+                size_line = await self._reader.readline()
+                size = int(size_line.split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    await self._reader.readline()  # CRLF final
+                    break
+                data = await self._reader.readexactly(size)
+                await self._reader.readexactly(2)
+                yield data
+        elif self._until_eof:
+            while True:
+                data = await self._reader.read(65536)
+                if not data:
+                    break
+                yield data
+        else:
+            while self._remaining > 0:
+                data = await self._reader.read(min(self._remaining, 65536))
+                if not data:
+                    raise asyncio.IncompleteReadError(b'', self._remaining)
+                self._remaining -= len(data)
+                yield data
+        self.complete = True
+
+    async def read(self) -> bytes:
+        return b''.join([chunk async for chunk in self.iter_chunks()])
+
+
+async def _send_request(connection: _Connection, method: str, host: str, path: str,
+                        headers: Dict[str, str], body: bytes) -> HTTPResponse:
+    """Escribir la petición y leer línea de estado y cabeceras"""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", f"Content-Length: {len(body)}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    connection.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+    await connection.writer.drain()
+
+    status_line = await connection.reader.readline()
+    if not status_line:
+        raise ConnectionResetError("Conexión cerrada por el servidor")
+    status = int(status_line.split()[1])
+
+    response_headers = {}
+    while True:
+        line = await connection.reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        response_headers[name.strip().lower()] = value.strip()
+
+    return HTTPResponse(status, response_headers, connection.reader)
+
+
+class AsyncClaudeClient:
+    def __init__(self, api_key: str, base_url='https://api.anthropic.com', max_connections=4,
+                 timeout=30.0, max_retries=3, backoff_base=0.5):
+        url = urlsplit(base_url)
+        self.api_key = api_key
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == 'https' else 80)
+        self.use_ssl = url.scheme == 'https'
+        self.base_path = url.path.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._pool: Optional[ConnectionPool] = None
+
+        self.stats = {'requests': 0, 'retries': 0, 'errors': 0, 'reused_connections': 0}
+
+    @property
+    def pool(self) -> ConnectionPool:
+        # El pool se crea dentro del event loop que lo va a usar
+        if self._pool is None:
+            self._pool = ConnectionPool(self.host, self.port, self.use_ssl, self.max_connections)
+        return self._pool
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            'x-api-key': self.api_key,
+            'anthropic-version': API_VERSION,
+            'content-type': 'application/json',
+            'connection': 'keep-alive'
+        }
+
+    async def _request_once(self, payload: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        connection, reused = await self.pool.acquire()
+        reusable = False
+        try:
+            if reused:
+                self.stats['reused_connections'] += 1
+            response = await _send_request(
+                connection, 'POST', self.host, f"{self.base_path}/v1/messages",
+                self._headers(), payload
+            )
+            body = await response.read()
+            reusable = response.keep_alive
+            return response.status, response.headers, body
+        finally:
+            self.pool.release(connection, reusable)
+
+    def _retry_delay(self, attempt: int, headers: Optional[Dict[str, str]] = None) -> float:
+        """Backoff exponencial con jitter (o Retry-After si el servidor lo indica)"""
+        if headers and headers.get('retry-after'):
+            try:
+                return float(headers['retry-after'])
+            except ValueError:
+                pass
+        return self.backoff_base * (2 ** attempt) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _payload(messages: List[dict], model: str, max_tokens: int,
+                 system: Optional[str], **params) -> bytes:
+        body = {'model': model, 'max_tokens': max_tokens, 'messages': messages}
+        if system:
+            body['system'] = system
+        body.update(params)
+        return json.dumps(body).encode('utf-8')
+
+    async def create_message(self, messages: List[dict], model: str, max_tokens=300,
+                             system: Optional[str] = None, **params) -> dict:
+        """POST /v1/messages con reintentos; devuelve el JSON de respuesta"""
+        payload = self._payload(messages, model, max_tokens, system, **params)
+
+        self.stats['requests'] += 1
+        for attempt in range(self.max_retries + 1):
+            headers = None
+            try:
+                status, headers, data = await asyncio.wait_for(
+                    self._request_once(payload), timeout=self.timeout
+                )
+                if status == 200:
+                    return json.loads(data)
+                error = ClaudeAPIError(status, data.decode('utf-8', 'replace')[:500])
+                if status not in RETRYABLE_STATUS:
+                    self.stats['errors'] += 1
+                    raise error
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, OSError) as e:
+                error = e
+
+            if attempt == self.max_retries:
+                self.stats['errors'] += 1
+                raise error
+            self.stats['retries'] += 1
+            delay = self._retry_delay(attempt, headers)
+            logger.warning(f"Claude API: reintento {attempt + 1} en {delay:.2f}s ({error})")
+            await asyncio.sleep(delay)
+
+    async def stream_message(self, messages: List[dict], model: str, max_tokens=300,
+                             system: Optional[str] = None, **params):
+        """POST /v1/messages con stream=true; genera los fragmentos de texto a medida que llegan
+
+        Solo se reintenta antes del primer fragmento. Si el consumidor abandona el
+        generador, la conexión se cierra en lugar de volver al pool.
+        """
+        payload = self._payload(messages, model, max_tokens, system, stream=True, **params)
+
+        self.stats['requests'] += 1
+        for attempt in range(self.max_retries + 1):
+            headers = None
+            yielded = False
+            connection, reused = await self.pool.acquire()
+            reusable = False
+            try:
+                if reused:
+                    self.stats['reused_connections'] += 1
+                response = await asyncio.wait_for(
+                    _send_request(connection, 'POST', self.host, f"{self.base_path}/v1/messages",
+                                  self._headers(), payload),
+                    timeout=self.timeout
+                )
+                headers = response.headers
+
+                if response.status != 200:
+                    data = await asyncio.wait_for(response.read(), timeout=self.timeout)
+                    reusable = response.keep_alive
+                    error = ClaudeAPIError(response.status, data.decode('utf-8', 'replace')[:500])
+                    if response.status not in RETRYABLE_STATUS:
+                        self.stats['errors'] += 1
+                        raise error
+                else:
+                    chunks = response.iter_chunks()
+                    buffer = b''
+                    while True:
+                        try:
+                            # Timeout entre fragmentos, no sobre la respuesta completa
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        buffer += chunk
+                        while b'\n\n' in buffer:
+                            event, buffer = buffer.split(b'\n\n', 1)
+                            text = _parse_sse_text(event)
+                            if text:
+                                yielded = True
+                                yield text
+                    reusable = response.keep_alive and response.complete
+                    return
+
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, OSError) as e:
+                if yielded:
+                    self.stats['errors'] += 1
+                    raise
+                error = e
+            finally:
+                self.pool.release(connection, reusable)
+
+            if attempt == self.max_retries:
+                self.stats['errors'] += 1
+                raise error
+            self.stats['retries'] += 1
+            delay = self._retry_delay(attempt, headers)
+            logger.warning(f"Claude API: reintento {attempt + 1} en {delay:.2f}s ({error})")
+            await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+
+def _parse_sse_text(event: bytes) -> str:
+    """Extraer el texto de un evento SSE content_block_delta (vacío para otros eventos)"""
+    for line in event.split(b'\n'):
+        if not line.startswith(b'data:'):
+            continue
+        try:
+            data = json.loads(line[5:])
+        except ValueError:
+            return ''
+        if data.get('type') == 'content_block_delta':
+            delta = data.get('delta', {})
+            if delta.get('type') == 'text_delta':
+                return delta.get('text', '')
+        elif data.get('type') == 'error':
+            error = data.get('error', {})
+            raise ClaudeAPIError(0, f"{error.get('type')}: {error.get('message')}")
+    return ''
@@ -1,18 +1,68 @@
 """
 Claude Service - Servicio de IA para generar sugerencias
 """
+import asyncio
+import queue
 import random
 import time
 import logging
+import tracing
+import threading
+from collections import deque
 from typing import Dict, Optional
+from claude_client import AsyncClaudeClient
+from suggestion_cache import SuggestionCache
+from pii_redactor import PIIRedactor, placeholders
+from clock import SYSTEM_CLOCK
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = (
+    "Eres un asistente discreto que acompaña al usuario durante reuniones en tiempo real. "
+    "A partir del texto de pantalla y de la transcripción reciente, da UNA sugerencia breve "
+    "y accionable (máximo 2 frases) en español. En la pantalla, las líneas que empiezan por "
+    "'+ ' acaban de aparecer."
+)
+REDACTION_NOTE = (
+    " Los datos personales aparecen como marcadores del tipo [EMAIL_1] o [TELEFONO_2]; "
+    "si necesitas uno, cópialo tal cual."
+)
+
 class ClaudeService:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, model='claude-3-sonnet', base_url='https://api.anthropic.com',
+                 max_connections=4, timeout=30.0, max_retries=3, max_tokens=300,
+                 mock_token_delay=0.03, cache: Optional[SuggestionCache] = None,
+                 redactor: Optional[PIIRedactor] = None, clock=SYSTEM_CLOCK, seed: Optional[int] = None):
         self.api_key = api_key
+        self.clock = clock  # Reloj de pared de los registros (las latencias siempre son reales)
+        self.random = random.Random(seed)  # Fuente aleatoria de los mocks (sembrable)
         self.use_mock = api_key is None
 
+        # Cliente asyncio con pool keep-alive, ejecutado en un event loop de fondo
+        self.model = model
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_tokens = max_tokens
+        self.client: Optional[AsyncClaudeClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owns_loop = False  # False si el loop es externo (p.ej. el de qasync)
+        self._loop_lock = threading.Lock()
+
+        # Latencias por petición: time-to-first-token y time-to-last-token
+        self.request_timings = deque(maxlen=500)
+        # Contadores acumulados de toda la sesión (request_timings solo guarda las últimas)
+        self.counters = {'requests': 0, 'cached': 0, 'incomplete': 0, 'output_tokens': 0}
+        self.mock_token_delay = mock_token_delay  # Simula el ritmo de tokens en modo mock
+
+        # Cache de respuestas por contexto normalizado + playbook (None = desactivada)
+        self.cache = cache
+
+        # Anonimización del contexto: el LLM (y la cache) solo ven marcadores
+        self.redactor = redactor
+        self.system_prompt = SYSTEM_PROMPT + (REDACTION_NOTE if redactor is not None else '')
+
         # Sugerencias mock por contexto
         self.mock_suggestions = {
             'meeting': [
@@ -43,10 +93,269 @@ class ClaudeService:
 
     def generate_suggestion(self, context: str, playbook: Dict = None) -> str:
         """Generar sugerencia basada en contexto"""
+        if not self.use_mock:
+            # La ruta real pasa por generate_suggestion_async, que ya consulta la cache
+            return self._generate_real_suggestion(context, playbook)
+
+        started = time.perf_counter()
+        context = self._redact(context)
+        cached = self._cache_get(context, playbook)
+        if cached is not None:
+            self._record_timing(started, None, len(cached), cached=True)
+            return self._restore(cached)
+
+        suggestion = self._generate_mock_suggestion(context, playbook)
+        self._record_timing(started, None, len(suggestion), tokens=len(suggestion.split()))
+        self._cache_put(context, playbook, suggestion)
+        return self._restore(suggestion)
+
+    async def generate_suggestion_async(self, context: str, playbook: Dict = None) -> str:
+        """Versión asíncrona de generate_suggestion"""
+        started = time.perf_counter()
+        context = self._redact(context)
+        cached = self._cache_get(context, playbook)
+        if cached is not None:
+            self._record_timing(started, None, len(cached), cached=True)
+            return self._restore(cached)
+
         if self.use_mock:
-            return self._generate_mock_suggestion(context, playbook)
+            suggestion = self._generate_mock_suggestion(context, playbook)
+            tokens = len(suggestion.split())
         else:
-            return self._generate_real_suggestion(context, playbook)
+            response = await self._get_client().create_message(
+                self._build_messages(context, playbook),
+                model=self.model,
+                max_tokens=self.max_tokens,
+                system=self.system_prompt
+            )
+            suggestion = "".join(
+                block.get('text', '') for block in response.get('content', [])
+                if block.get('type') == 'text'
+            ).strip()
+            tokens = response.get('usage', {}).get('output_tokens', 0)
+
+        # Sin streaming el primer token llega con la respuesta completa
+        self._record_timing(started, None, len(suggestion), tokens=tokens)
+        self._cache_put(context, playbook, suggestion)
+        return self._restore(suggestion)
+
+    async def stream_suggestion_async(self, context: str, playbook: Dict = None):
+        """Generar la sugerencia como fragmentos de texto a medida que llegan"""
+        started = time.perf_counter()
+        context = self._redact(context)
+        cached = self._cache_get(context, playbook)
+        if cached is not None:
+            # Acierto de cache: la sugerencia completa llega en un único fragmento
+            self._record_timing(started, None, len(cached), streamed=True, cached=True)
+            yield self._restore(cached)
+            return
+
+        first_token_at = None
+        parts = []
+        completed = False
+        try:
+            if self.use_mock:
+                source = self._mock_stream(self._generate_mock_suggestion(context, playbook))
+            else:
+                source = self._get_client().stream_message(
+                    self._build_messages(context, playbook),
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    system=self.system_prompt
+                )
+            # Los marcadores pueden llegar partidos entre fragmentos: se restauran al completarse
+            restorer = self.redactor.restorer() if self.redactor is not None else None
+            async for delta in source:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(delta)
+                if restorer is None:
+                    yield delta
+                else:
+                    delta = restorer.feed(delta)
+                    if delta:
+                        yield delta
+            if restorer is not None:
+                delta = restorer.flush()
+                if delta:
+                    yield delta
+            completed = True
+        finally:
+            suggestion = "".join(parts)
+            # Cada fragmento del stream cuenta como un token (aproximación sin leer usage)
+            self._record_timing(started, first_token_at, len(suggestion), tokens=len(parts),
+                                streamed=True, completed=completed)
+            if completed:
+                self._cache_put(context, playbook, suggestion)
+
+    def stream_suggestion(self, context: str, playbook: Dict = None):
+        """Generador síncrono de fragmentos (el streaming corre en el loop de fondo)"""
+        self._check_not_on_loop()
+        deltas = queue.Queue()
+        finished = object()
+
+        async def pump():
+            try:
+                async for delta in self.stream_suggestion_async(context, playbook):
+                    deltas.put(delta)
+            except Exception as e:
+                deltas.put(e)
+            finally:
+                deltas.put(finished)
+
+        future = self.run_coroutine(pump())
+        try:
+            while True:
+                item = deltas.get()
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Si el consumidor abandona el generador, cancelar la petición en curso
+            future.cancel()
+
+    async def _mock_stream(self, suggestion: str):
+        """Emitir la sugerencia mock palabra a palabra"""
+        for index, word in enumerate(suggestion.split(' ')):
+            if index and self.mock_token_delay > 0:
+                await asyncio.sleep(self.mock_token_delay)
+            yield word if index == 0 else f" {word}"
+
+    def _redact(self, context: str) -> str:
+        if self.redactor is None:
+            return context
+        with tracing.span('llm.redact'):
+            return self.redactor.redact(context)
+
+    def _restore(self, suggestion: str) -> str:
+        return suggestion if self.redactor is None else self.redactor.restore(suggestion)
+
+    @staticmethod
+    def _playbook_key(playbook: Dict = None) -> str:
+        if not playbook:
+            return ''
+        return str(playbook.get('context') or playbook.get('name') or '')
+
+    def _cache_scope(self, context: str, playbook: Dict = None) -> str:
+        """Ámbito de la cache: playbook y, con anonimización, los marcadores del contexto.
+        Solo se reutiliza una sugerencia si menciona a las mismas personas y datos"""
+        scope = self._playbook_key(playbook)
+        if self.redactor is not None:
+            scope += '|' + ','.join(sorted(placeholders(context)))
+        return scope
+
+    def _cache_get(self, context: str, playbook: Dict = None) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.get(context, self._cache_scope(context, playbook))
+
+    def _cache_put(self, context: str, playbook: Dict, suggestion: str):
+        # No cachear respuestas vacías ni mensajes de error
+        if self.cache is None or not suggestion or suggestion.startswith("Error generando"):
+            return
+        self.cache.put(context, suggestion, self._cache_scope(context, playbook))
+
+    def _record_timing(self, started: float, first_token_at: Optional[float], chars: int,
+                       tokens=0, streamed=False, completed=True, cached=False):
+        """Registrar TTFT y TTLT de una petición"""
+        finished = time.perf_counter()
+        self.counters['requests'] += 1
+        self.counters['cached'] += cached
+        self.counters['incomplete'] += not completed
+        self.counters['output_tokens'] += tokens
+        ttlt = finished - started
+        ttft = (first_token_at - started) if first_token_at is not None else ttlt
+        if cached:
+            tracing.record('llm.cached', ttlt)
+        else:
+            tracing.record('llm.ttft', ttft)
+            tracing.record('llm.total', ttlt)
+        self.request_timings.append({
+            'timestamp': self.clock.time(),
+            'ttft': ttft,
+            'ttlt': ttlt,
+            'chars': chars,
+            'streamed': streamed,
+            'completed': completed,
+            'cached': cached,
+            'mock': self.use_mock
+        })
+
+    def get_latency_stats(self) -> Dict:
+        """Resumen de TTFT/TTLT de las últimas peticiones (segundos)"""
+        timings = list(self.request_timings)
+        if not timings:
+            return {'requests': 0}
+
+        def percentiles(key):
+            values = sorted(t[key] for t in timings)
+            pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+            return {'p50': pick(0.50), 'p95': pick(0.95), 'max': values[-1]}
+
+        stats = {
+            'requests': len(timings),
+            'ttft': percentiles('ttft'),
+            'ttlt': percentiles('ttlt')
+        }
+        if self.cache is not None:
+            stats['cache'] = self.cache.get_stats()
+        if self.redactor is not None:
+            stats['redaction'] = self.redactor.get_stats()
+        return stats
+
+    def _build_messages(self, context: str, playbook: Dict = None) -> list:
+        """Construir el prompt para la Messages API"""
+        parts = []
+        if playbook:
+            parts.append(f"Playbook: {playbook.get('name', playbook.get('context', ''))}")
+            tips = playbook.get('tips') or []
+            if tips:
+                parts.append("Consejos del playbook:\n" + "\n".join(f"- {tip}" for tip in tips))
+        parts.append(f"Contexto actual:\n{context}")
+        return [{'role': 'user', 'content': "\n\n".join(parts)}]
+
+    def _get_client(self) -> AsyncClaudeClient:
+        if self.client is None:
+            self.client = AsyncClaudeClient(
+                self.api_key,
+                base_url=self.base_url,
+                max_connections=self.max_connections,
+                timeout=self.timeout,
+                max_retries=self.max_retries
+            )
+        return self.client
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop de fondo compartido por todas las llamadas síncronas"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._owns_loop = True
+                thread = threading.Thread(target=self._loop.run_forever, daemon=True, name='claude-loop')
+                thread.start()
+            return self._loop
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        """Usar un event loop externo (el loop Qt de qasync) en lugar del hilo de fondo"""
+        with self._loop_lock:
+            self._loop = loop
+            self._owns_loop = False
+
+    def _check_not_on_loop(self):
+        """Esperar un Future del loop desde su propio hilo lo bloquearía para siempre"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if running is self._loop:
+            raise RuntimeError("Llamada síncrona desde el hilo del event loop de ClaudeService: "
+                               "usa generate_suggestion_async / stream_suggestion_async")
+
+    def run_coroutine(self, coroutine):
+        """Ejecutar una corrutina en el loop de fondo y devolver su concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop())
 
     def _generate_mock_suggestion(self, context: str, playbook: Dict = None) -> str:
         """Generar sugerencia mock inteligente"""
@@ -62,11 +371,11 @@ class ClaudeService:
         elif 'slide' in context_lower or 'presentación' in context_lower:
             suggestion_type = 'presentation'
         else:
-            suggestion_type = random.choice(['meeting', 'sales', 'interview', 'presentation'])
+            suggestion_type = self.random.choice(['meeting', 'sales', 'interview', 'presentation'])
 
         # Obtener sugerencia del tipo detectado
         suggestions = self.mock_suggestions.get(suggestion_type, self.mock_suggestions['meeting'])
-        base_suggestion = random.choice(suggestions)
+        base_suggestion = self.random.choice(suggestions)
 
         # Personalizar según playbook si existe
         if playbook and 'context' in playbook:
@@ -84,10 +393,11 @@ class ClaudeService:
 
     def _generate_real_suggestion(self, context: str, playbook: Dict = None) -> str:
         """Generar sugerencia real con Claude API"""
+        self._check_not_on_loop()
         try:
-            # TODO: Implementar llamada real a Claude API
-            logger.warning("Claude API no configurada - usando mock")
-            return self._generate_mock_suggestion(context, playbook)
+            future = self.run_coroutine(self.generate_suggestion_async(context, playbook))
+            # Margen sobre el timeout por intento para cubrir los reintentos
+            return future.result(timeout=self.timeout * (self.max_retries + 1) + 5)
 
         except Exception as e:
             logger.error(f"Error llamando Claude API: {e}")
@@ -97,9 +407,9 @@ class ClaudeService:
         """Analizar sentimiento del texto"""
         if self.use_mock:
             return {
-                'sentiment': random.choice(['positive', 'neutral', 'negative']),
-                'confidence': random.uniform(0.7, 0.95),
-                'emotions': random.choice([
+                'sentiment': self.random.choice(['positive', 'neutral', 'negative']),
+                'confidence': self.random.uniform(0.7, 0.95),
+                'emotions': self.random.choice([
                     ['curious', 'engaged'],
                     ['concerned', 'cautious'],
                     ['excited', 'optimistic']
@@ -119,7 +429,7 @@ class ClaudeService:
                 "Preparar demo personalizado",
                 "Contactar referencias"
             ]
-            return random.sample(mock_actions, random.randint(1, 3))
+            return self.random.sample(mock_actions, self.random.randint(1, 3))
         else:
             # TODO: Implementar extracción real
             return []
@@ -154,4 +464,23 @@ class ClaudeService:
         """Configurar API de Claude"""
         self.api_key = api_key
         self.use_mock = False
+        if self.client is not None:
+            self.client.api_key = api_key
         logger.info("Claude API configurada correctamente")
+
+    def close(self):
+        """Cerrar conexiones y detener el loop de fondo"""
+        if self._loop is None:
+            return
+        if not self._owns_loop:
+            # Loop externo: puede ser el hilo actual, así que no se espera el cierre
+            if self.client is not None:
+                self.run_coroutine(self.client.close())
+                self.client = None
+            self._loop = None
+            return
+        if self.client is not None:
+            self.run_coroutine(self.client.close()).result(timeout=5)
+            self.client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Cluely CLI - Ejecuta el pipeline sin interfaz gráfica
+Toma audio (WAV), capturas de pantalla, transcripciones en texto o los mocks
+y escribe cada sugerencia como una línea JSON
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+
+import tracing
+from config import Config
+from engine import PipelineEngine, open_session_db
+
+
+def _tagged(kind):
+    return lambda path: (kind, path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    # Las entradas se procesan en el orden en que aparecen en la línea de comandos
+    parser.add_argument('--audio', dest='inputs', action='append', type=_tagged('audio'),
+                        help="WAV a transcribir (repetible)")
+    parser.add_argument('--image', dest='inputs', action='append', type=_tagged('image'),
+                        help="Captura de pantalla para OCR (repetible)")
+    parser.add_argument('--transcript', dest='inputs', action='append', type=_tagged('transcript'),
+                        help="Fichero de texto: cada línea es un segmento de audio (repetible)")
+    parser.add_argument('--mock-seconds', type=float, default=0.0,
+                        help="Ejecutar el pipeline en vivo con los mocks durante N segundos")
+    parser.add_argument('--playbook', help="Playbook activo")
+    parser.add_argument('--refractory', type=float, help="Periodo refractario del disparador (s)")
+    parser.add_argument('--output', help="Fichero JSONL de salida (por defecto stdout)")
+    parser.add_argument('--record', help="Grabar la sesión (ASR y pantalla) para bench_replay.py")
+    parser.add_argument('--db', metavar='SQLITE',
+                        help="Guardar la sesión en esta base de datos (transcripción según privacy.store_transcripts)")
+    parser.add_argument('--search', metavar='TEXTO', help="Buscar en la base de datos de --db y salir")
+    parser.add_argument('--trace', metavar='JSON', help="Medir latencias por etapa y guardarlas en JSON")
+    parser.add_argument('--stats', action='store_true', help="Escribir estadísticas en stderr al terminar")
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help="Espera máxima a que terminen las sugerencias en curso (s)")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+class JsonLinesWriter:
+    """Escritura de sugerencias como JSON lines (llamada desde el loop de Claude)"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, generation: int, suggestion: str, context: str):
+        if not suggestion:
+            return
+        record = {
+            'timestamp': time.time(),
+            'generation': generation,
+            'suggestion': suggestion,
+            'context': context
+        }
+        with self._lock:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.stream.flush()
+            self.count += 1
+
+
+def search(args) -> int:
+    config = Config()
+    config.config['storage'].update(path=args.db)
+    db = open_session_db(config)
+    if db is None:
+        return 1
+    try:
+        started = time.perf_counter()
+        results = db.search(args.search, limit=50)
+        for row in results:
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+        logging.info(f"{len(results)} resultados en {(time.perf_counter() - started) * 1000:.1f} ms")
+        return 0
+    finally:
+        db.close()
+
+
+def run(args) -> int:
+    if args.search:
+        if not args.db:
+            sys.stderr.write("--search necesita --db\n")
+            return 2
+        return search(args)
+
+    config = Config()
+    if args.db:
+        config.config['storage'].update(enabled=True, path=args.db)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    writer = JsonLinesWriter(output)
+    engine = PipelineEngine(config, on_finished=writer)
+    if args.trace:
+        tracing.tracer.enabled = True
+    if args.refractory is not None:
+        engine.novelty.refractory_seconds = args.refractory
+    if args.playbook:
+        engine.playbook_manager.set_active_playbook(args.playbook)
+
+    recorder = None
+    if args.record:
+        from session_replay import SessionRecorder
+        recorder = SessionRecorder(engine.event_bus, args.record)
+        recorder.start()
+
+    try:
+        engine.start(live=args.mock_seconds > 0)
+        for kind, path in args.inputs or []:
+            if kind == 'audio':
+                engine.feed_audio(path)
+            elif kind == 'image':
+                engine.feed_image(path)
+            else:
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            engine.feed_transcript(line.strip())
+            engine.wait_idle(args.timeout)
+
+        if args.mock_seconds > 0:
+            time.sleep(args.mock_seconds)
+        engine.wait_idle(args.timeout)
+
+        # Novedad acumulada que el periodo refractario no dejó disparar
+        if engine.novelty.get_stats()['pending_score'] > 0:
+            engine.request_suggestion()
+            engine.wait_idle(args.timeout)
+
+        if args.trace:
+            engine.dump_trace(args.trace)
+
+        if args.stats:
+            stats = engine.get_stats()
+            stats['suggestions_written'] = writer.count
+            sys.stderr.write(json.dumps(stats, ensure_ascii=False, indent=2, default=str) + "\n")
+        return 0
+
+    finally:
+        if recorder is not None:
+            recorder.stop()
+        engine.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, stream=sys.stderr)
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
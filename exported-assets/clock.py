@@ -0,0 +1,118 @@
+"""
+Clock - Reloj del sistema y reloj virtual intercambiables
+El reloj virtual permite repetir sesiones de forma determinista y simular
+horas de reunión en segundos
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+
+class SystemClock:
+    """Reloj real (time.time / time.monotonic / time.sleep)"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        """Esperar a un evento como mucho N segundos; True si se activó"""
+        return event.wait(seconds)
+
+
+class VirtualClock:
+    """Reloj controlado manualmente
+
+    Sin hilos (threaded=False), sleep() avanza el reloj al instante. Con
+    threaded=True, sleep() bloquea al hilo hasta que quien conduce la
+    simulación avance el reloj con advance(); el reloj salta de un despertar
+    al siguiente y espera a que los hilos despertados vuelvan a dormir.
+    """
+
+    def __init__(self, start=0.0, epoch=1_700_000_000.0, threaded=False, settle_timeout=5.0):
+        self._now = start
+        self.epoch = epoch  # time() = epoch + tiempo virtual transcurrido
+        self.threaded = threaded
+        self.settle_timeout = settle_timeout  # Espera máxima (real) a que un hilo vuelva a dormir
+        self._condition = threading.Condition()
+        self._sleepers: Dict[threading.Thread, float] = {}  # Hilo -> instante de despertar
+        self._participants = set()  # Hilos que han dormido alguna vez en este reloj
+
+    def time(self) -> float:
+        return self.epoch + self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if not self.threaded:
+            self.advance(seconds)
+            return
+        thread = threading.current_thread()
+        with self._condition:
+            deadline = self._now + max(seconds, 0.0)
+            self._participants.add(thread)
+            self._sleepers[thread] = deadline
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._now >= deadline)
+            self._sleepers.pop(thread, None)
+            self._condition.notify_all()
+
+    def wait(self, event: threading.Event, seconds: float) -> bool:
+        if event.is_set():
+            return True
+        self.sleep(seconds)
+        return event.is_set()
+
+    def advance(self, seconds: float):
+        """Avanzar el reloj; con hilos, despierta a cada durmiente en orden de instante"""
+        if seconds <= 0:
+            return
+        if not self.threaded:
+            self._now += seconds
+            return
+        target = self._now + seconds
+        with self._condition:
+            while True:
+                self._settle()
+                upcoming = min(self._sleepers.values(), default=None)
+                if upcoming is None or upcoming > target:
+                    self._now = target
+                    self._condition.notify_all()
+                    return
+                self._now = max(self._now, upcoming)
+                self._condition.notify_all()
+
+    def _settle(self):
+        """Esperar a que todos los hilos participantes vivos estén dormidos"""
+        def settled():
+            alive = {thread for thread in self._participants if thread.is_alive()}
+            self._participants = alive
+            return all(thread in self._sleepers for thread in alive) and \
+                all(deadline > self._now for deadline in self._sleepers.values())
+        self._condition.wait_for(settled, self.settle_timeout)
+
+    def wait_sleepers(self, count: int, timeout: Optional[float] = 5.0) -> bool:
+        """Esperar (tiempo real) a que N hilos estén dormidos en el reloj"""
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self._sleepers) >= count, timeout)
+
+    def release(self):
+        """Volver al modo sin hilos y despertar a todos los durmientes"""
+        with self._condition:
+            self.threaded = False
+            self._now = max([self._now, *self._sleepers.values()])
+            self._condition.notify_all()
+
+    def set(self, now: float):
+        """Mover el reloj a un instante (nunca hacia atrás)"""
+        if now > self._now:
+            self.advance(now - self._now)
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -8,6 +8,11 @@ from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Palabras clave por defecto del detector de novedad (suggestions.keywords); se escriben
+# como las leería el usuario: las tildes se quitan al normalizar antes de comparar
+DEFAULT_KEYWORDS = ('precio', 'presupuesto', 'coste', 'descuento', 'contrato', 'plazo',
+                    'competencia', 'objeción', 'decisión', 'siguiente paso')
+
 class Config:
     def __init__(self):
         self.config_file = 'config.json'
@@ -28,7 +33,8 @@ class Config:
                 'hotkeys': {
                     'toggle_recording': 'ctrl+shift+c',
                     'request_suggestion': 'ctrl+shift+s',
-                    'toggle_overlay': 'ctrl+shift+h'
+                    'toggle_overlay': 'ctrl+shift+h',
+                    'dump_trace': 'ctrl+shift+t'
                 }
             },
             'services': {
@@ -40,18 +46,56 @@ class Config:
                 'ocr': {
                     'use_mock': True,
                     'provider': 'tesseract',
-                    'capture_interval': 2
+                    'capture_interval': 2,
+                    'min_capture_interval': 0.5,
+                    'max_capture_interval': 8,
+                    'cpu_budget': 0.1
                 },
                 'claude': {
                     'use_mock': True,
                     'model': 'claude-3-sonnet',
-                    'api_key': None
+                    'api_key': None,
+                    'base_url': 'https://api.anthropic.com',
+                    'max_connections': 4,
+                    'timeout': 30,
+                    'max_retries': 3,
+                    'cache': {
+                        'enabled': True,
+                        'ttl_seconds': 60,
+                        'max_entries': 256,
+                        'hamming_threshold': 3
+                    }
                 }
             },
+            'suggestions': {
+                'novelty_threshold': 1.0,
+                'refractory_seconds': 6,
+                'keywords': list(DEFAULT_KEYWORDS)
+            },
+            'tracing': {
+                'enabled': False,
+                'output': 'trace_stats.json'
+            },
+            'metrics': {
+                'enabled': False,
+                'host': '127.0.0.1',
+                'port': 9464
+            },
+            'storage': {
+                'enabled': False,
+                'path': 'sessions.db',
+                'flush_interval': 0.5,
+                'partition_hours': None,
+                'sweep_interval': 30,
+                'max_drops_per_sweep': 4,
+                'key_path': 'sessions.key'
+            },
             'privacy': {
                 'store_transcripts': False,
                 'encrypt_data': True,
-                'auto_delete_after_hours': 24
+                'auto_delete_after_hours': 24,
+                'redact_pii': True,
+                'redact_terms': []
             }
         }
 
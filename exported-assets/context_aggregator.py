@@ -0,0 +1,155 @@
+"""
+Context Aggregator - Agregador de contexto dirigido por eventos
+Se suscribe a segmentos de ASR y deltas de pantalla, recompone el contexto
+en cuanto llega algo nuevo y lo entrega a la generación de sugerencias
+"""
+import threading
+import time
+import logging
+import tracing
+from collections import deque
+from typing import Callable, Optional
+from event_bus import EventBus, SCREEN_DELTA, TRANSCRIPT_SEGMENT, BLOCK
+from novelty import NoveltyDetector
+from screen_delta import ScreenState
+
+logger = logging.getLogger(__name__)
+
+
+def _noop(*args):
+    pass
+
+
+class ContextAggregator:
+    def __init__(self, bus: EventBus, asr_service, novelty: Optional[NoveltyDetector] = None,
+                 on_context: Callable[[str, bool], None] = _noop, transcript_seconds=30,
+                 queue_size=64, clock: Callable[[], float] = time.time, tick_interval=0.5):
+        self.asr_service = asr_service
+        self.novelty = novelty or NoveltyDetector()
+        self.on_context = on_context  # (contexto, disparar_sugerencia)
+        self.transcript_seconds = transcript_seconds
+        self.clock = clock  # Reloj de pared de la ventana de transcripción
+        self.tick_interval = tick_interval  # Sin eventos, cada cuánto se revisa la novedad retenida
+
+        # Una sola cola para ambos temas: el ASR no debe perder segmentos (BLOCK);
+        # los deltas de pantalla se recomponen desde su estado completo
+        self.subscription = bus.subscribe((TRANSCRIPT_SEGMENT, SCREEN_DELTA), maxsize=queue_size,
+                                          policy=BLOCK)
+        self.screen_state = ScreenState()
+        # Último cambio de pantalla: líneas añadidas (o modificadas) y las que desaparecieron
+        self.screen_added = set()
+        self.screen_removed = []
+        self.context = ""
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Latencia publicación -> entrega del contexto (segundos)
+        self.latencies = deque(maxlen=500)
+        self.batches = 0
+        self.events = 0
+
+    def start(self):
+        self._running = True
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='context-aggregator', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def close(self):
+        self._running = False
+        self.subscription.close()
+
+    @property
+    def idle(self) -> bool:
+        """Sin eventos encolados ni lote en proceso"""
+        return len(self.subscription) == 0 and self.events == self.subscription.stats['consumed']
+
+    def _run(self):
+        while self._running:
+            event = self.subscription.get(timeout=self.tick_interval)
+            if event is None:
+                # Silencio: una pregunta retenida por el periodo refractario no espera a otro evento
+                self.tick()
+                continue
+            # Agrupar lo que se haya acumulado mientras procesábamos el lote anterior
+            self.process([event] + self.subscription.drain())
+
+    def process(self, events) -> bool:
+        """Aplicar un lote de eventos y entregar el contexto; True si se disparó una sugerencia"""
+        started = time.monotonic()
+        for event in events:
+            tracing.record('bus.queue_wait', started - event.published_at)
+
+        with tracing.span('context.assemble'):
+            trigger = self._assemble(events)
+
+        now = time.monotonic()
+        self.latencies.extend(now - event.published_at for event in events)
+        self.batches += 1
+        self.events += len(events)
+        return trigger
+
+    def tick(self) -> bool:
+        """Entregar el contexto actual con disparo si la novedad retenida ya puede dispararse"""
+        if not self.context or not self.novelty.flush():
+            return False
+        try:
+            self.on_context(self.context, True)
+        except Exception as e:
+            logger.error(f"Error entregando contexto: {e}")
+        return True
+
+    def _assemble(self, events) -> bool:
+        new_state = None
+        for event in events:
+            if event.topic == SCREEN_DELTA:
+                new_state = event.payload.state
+
+        screen_delta = None
+        if new_state is not None:
+            # Diff contra el último estado visto: robusto ante deltas agrupados
+            screen_delta = new_state.diff(self.screen_state)
+            self.screen_state = new_state
+            if screen_delta.has_changes:
+                self.screen_added = set(screen_delta.added)
+                self.screen_removed = screen_delta.removed
+
+        audio_text = self.asr_service.get_recent_transcript(self.transcript_seconds, self.clock())
+        self.context = f"{self._screen_context()}\nAudio: {audio_text}"
+        trigger = self.novelty.observe(self.asr_service.transcript_store, screen_delta)
+
+        try:
+            self.on_context(self.context, trigger)
+        except Exception as e:
+            logger.error(f"Error entregando contexto: {e}")
+        return trigger
+
+    def _screen_context(self) -> str:
+        """Pantalla completa deduplicada con el último cambio marcado
+
+        El LLM no guarda estado entre llamadas: cada contexto lleva todas las
+        líneas visibles, con '+ ' en las nuevas, y las que acaban de desaparecer.
+        Sin números de versión ni recuentos, que cambiarían la clave de la cache.
+        """
+        lines = [f"+ {line}" if line in self.screen_added else line
+                 for line in self.screen_state.lines.values()]
+        if not lines:
+            return "Pantalla: (vacía)"
+        screen = "Pantalla:\n" + "\n".join(lines)
+        if self.screen_removed:
+            screen += "\nYa no en pantalla: " + " | ".join(self.screen_removed)
+        return screen
+
+    def get_stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        return {
+            'events': self.events,
+            'batches': self.batches,
+            'dispatch_latency_p50_ms': p50 * 1000,
+            'dispatch_latency_max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            'queue': dict(self.subscription.stats, depth=len(self.subscription))
+        }
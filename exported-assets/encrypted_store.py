@@ -0,0 +1,192 @@
+"""
+Encrypted Store - Fichero cifrado por trozos de tamaño fijo (AES-GCM)
+Cada registro se cifra y autentica por separado con un nonce nuevo y su
+posición como dato asociado: añadir solo escribe registros nuevos al final
+(nunca reescribe) y leer un rango descifra solo los registros que lo contienen
+"""
+import base64
+import bisect
+import os
+import struct
+import threading
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'CLYENC2\0'
+HEADER = struct.Struct('>8sII16s')  # magic, tamaño de trozo, reservado, id de fichero
+LENGTH = struct.Struct('>I')  # Longitud del texto plano de cada registro
+NONCE_SIZE = 12
+TAG_SIZE = 16
+KEY_ENV = 'CLUELY_DATA_KEY'
+
+
+class EncryptionUnavailable(RuntimeError):
+    """Se pidió cifrado pero no hay implementación de AES-GCM (paquete cryptography)"""
+
+
+class IntegrityError(ValueError):
+    """Un trozo no supera la autenticación (fichero alterado, truncado o clave errónea)"""
+
+
+def _aesgcm():
+    try:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        return AESGCM
+    except ImportError:
+        raise EncryptionUnavailable("Cifrado no disponible: instala el paquete 'cryptography'")
+
+
+def load_key(path: str, create=True) -> bytes:
+    """Clave de 256 bits desde CLUELY_DATA_KEY (base64) o desde un fichero (se crea con permisos 0600)
+
+    Con create=False (ya hay datos cifrados) una clave que falta es un error:
+    una clave nueva no descifraría nada.
+    """
+    _aesgcm()  # Fallar antes de crear una clave que no se podría usar
+    encoded = os.environ.get(KEY_ENV)
+    if encoded:
+        key = base64.urlsafe_b64decode(encoded)
+    elif os.path.exists(path):
+        with open(path, 'rb') as f:
+            key = base64.urlsafe_b64decode(f.read().strip())
+    elif not create:
+        raise FileNotFoundError(f"No se encuentra la clave de cifrado {path} y ya hay datos cifrados "
+                                f"(usa storage.key_path o {KEY_ENV})")
+    else:
+        key = os.urandom(32)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(base64.urlsafe_b64encode(key))
+        logger.info(f"Clave de cifrado creada en {path}")
+    if len(key) != 32:
+        raise ValueError("La clave de cifrado debe tener 32 bytes")
+    return key
+
+
+class ChunkedCipherFile:
+    """Fichero de solo añadir cifrado en registros de como mucho chunk_size bytes de texto plano
+
+    Registro i: longitud (4) + nonce (12) + texto cifrado + tag (16). Un
+    registro escrito no se vuelve a tocar: cada append sella sus datos en
+    registros nuevos, también el resto parcial, así que un fallo a mitad de
+    escritura solo puede dejar incompleto el último registro (se descarta al
+    abrir). El dato asociado incluye el índice del registro y su offset en el
+    texto plano, así que reordenar registros se detecta al leer; quitar
+    registros del final deja fuera de rango los offsets que los referencian.
+    """
+
+    def __init__(self, path: str, key: bytes, chunk_size=4096):
+        self.path = path
+        self._cipher = _aesgcm()(key)
+        self._lock = threading.Lock()
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            magic, chunk_size, _, self.file_id = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC:
+                raise IntegrityError(f"{path} no es un fichero cifrado de Cluely")
+        else:
+            self.file_id = os.urandom(16)
+            self._file.write(HEADER.pack(MAGIC, chunk_size, 0, self.file_id))
+        self.chunk_size = chunk_size
+
+        # Offset en el texto plano y posición en el fichero de cada registro
+        self._offsets: List[int] = []
+        self._positions: List[int] = []
+        self.size = 0
+        if exists:
+            self._scan(os.path.getsize(path))
+
+        self.stats = {'appends': 0, 'chunks_written': 0, 'chunks_read': 0}
+
+    def _scan(self, file_size: int):
+        """Recorrer las longitudes de los registros; un último registro incompleto se descarta"""
+        largest = LENGTH.size + NONCE_SIZE + self.chunk_size + TAG_SIZE
+        position = HEADER.size
+        while position < file_size:
+            self._file.seek(position)
+            prefix = self._file.read(LENGTH.size)
+            length = LENGTH.unpack(prefix)[0] if len(prefix) == LENGTH.size else 0
+            end = position + LENGTH.size + NONCE_SIZE + length + TAG_SIZE
+            if not 0 < length <= self.chunk_size or end > file_size:
+                if file_size - position >= largest:
+                    # Cabe un registro entero: no es una escritura a medias sino un fichero alterado
+                    raise IntegrityError(f"{self.path}: longitud de registro no válida en {position}")
+                logger.warning(f"{self.path}: se descarta un registro incompleto al final ({file_size - position} bytes)")
+                self._file.truncate(position)
+                break
+            self._offsets.append(self.size)
+            self._positions.append(position)
+            self.size += length
+            position = end
+
+    @property
+    def chunks(self) -> int:
+        return len(self._offsets)
+
+    def _aad(self, index: int, offset: int) -> bytes:
+        return self.file_id + struct.pack('>QQ', index, offset)
+
+    def _read_chunk(self, index: int) -> bytes:
+        self._file.seek(self._positions[index])
+        length = LENGTH.unpack(self._file.read(LENGTH.size))[0]
+        record = self._file.read(NONCE_SIZE + length + TAG_SIZE)
+        self.stats['chunks_read'] += 1
+        try:
+            return self._cipher.decrypt(record[:NONCE_SIZE], record[NONCE_SIZE:],
+                                        self._aad(index, self._offsets[index]))
+        except Exception:
+            raise IntegrityError(f"{self.path}: el registro {index} no supera la autenticación")
+
+    def append(self, data: bytes) -> int:
+        """Añadir datos en registros nuevos; devuelve su offset en el texto plano.
+        Solo se vuelcan al sistema operativo: sync() antes de referenciarlos en otro sitio"""
+        if not data:
+            return self.size
+        with self._lock:
+            offset = self.size
+            position = self._file.seek(0, os.SEEK_END)
+            records = []
+            for start in range(0, len(data), self.chunk_size):
+                plain = data[start:start + self.chunk_size]
+                index = len(self._offsets)
+                nonce = os.urandom(NONCE_SIZE)
+                records.append(LENGTH.pack(len(plain)) + nonce +
+                               self._cipher.encrypt(nonce, plain, self._aad(index, offset + start)))
+                self._offsets.append(offset + start)
+                self._positions.append(position)
+                position += len(records[-1])
+            self._file.write(b''.join(records))
+            self._file.flush()
+
+            self.size = offset + len(data)
+            self.stats['appends'] += 1
+            self.stats['chunks_written'] += len(records)
+            return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Leer un rango descifrando solo sus trozos"""
+        if length <= 0:
+            return b''
+        if offset < 0 or offset + length > self.size:
+            raise ValueError("Rango fuera del fichero cifrado")
+        with self._lock:
+            first = bisect.bisect_right(self._offsets, offset) - 1
+            last = bisect.bisect_right(self._offsets, offset + length - 1) - 1
+            plain = b''.join(self._read_chunk(index) for index in range(first, last + 1))
+            start = offset - self._offsets[first]
+        return plain[start:start + length]
+
+    def sync(self):
+        """Llevar a disco lo añadido (fsync)"""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
@@ -0,0 +1,326 @@
+"""
+Pipeline Engine - Pipeline ASR -> OCR -> contexto -> sugerencia sin interfaz
+No importa Qt: lo usan la aplicación de escritorio, la CLI y los benchmarks
+"""
+import os
+import time
+import logging
+import tracing
+from concurrent.futures import Future
+from typing import Callable, Optional
+from config import Config, DEFAULT_KEYWORDS
+from asr_service import ASRService
+from ocr_service import OCRService
+from claude_service import ClaudeService
+from playbook_manager import PlaybookManager
+from suggestion_cache import SuggestionCache
+from pii_redactor import PIIRedactor
+from suggestion_scheduler import SuggestionScheduler
+from novelty import NoveltyDetector
+from event_bus import EventBus
+from context_aggregator import ContextAggregator
+from clock import SYSTEM_CLOCK
+from metrics_server import MetricsServer
+from session_notes import SessionNotes
+from session_db import SessionDatabase, SUGGESTION, has_encrypted_data
+from encrypted_store import EncryptionUnavailable, load_key
+
+logger = logging.getLogger(__name__)
+
+
+def _noop(*args):
+    pass
+
+
+def open_session_db(config: Config, clock=SYSTEM_CLOCK) -> Optional[SessionDatabase]:
+    """Abrir la base de datos de sesiones según configuración; None si no se puede"""
+    try:
+        # Si se pide cifrado y no hay AES-GCM, no se guarda nada (nunca en claro)
+        key = None
+        path = config.get('storage.path', 'sessions.db')
+        if config.get('privacy.encrypt_data', True):
+            # Una ruta relativa se toma junto a la base de datos, no en el directorio actual
+            key_path = os.path.join(os.path.dirname(os.path.abspath(path)),
+                                    config.get('storage.key_path', 'sessions.key'))
+            key = load_key(key_path, create=not has_encrypted_data(path))
+        return SessionDatabase(
+            path=path,
+            flush_interval=config.get('storage.flush_interval', 0.5),
+            store_transcripts=config.get('privacy.store_transcripts', False),
+            retention_hours=config.get('privacy.auto_delete_after_hours', 24),
+            partition_hours=config.get('storage.partition_hours'),
+            sweep_interval=config.get('storage.sweep_interval', 30),
+            max_drops_per_sweep=config.get('storage.max_drops_per_sweep', 4),
+            encryption_key=key,
+            clock=clock
+        )
+    except EncryptionUnavailable as e:
+        logger.error(f"{e}; almacenamiento de sesiones desactivado (privacy.encrypt_data)")
+        return None
+    except Exception as e:
+        logger.error(f"Error abriendo la base de datos de sesiones: {e}")
+        return None
+
+
+class PipelineEngine:
+    def __init__(self, config: Optional[Config] = None,
+                 on_started: Callable[[int], None] = _noop,
+                 on_delta: Callable[[int, str], None] = _noop,
+                 on_finished: Callable[[int, str, str], None] = _noop,
+                 asr_service: Optional[ASRService] = None,
+                 ocr_service: Optional[OCRService] = None,
+                 claude_service: Optional[ClaudeService] = None,
+                 clock=SYSTEM_CLOCK, seed: Optional[int] = None):
+        self.config = config or Config()
+        self.on_finished = on_finished
+        # Reloj y semilla compartidos por todos los servicios (simulación más rápida que tiempo real)
+        self.clock = clock
+        self.seed = seed
+        if self.config.get('tracing.enabled', False):
+            tracing.tracer.enabled = True
+
+        # ASR y OCR publican en el bus en cuanto producen algo; no hay sondeo periódico
+        self.event_bus = EventBus()
+        self.asr_service = asr_service or self.create_asr_service()
+        self.ocr_service = ocr_service or self.create_ocr_service()
+        self.asr_service.event_bus = self.event_bus
+        self.ocr_service.event_bus = self.event_bus
+        self.claude_service = claude_service or self.create_claude_service()
+
+        self.suggestion_scheduler = SuggestionScheduler(
+            self.claude_service,
+            on_started=on_started,
+            on_delta=on_delta,
+            on_finished=self._on_suggestion_finished
+        )
+        self.novelty = NoveltyDetector(
+            threshold=self.config.get('suggestions.novelty_threshold', 1.0),
+            refractory_seconds=self.config.get('suggestions.refractory_seconds', 6),
+            keywords=self.config.get('suggestions.keywords', DEFAULT_KEYWORDS),
+            clock=clock.monotonic
+        )
+        self.context_aggregator = ContextAggregator(
+            self.event_bus, self.asr_service, self.novelty, on_context=self.update_context,
+            clock=clock.time
+        )
+        self.playbook_manager = PlaybookManager()
+
+        # Almacén persistente opcional (SQLite); la transcripción solo si la privacidad lo permite
+        self.session_db = self.create_session_db()
+        if self.session_db is not None:
+            self.session_db.attach(self.event_bus)
+
+        # Endpoint /metrics opcional; sus histogramas salen del tracer
+        self.metrics_server: Optional[MetricsServer] = None
+        if self.config.get('metrics.enabled', False):
+            tracing.tracer.enabled = True
+            self.metrics_server = MetricsServer(
+                self,
+                host=self.config.get('metrics.host', '127.0.0.1'),
+                port=self.config.get('metrics.port', 9464)
+            )
+
+        # Estado del pipeline
+        self.is_running = False
+        self.current_context = ""
+        self.session_notes = SessionNotes()  # Contexto deduplicado por trozos
+        self._last_request: Optional[Future] = None
+
+    def _seed(self, offset: int) -> Optional[int]:
+        # Una semilla distinta por servicio para que sus secuencias no se correlacionen
+        return None if self.seed is None else self.seed + offset
+
+    def create_asr_service(self) -> ASRService:
+        return ASRService(
+            use_mock=self.config.is_mock_mode('asr'),
+            language=self.config.get('services.asr.language', 'es-ES'),
+            clock=self.clock,
+            seed=self._seed(1)
+        )
+
+    def create_ocr_service(self) -> OCRService:
+        return OCRService(
+            use_mock=self.config.is_mock_mode('ocr'),
+            capture_interval=self.config.get('services.ocr.capture_interval', 2),
+            min_capture_interval=self.config.get('services.ocr.min_capture_interval', 0.5),
+            max_capture_interval=self.config.get('services.ocr.max_capture_interval', 8),
+            cpu_budget=self.config.get('services.ocr.cpu_budget', 0.1),
+            clock=self.clock,
+            seed=self._seed(2)
+        )
+
+    def create_claude_service(self) -> ClaudeService:
+        return ClaudeService(
+            api_key=None if self.config.is_mock_mode('claude') else self.config.get('services.claude.api_key'),
+            model=self.config.get('services.claude.model', 'claude-3-sonnet'),
+            base_url=self.config.get('services.claude.base_url', 'https://api.anthropic.com'),
+            max_connections=self.config.get('services.claude.max_connections', 4),
+            timeout=self.config.get('services.claude.timeout', 30),
+            max_retries=self.config.get('services.claude.max_retries', 3),
+            cache=self.create_suggestion_cache(),
+            redactor=self.create_pii_redactor(),
+            clock=self.clock,
+            seed=self._seed(3)
+        )
+
+    def create_suggestion_cache(self) -> Optional[SuggestionCache]:
+        """Crear la cache de sugerencias según configuración"""
+        if not self.config.get('services.claude.cache.enabled', True):
+            return None
+        return SuggestionCache(
+            max_entries=self.config.get('services.claude.cache.max_entries', 256),
+            ttl_seconds=self.config.get('services.claude.cache.ttl_seconds', 60),
+            hamming_threshold=self.config.get('services.claude.cache.hamming_threshold', 3),
+            clock=self.clock.monotonic
+        )
+
+    def create_pii_redactor(self) -> Optional[PIIRedactor]:
+        """Anonimizador del contexto enviado al LLM (privacy.redact_pii)"""
+        if not self.config.get('privacy.redact_pii', True):
+            return None
+        return PIIRedactor(terms=self.config.get('privacy.redact_terms', []))
+
+    def create_session_db(self) -> Optional[SessionDatabase]:
+        if not self.config.get('storage.enabled', False):
+            return None
+        return open_session_db(self.config, self.clock)
+
+    def start(self, live=True, threaded=True):
+        """Arrancar el pipeline; live=False solo procesa lo que se le inyecte (ficheros)
+
+        Con threaded=False no se arranca el hilo del agregador: quien llama
+        procesa los eventos con pump() (repeticiones deterministas).
+        """
+        if live:
+            self.asr_service.start_recording()
+            self.ocr_service.scheduler.reset()
+        self.novelty.reset(self.asr_service.transcript_store.next_seq)
+        if threaded:
+            self.context_aggregator.start()
+        if live:
+            self.ocr_service.start_capture_loop()
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+        if self.session_db is not None:
+            self.session_db.start()
+            if self.session_db.session_id is None:
+                self.session_db.begin_session()
+        self.is_running = True
+
+    def stop(self):
+        self.asr_service.stop_recording()
+        self.ocr_service.stop_capture_loop()
+        self.context_aggregator.stop()
+        if self.session_db is not None:
+            self.session_db.end_session()
+        self.is_running = False
+
+    def feed_audio(self, path: str) -> dict:
+        """Transcribir un WAV; cada segmento entra al pipeline como si fuera en vivo"""
+        return self.asr_service.transcribe_wav(path)
+
+    def feed_image(self, path: str) -> str:
+        """OCR de una captura de pantalla en disco"""
+        return self.ocr_service.capture_image_file(path)
+
+    def feed_transcript(self, text: str, timestamp: Optional[float] = None):
+        self.asr_service.add_transcript(text, timestamp)
+
+    def feed_screen_text(self, text: str):
+        self.ocr_service.ingest_screen_text(text)
+
+    def pump(self) -> bool:
+        """Procesar en el hilo actual los eventos pendientes; True si se pidió una sugerencia"""
+        events = self.context_aggregator.subscription.drain()
+        if not events:
+            return self.context_aggregator.tick()
+        return self.context_aggregator.process(events)
+
+    def update_context(self, context: str, trigger: bool):
+        """Recibir el contexto recompuesto por el agregador (hilo del agregador)"""
+        if not self.is_running:
+            return
+        self.current_context = context
+
+        # El detector de novedad decide si hay información nueva suficiente
+        if trigger:
+            self.generate_suggestion()
+
+    def request_suggestion(self) -> Optional[Future]:
+        """Solicitar sugerencia inmediata"""
+        self.novelty.mark_fired()
+        return self.generate_suggestion()
+
+    def generate_suggestion(self) -> Optional[Future]:
+        """Generar sugerencia basada en el contexto actual"""
+        try:
+            if not self.current_context:
+                return None
+
+            # Single-flight: agrupa peticiones iguales y cancela las obsoletas
+            with tracing.span('playbook.lookup'):
+                active_playbook = self.playbook_manager.get_active_playbook()
+            self._last_request = self.suggestion_scheduler.request(self.current_context, active_playbook)
+            return self._last_request
+
+        except Exception as e:
+            logger.error(f"Error generando sugerencia: {e}")
+            return None
+
+    def _on_suggestion_finished(self, generation: int, suggestion: str, context: str):
+        if suggestion:
+            self.session_notes.add(self.clock.time(), context, suggestion)
+            if self.session_db is not None:
+                self.session_db.record(SUGGESTION, suggestion)
+        self.on_finished(generation, suggestion, context)
+
+    def save_note(self, text: str) -> bool:
+        """Guardar una nota manual en la base de datos de sesiones"""
+        if self.session_db is None:
+            logger.warning("Almacenamiento desactivado (storage.enabled): la nota no se guarda")
+            return False
+        if self.session_db.session_id is None:
+            self.session_db.begin_session()
+        self.session_db.add_note(text)
+        return True
+
+    def wait_idle(self, timeout=30.0) -> bool:
+        """Esperar a que el agregador vacíe su cola y termine la última sugerencia"""
+        deadline = time.monotonic() + timeout
+        while not self.context_aggregator.idle:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        request = self._last_request
+        if request is not None:
+            try:
+                request.result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception:
+                return request.done()
+        return True
+
+    def dump_trace(self, path: Optional[str] = None) -> dict:
+        """Volcar los histogramas de latencia por etapa (JSON + log)"""
+        return tracing.tracer.dump(path or self.config.get('tracing.output', 'trace_stats.json'))
+
+    def get_stats(self) -> dict:
+        return {
+            'novelty': self.novelty.get_stats(),
+            'aggregator': self.context_aggregator.get_stats(),
+            'scheduler': self.suggestion_scheduler.get_stats(),
+            'ocr': self.ocr_service.get_stats(),
+            'claude': self.claude_service.get_latency_stats(),
+            'session_notes': self.session_notes.get_stats(),
+            'session_db': self.session_db.get_stats() if self.session_db is not None else None
+        }
+
+    def close(self):
+        """Detener el pipeline y liberar hilos, procesos y conexiones"""
+        self.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.context_aggregator.close()
+        self.ocr_service.shutdown()
+        self.claude_service.close()
+        if self.session_db is not None:
+            self.session_db.close()
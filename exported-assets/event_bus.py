@@ -0,0 +1,148 @@
+"""
+Event Bus - Bus publish/subscribe en proceso
+Colas acotadas por suscriptor con política de contrapresión explícita
+(bloquear, descartar el más antiguo o descartar el nuevo)
+"""
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_SEGMENT = 'transcript.segment'
+SCREEN_DELTA = 'screen.delta'
+
+BLOCK = 'block'  # El productor espera hasta que haya hueco (o vence el timeout)
+DROP_OLDEST = 'drop_oldest'  # Se descarta el evento más antiguo de la cola
+DROP_NEWEST = 'drop_newest'  # Se descarta el evento que se intenta publicar
+
+
+class Event:
+    __slots__ = ('topic', 'payload', 'published_at')
+
+    def __init__(self, topic: str, payload: Any, published_at: float):
+        self.topic = topic
+        self.payload = payload
+        self.published_at = published_at  # time.monotonic() al publicar
+
+
+class Subscription:
+    """Cola acotada de un suscriptor para uno o varios temas"""
+
+    def __init__(self, topics: Tuple[str, ...], maxsize=64, policy=BLOCK, block_timeout=1.0):
+        if policy not in (BLOCK, DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Política de contrapresión desconocida: {policy}")
+        self.topics = topics
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout  # Espera máxima del productor con BLOCK
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self.closed = False
+
+        self.stats = {'delivered': 0, 'consumed': 0, 'dropped': 0, 'blocked': 0, 'max_depth': 0}
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _offer(self, event: Event) -> bool:
+        with self._condition:
+            if self.closed:
+                return False
+            if len(self._queue) >= self.maxsize:
+                if self.policy == DROP_NEWEST:
+                    self.stats['dropped'] += 1
+                    return False
+                if self.policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    self.stats['dropped'] += 1
+                else:
+                    self.stats['blocked'] += 1
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.maxsize and not self.closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.stats['dropped'] += 1
+                            logger.warning(f"Bus: cola llena en {self.topics}, evento descartado")
+                            return False
+                        self._condition.wait(remaining)
+                    if self.closed:
+                        return False
+
+            self._queue.append(event)
+            self.stats['delivered'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(self._queue))
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Esperar el siguiente evento; None si vence el timeout o la suscripción se cierra"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            if not self._queue:
+                return None
+            event = self._queue.popleft()
+            self.stats['consumed'] += 1
+            self._condition.notify_all()
+            return event
+
+    def drain(self) -> List[Event]:
+        """Sacar sin esperar todos los eventos encolados"""
+        with self._condition:
+            events = list(self._queue)
+            self._queue.clear()
+            self.stats['consumed'] += len(events)
+            self._condition.notify_all()
+            return events
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class EventBus:
+    def __init__(self):
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, topics: Iterable[str], maxsize=64, policy=BLOCK,
+                  block_timeout=1.0) -> Subscription:
+        """Crear una suscripción con cola propia para los temas indicados"""
+        topics = (topics,) if isinstance(topics, str) else tuple(topics)
+        subscription = Subscription(topics, maxsize, policy, block_timeout)
+        with self._lock:
+            for topic in topics:
+                self._subscriptions.setdefault(topic, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscriptions.get(topic, [])
+                if subscription in subscribers:
+                    subscribers.remove(subscription)
+
+    def publish(self, topic: str, payload: Any) -> int:
+        """Publicar un evento; devuelve a cuántos suscriptores se entregó"""
+        event = Event(topic, payload, time.monotonic())
+        with self._lock:
+            subscribers = list(self._subscriptions.get(topic, ()))
+        self.published += 1
+        return sum(1 for subscription in subscribers if subscription._offer(event))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            subscriptions = {s for subscribers in self._subscriptions.values() for s in subscribers}
+        return {
+            'published': self.published,
+            'subscriptions': [
+                dict(s.stats, topics=list(s.topics), depth=len(s), policy=s.policy)
+                for s in subscriptions
+            ]
+        }
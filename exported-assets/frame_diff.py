@@ -0,0 +1,222 @@
+"""
+Frame Diff - Detección de cambios entre capturas de pantalla
+Hash perceptual reducido + umbral de diferencia de píxeles para evitar OCR
+cuando la pantalla no ha cambiado, y división en tiles con cache por contenido
+"""
+import hashlib
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+Region = Tuple[int, int, int, int, str]
+
+
+class ScreenFrame:
+    """Captura en escala de grises (8 bits por píxel, fila a fila)"""
+    __slots__ = ('width', 'height', 'pixels', 'regions')
+
+    def __init__(self, width: int, height: int, pixels: bytes, regions: Optional[List[Region]] = None):
+        self.width = width
+        self.height = height
+        self.pixels = pixels
+        # Solo en modo mock: cajas (x0, y0, x1, y1, texto) que simulan el contenido real
+        self.regions = regions
+
+
+def render_text_frame(lines: List[str], width=640, height=360) -> ScreenFrame:
+    """Frame sintético con una banda de "tinta" por línea (mocks y repeticiones de sesión)"""
+    pixels = bytearray(b'\xff' * (width * height))
+    regions = []
+    line_height, margin = 24, 10
+
+    for index, line in enumerate(lines):
+        y0 = margin + index * line_height
+        if y0 + 16 > height:
+            break
+        encoded = line.encode('utf-8')
+        if not encoded:
+            continue
+        ink = (encoded * (width // len(encoded) + 1))[:min(width - 2 * margin, 8 * len(encoded))]
+        for y in range(y0, y0 + 16):
+            start = y * width + margin
+            pixels[start:start + len(ink)] = ink
+        regions.append((margin, y0, margin + len(ink), y0 + 16, line))
+
+    return ScreenFrame(width, height, bytes(pixels), regions)
+
+
+def cell_means(frame: ScreenFrame, cols: int, rows: int, step: int = 2) -> List[float]:
+    """Reducir el frame a una rejilla cols x rows de medias de bloque (muestreo con paso fijo)"""
+    width, height, pixels = frame.width, frame.height, frame.pixels
+    x_edges = [width * c // cols for c in range(cols + 1)]
+    y_edges = [height * r // rows for r in range(rows + 1)]
+    means = []
+
+    for r in range(rows):
+        sums = [0] * cols
+        counts = [0] * cols
+        for y in range(y_edges[r], y_edges[r + 1], step):
+            row = pixels[y * width:(y + 1) * width]
+            for c in range(cols):
+                # El slicing con paso se resuelve en C, sin bucle por píxel en Python
+                segment = row[x_edges[c]:x_edges[c + 1]:step]
+                sums[c] += sum(segment)
+                counts[c] += len(segment)
+        means.extend(s / n if n else 0.0 for s, n in zip(sums, counts))
+
+    return means
+
+
+def difference_hash(frame: ScreenFrame, hash_size: int = 8) -> int:
+    """dHash: compara cada celda con su vecina derecha en una rejilla (hash_size + 1) x hash_size"""
+    means = cell_means(frame, hash_size + 1, hash_size, step=4)
+    value = 0
+    for r in range(hash_size):
+        base = r * (hash_size + 1)
+        for c in range(hash_size):
+            value = (value << 1) | (means[base + c] > means[base + c + 1])
+    return value
+
+
+class FrameChangeDetector:
+    def __init__(self, hash_size=8, grid=(32, 18), hamming_threshold=2, pixel_threshold=6.0):
+        self.hash_size = hash_size
+        self.grid = grid
+        self.hamming_threshold = hamming_threshold  # Bits distintos tolerados en el hash
+        self.pixel_threshold = pixel_threshold  # Diferencia máxima de media por celda (0-255)
+
+        # Referencia: último frame que pasó por OCR
+        self._digest: Optional[bytes] = None
+        self._hash: Optional[int] = None
+        self._means: Optional[List[float]] = None
+
+        self.hits = 0  # Frames sin cambios (OCR evitado)
+        self.misses = 0  # Frames con cambios (OCR necesario)
+
+    def has_changed(self, frame: ScreenFrame) -> bool:
+        """Comparar con la referencia; si hay cambio, el frame pasa a ser la nueva referencia"""
+        digest = hashlib.blake2b(frame.pixels, digest_size=16).digest()
+        if digest == self._digest:
+            self.hits += 1
+            return False
+
+        frame_hash = difference_hash(frame, self.hash_size)
+        means = None
+        changed = (
+            self._hash is None
+            or bin(frame_hash ^ self._hash).count('1') > self.hamming_threshold
+        )
+
+        if not changed:
+            # El hash perceptual no ve cambios: confirmar con la diferencia por celda,
+            # que detecta cambios pequeños (una línea de chat) que el hash ignora
+            means = cell_means(frame, *self.grid)
+            changed = max(abs(a - b) for a, b in zip(means, self._means)) > self.pixel_threshold
+
+        if not changed:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        self._digest = digest
+        self._hash = frame_hash
+        self._means = means if means is not None else cell_means(frame, *self.grid)
+        return True
+
+    def reset(self):
+        """Olvidar la referencia (el siguiente frame siempre se procesa)"""
+        self._digest = None
+        self._hash = None
+        self._means = None
+
+    def get_stats(self) -> dict:
+        """Contadores de aciertos y fallos"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class Tile:
+    """Recorte rectangular de un frame identificado por el hash de su contenido"""
+    __slots__ = ('row', 'col', 'x0', 'y0', 'x1', 'y1', 'pixels', 'digest')
+
+    def __init__(self, row, col, x0, y0, x1, y1, pixels: bytes):
+        self.row = row
+        self.col = col
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.pixels = pixels
+        # El tamaño entra en el hash: mismo contenido con otra forma es otro tile
+        self.digest = hashlib.blake2b(
+            pixels, digest_size=16, salt=f"{x1 - x0}x{y1 - y0}".encode()[:16]
+        ).digest()
+
+    @property
+    def width(self) -> int:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> int:
+        return self.y1 - self.y0
+
+    def is_blank(self) -> bool:
+        """Tile de un solo color (no hay texto que leer)"""
+        return self.pixels.count(self.pixels[:1]) == len(self.pixels)
+
+
+def split_tiles(frame: ScreenFrame, tile_width: int, tile_height: int) -> List[Tile]:
+    """Dividir el frame en tiles en orden de lectura (filas de arriba abajo, columnas de izquierda a derecha)"""
+    width, pixels = frame.width, frame.pixels
+    tiles = []
+    for row, y0 in enumerate(range(0, frame.height, tile_height)):
+        y1 = min(y0 + tile_height, frame.height)
+        for col, x0 in enumerate(range(0, width, tile_width)):
+            x1 = min(x0 + tile_width, width)
+            data = b''.join(pixels[y * width + x0:y * width + x1] for y in range(y0, y1))
+            tiles.append(Tile(row, col, x0, y0, x1, y1, data))
+    return tiles
+
+
+class TileCache:
+    """Cache LRU acotada de texto OCR indexada por hash de contenido del tile"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> Optional[str]:
+        text = self._entries.get(digest)
+        if text is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return text
+
+    def put(self, digest: bytes, text: str):
+        self._entries[digest] = text
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Contadores de aciertos y fallos"""
+        total = self.hits + self.misses
+        return {
+            'tile_hits': self.hits,
+            'tile_misses': self.misses,
+            'tile_hit_rate': self.hits / total if total else 0.0,
+            'tile_cache_size': len(self._entries)
+        }
@@ -0,0 +1,224 @@
+"""
+Metrics Server - Endpoint HTTP local con métricas en formato de texto de Prometheus
+Corre en su propio hilo: las métricas se recogen al hacer scrape, sin coste
+en el hilo de la interfaz ni en el pipeline
+"""
+import os
+import sys
+import threading
+import logging
+import tracing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites (segundos) de los histogramas exportados: de 1 ms a 30 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Memoria residente (RSS) del proceso; None si no se puede medir"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Sin /proc solo queda el pico (ru_maxrss: bytes en macOS, KiB en Linux)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+
+def _format(value) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class MetricsWriter:
+    """Acumula líneas en formato de exposición de Prometheus (una cabecera por métrica)"""
+
+    def __init__(self, prefix='cluely_'):
+        self.prefix = prefix
+        self.lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    @staticmethod
+    def _labels(labels: Optional[dict]) -> str:
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+    def sample(self, kind: str, name: str, value, help_text: str, labels: Optional[dict] = None):
+        if value is None:
+            return
+        name = self.prefix + name
+        self._declare(name, kind, help_text)
+        self.lines.append(f"{name}{self._labels(labels)} {_format(value)}")
+
+    def counter(self, name: str, value, help_text: str, labels: Optional[dict] = None):
+        self.sample('counter', name if name.endswith('_total') else f"{name}_total", value, help_text, labels)
+
+    def gauge(self, name: str, value, help_text: str, labels: Optional[dict] = None):
+        self.sample('gauge', name, value, help_text, labels)
+
+    def histogram(self, name: str, bounds, cumulative, count: int, total: float, help_text: str,
+                  labels: Optional[dict] = None):
+        name = self.prefix + name
+        self._declare(name, 'histogram', help_text)
+        labels = labels or {}
+        for bound, value in zip(bounds, cumulative):
+            self.lines.append(f"{name}_bucket{self._labels(dict(labels, le=f'{bound:g}'))} {value}")
+        self.lines.append(f"{name}_bucket{self._labels(dict(labels, le='+Inf'))} {count}")
+        self.lines.append(f"{name}_sum{self._labels(labels)} {_format(total)}")
+        self.lines.append(f"{name}_count{self._labels(labels)} {count}")
+
+    def render(self) -> bytes:
+        return ("\n".join(self.lines) + "\n").encode('utf-8')
+
+
+def collect_metrics(engine) -> bytes:
+    """Leer los contadores del pipeline y de los histogramas de tracing"""
+    out = MetricsWriter()
+    stats = engine.get_stats()
+
+    # ASR
+    out.counter('asr_segments', engine.asr_service.transcript_store.next_seq,
+                "Segmentos de transcripción producidos")
+
+    # OCR: invocaciones reales frente a frames y tiles reutilizados
+    ocr = stats['ocr']
+    out.counter('ocr_captures', ocr['captures'], "Capturas de pantalla procesadas")
+    out.counter('ocr_invocations', ocr['ocr_invocations'], "Llamadas al motor de OCR")
+    out.counter('ocr_skipped_frames', ocr['hits'], "Frames descartados por no tener cambios")
+    out.counter('ocr_tile_cache_hits', ocr['tile_hits'], "Tiles resueltos desde la cache")
+    out.gauge('ocr_capture_interval_seconds', ocr['capture_interval'], "Intervalo de captura actual")
+
+    # LLM
+    claude = engine.claude_service
+    counters = claude.counters
+    out.counter('llm_requests', counters['requests'], "Peticiones de sugerencia (incluye cache)")
+    out.counter('llm_cache_hits', counters['cached'], "Sugerencias servidas desde la cache")
+    out.counter('llm_incomplete', counters['incomplete'], "Streams cancelados o fallidos")
+    out.counter('llm_output_tokens', counters['output_tokens'], "Tokens de salida generados")
+    if claude.cache is not None:
+        out.gauge('llm_cache_entries', stats['claude'].get('cache', {}).get('entries'),
+                  "Entradas en la cache de sugerencias")
+    if claude.redactor is not None:
+        for kind, value in claude.redactor.get_stats()['redactions'].items():
+            out.counter('pii_redactions', value, "Datos personales sustituidos por marcadores",
+                        {'kind': kind})
+
+    # Sugerencias: disparos del detector de novedad y ciclo de vida en el scheduler
+    novelty = stats['novelty']
+    out.counter('novelty_observations', novelty['observations'], "Contextos evaluados por el detector")
+    out.counter('novelty_fired', novelty['fired'], "Sugerencias disparadas por novedad")
+    out.gauge('novelty_fire_rate_per_minute', novelty['fire_rate_per_minute'],
+              "Sugerencias disparadas por minuto")
+    # Las peticiones no son un resultado: sumarlas con los resultados contaría dos veces
+    scheduler = stats['scheduler']
+    out.counter('suggestion_requests', scheduler.get('requested', 0), "Peticiones de sugerencia al scheduler")
+    for outcome, value in scheduler.items():
+        if outcome not in ('generation', 'requested'):
+            out.counter('suggestions', value, "Sugerencias por resultado en el scheduler",
+                        {'outcome': outcome})
+
+    # Colas del bus de eventos
+    for subscription in engine.event_bus.get_stats()['subscriptions']:
+        labels = {'topics': ','.join(subscription['topics']), 'policy': subscription['policy']}
+        out.gauge('queue_depth', subscription['depth'], "Eventos pendientes en la cola", labels)
+        out.gauge('queue_max_depth', subscription['max_depth'], "Profundidad máxima observada", labels)
+        out.counter('queue_dropped', subscription['dropped'], "Eventos descartados por cola llena", labels)
+
+    out.gauge('process_resident_memory_bytes', resident_memory_bytes(), "Memoria residente del proceso")
+
+    # Latencias por etapa (requiere tracing activo)
+    for stage, (cumulative, count, total) in tracing.tracer.export(LATENCY_BUCKETS).items():
+        out.histogram('stage_latency_seconds', LATENCY_BUCKETS, cumulative, count, total,
+                      "Latencia por etapa del pipeline", {'stage': stage})
+
+    return out.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    server_version = 'CluelyMetrics/1.0'
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        try:
+            body = collect_metrics(self.server.engine)
+        except Exception as e:
+            logger.error(f"Error recogiendo métricas: {e}")
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Metrics: {self.address_string()} {format % args}")
+
+
+class MetricsServer:
+    """Servidor /metrics en un hilo de fondo (solo escucha en localhost por defecto)"""
+
+    def __init__(self, engine, host='127.0.0.1', port=9464):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self) -> bool:
+        if self._server is not None:
+            return True
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        except OSError as e:
+            logger.error(f"No se pudo abrir el endpoint de métricas en {self.host}:{self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        self._server.engine = self.engine
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        logger.info(f"Métricas disponibles en {self.url}")
+        return True
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Mock Claude Server - Servidor HTTP local que imita la Messages API
+Soporta keep-alive, streaming SSE, inyección de latencia y de errores para
+pruebas de carga offline
+"""
+import argparse
+import asyncio
+import json
+import random
+import logging
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found', 529: 'Overloaded'}
+
+
+class MockClaudeServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.3, jitter=0.1,
+                 error_rate=0.0, token_interval=0.02, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency  # Latencia base por petición (segundos)
+        self.jitter = jitter  # Variación aleatoria añadida (segundos, exponencial)
+        self.error_rate = error_rate  # Fracción de peticiones que devuelven 529
+        self.token_interval = token_interval  # Pausa entre fragmentos en modo streaming
+        self.random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers = set()
+
+        self.stats = {'connections': 0, 'requests': 0, 'errors_injected': 0}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Mock Claude API escuchando en {self.base_url}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Cerrar también las conexiones keep-alive que siguen abiertas
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def _injected_delay(self) -> float:
+        extra = self.random.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0
+        return self.latency + extra
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats['connections'] += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            # Keep-alive: atender peticiones hasta que el cliente cierre
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                self.stats['requests'] += 1
+                await self._dispatch(method, path, headers, body, writer)
+
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _dispatch(self, method, path, headers, body, writer):
+        if method != 'POST' or path.rstrip('/') != '/v1/messages':
+            return await self._send_json(writer, 404, self._error('not_found_error', 'Ruta no encontrada'))
+        if not headers.get('x-api-key'):
+            return await self._send_json(writer, 401, self._error('authentication_error', 'Falta x-api-key'))
+
+        try:
+            request = json.loads(body)
+            messages = request['messages']
+        except (ValueError, KeyError):
+            return await self._send_json(writer, 400, self._error('invalid_request_error', 'JSON inválido'))
+
+        await asyncio.sleep(self._injected_delay())
+
+        if self.random.random() < self.error_rate:
+            self.stats['errors_injected'] += 1
+            return await self._send_json(writer, 529, self._error('overloaded_error', 'Overloaded'))
+
+        text = self._completion_text(messages)
+        if request.get('stream'):
+            await self._send_stream(writer, request, text)
+        else:
+            await self._send_json(writer, 200, self._message(request, text))
+
+    def _completion_text(self, messages) -> str:
+        """Texto de respuesta determinista a partir del último mensaje del usuario"""
+        content = messages[-1].get('content', '') if messages else ''
+        if isinstance(content, list):
+            content = " ".join(block.get('text', '') for block in content)
+        words = content.split()
+        topic = " ".join(words[-8:]) if words else "la conversación"
+        return f"Sugerencia simulada: retoma el punto sobre «{topic}» y propone un siguiente paso concreto."
+
+    def _message(self, request: dict, text: str) -> dict:
+        prompt_chars = sum(len(json.dumps(m)) for m in request.get('messages', []))
+        return {
+            'id': f"msg_mock_{uuid.uuid4().hex[:24]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'mock'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': prompt_chars // 4, 'output_tokens': len(text) // 4}
+        }
+
+    async def _send_stream(self, writer: asyncio.StreamWriter, request: dict, text: str):
+        """Respuesta SSE con la misma secuencia de eventos que la API real"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+
+        async def send_event(event_type: str, data: dict):
+            chunk = f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+            writer.write(f"{len(chunk):x}\r\n".encode('latin-1') + chunk + b"\r\n")
+            await writer.drain()
+
+        message = self._message(request, text)
+        message['content'] = []
+        message['stop_reason'] = None
+        await send_event('message_start', {'type': 'message_start', 'message': message})
+        await send_event('content_block_start', {
+            'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}
+        })
+
+        words = text.split(' ')
+        for index, word in enumerate(words):
+            if index and self.token_interval > 0:
+                await asyncio.sleep(self.token_interval)
+            fragment = word if index == 0 else f" {word}"
+            await send_event('content_block_delta', {
+                'type': 'content_block_delta', 'index': 0,
+                'delta': {'type': 'text_delta', 'text': fragment}
+            })
+
+        await send_event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        await send_event('message_delta', {
+            'type': 'message_delta',
+            'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+            'usage': {'output_tokens': len(words)}
+        })
+        await send_event('message_stop', {'type': 'message_stop'})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _error(error_type: str, message: str) -> dict:
+        return {'type': 'error', 'error': {'type': error_type, 'message': message}}
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: keep-alive\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--token-interval', type=float, default=0.02)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockClaudeServer(args.host, args.port, args.latency, args.jitter,
+                              args.error_rate, args.token_interval)
+
+    async def serve():
+        await server.start()
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
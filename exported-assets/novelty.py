@@ -0,0 +1,184 @@
+"""
+Novelty - Disparador de sugerencias por información nueva
+Puntúa cuánto contenido nuevo (tokens de ASR, líneas de OCR y preguntas o
+palabras clave) ha llegado desde la última sugerencia y solo dispara al
+superar un umbral, respetando un periodo refractario
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+from config import DEFAULT_KEYWORDS
+from suggestion_cache import normalize_context
+
+_QUESTION_WORDS = ('que', 'como', 'cuando', 'cuanto', 'cuanta', 'cuantos', 'cuantas',
+                   'donde', 'quien', 'quienes', 'cual', 'cuales', 'por que', 'para que')
+_QUESTION_RE = re.compile(r"^(?:%s)\b" % "|".join(w.replace(' ', r'\s') for w in _QUESTION_WORDS))
+
+
+class NoveltyScore:
+    """Contribuciones a la puntuación de una observación (cues ponderadas por su novedad)"""
+    __slots__ = ('tokens', 'lines', 'cues', 'score')
+
+    def __init__(self, tokens=0, lines=0, cues=0.0, score=0.0):
+        self.tokens = tokens
+        self.lines = lines
+        self.cues = cues
+        self.score = score
+
+
+class NoveltyDetector:
+    def __init__(self, threshold=1.0, refractory_seconds=6.0, token_weight=0.05,
+                 line_weight=0.15, cue_weight=1.0, cue_novel_tokens=3,
+                 keywords: Iterable[str] = DEFAULT_KEYWORDS, vocabulary_size=512,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.refractory_seconds = refractory_seconds  # Tiempo mínimo entre disparos
+        self.token_weight = token_weight
+        self.line_weight = line_weight
+        self.cue_weight = cue_weight
+        # Una pregunta o palabra clave solo pesa entera con tantas palabras nuevas: repetir la
+        # misma pregunta no aporta nada y no debe disparar otra sugerencia
+        self.cue_novel_tokens = max(1, cue_novel_tokens)
+        self.keywords = tuple(normalize_context(k) for k in keywords)
+        self.vocabulary_size = vocabulary_size
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        # Tokens y líneas de pantalla vistos recientemente (LRU): repetir no aporta novedad
+        self._vocabulary: OrderedDict = OrderedDict()
+        self._lines: OrderedDict = OrderedDict()
+        self._transcript_seq = 0  # Siguiente secuencia de ASR por consumir
+        self._pending = 0.0  # Puntuación acumulada desde el último disparo
+        self._last_fired: Optional[float] = None
+        self._started = clock()
+
+        self.observations = 0
+        self.fired = 0
+        self.suppressed_refractory = 0  # Umbral superado dentro del periodo refractario
+        self.suppressed_threshold = 0  # Observaciones con novedad insuficiente
+
+    @property
+    def transcript_seq(self) -> int:
+        return self._transcript_seq
+
+    def _novel_tokens(self, tokens: List[str]) -> int:
+        novel = 0
+        for token in tokens:
+            if token in self._vocabulary:
+                self._vocabulary.move_to_end(token)
+                continue
+            if len(token) > 2:
+                novel += 1
+            self._vocabulary[token] = None
+            if len(self._vocabulary) > self.vocabulary_size:
+                self._vocabulary.popitem(last=False)
+        return novel
+
+    def _seen_line(self, normalized: str) -> bool:
+        """Una línea que vuelve a la pantalla (scroll, ventana que se alterna) no es nueva"""
+        if normalized in self._lines:
+            self._lines.move_to_end(normalized)
+            return True
+        self._lines[normalized] = None
+        if len(self._lines) > self.vocabulary_size:
+            self._lines.popitem(last=False)
+        return False
+
+    def _cues(self, text: str, normalized: str) -> int:
+        cues = sum(1 for keyword in self.keywords if keyword and keyword in normalized)
+        if '?' in text or '¿' in text or _QUESTION_RE.match(normalized):
+            cues += 1
+        return cues
+
+    def _add(self, result: NoveltyScore, text: str, normalized: str):
+        novel = self._novel_tokens(normalized.split())
+        result.tokens += novel
+        cues = self._cues(text, normalized)
+        if cues:
+            result.cues += cues * min(1.0, novel / self.cue_novel_tokens)
+
+    def score(self, segments: Iterable[dict] = (), added_lines: Iterable[str] = ()) -> NoveltyScore:
+        """Puntuar segmentos de ASR y líneas de OCR nuevos (actualiza el vocabulario)"""
+        result = NoveltyScore()
+        for segment in segments:
+            text = segment.get('text', '')
+            self._add(result, text, normalize_context(text))
+        for line in added_lines:
+            normalized = normalize_context(line)
+            if self._seen_line(normalized):
+                continue
+            # Una pregunta en el chat o una palabra clave en una diapositiva también cuentan
+            result.lines += 1
+            self._add(result, line, normalized)
+        result.score = (result.tokens * self.token_weight + result.lines * self.line_weight
+                        + result.cues * self.cue_weight)
+        return result
+
+    def observe(self, transcript_store=None, screen_delta=None, now: float = None) -> bool:
+        """Incorporar lo nuevo desde la última observación; True si hay que generar sugerencia"""
+        with self._lock:
+            segments = []
+            if transcript_store is not None:
+                segments = transcript_store.since(self._transcript_seq)
+                self._transcript_seq = transcript_store.next_seq
+            added = screen_delta.added if screen_delta is not None else ()
+
+            self.observations += 1
+            self._pending += self.score(segments, added).score
+            if self._pending < self.threshold:
+                self.suppressed_threshold += 1
+                return False
+
+            now = self.clock() if now is None else now
+            if self._last_fired is not None and now - self._last_fired < self.refractory_seconds:
+                # La novedad se conserva y flush() la dispara al terminar el periodo refractario
+                self.suppressed_refractory += 1
+                return False
+
+            self._fire(now)
+            return True
+
+    def flush(self, now: float = None) -> bool:
+        """Sin nada nuevo: disparar la novedad retenida si ya terminó el periodo refractario"""
+        with self._lock:
+            if self._pending < self.threshold:
+                return False
+            now = self.clock() if now is None else now
+            if self._last_fired is not None and now - self._last_fired < self.refractory_seconds:
+                return False
+            self._fire(now)
+            return True
+
+    def mark_fired(self, now: float = None):
+        """Registrar una sugerencia pedida manualmente (reinicia la novedad acumulada)"""
+        with self._lock:
+            self._pending = 0.0
+            self._last_fired = self.clock() if now is None else now
+
+    def _fire(self, now: float):
+        self._pending = 0.0
+        self._last_fired = now
+        self.fired += 1
+
+    def reset(self, transcript_seq: int = 0):
+        with self._lock:
+            self._vocabulary.clear()
+            self._lines.clear()
+            self._transcript_seq = transcript_seq
+            self._pending = 0.0
+            self._last_fired = None
+            self._started = self.clock()
+
+    def get_stats(self) -> dict:
+        """Tasa de disparo y disparos suprimidos"""
+        elapsed = max(self.clock() - self._started, 1e-9)
+        return {
+            'observations': self.observations,
+            'fired': self.fired,
+            'fire_rate_per_minute': self.fired * 60.0 / elapsed,
+            'suppressed_threshold': self.suppressed_threshold,
+            'suppressed_refractory': self.suppressed_refractory,
+            'pending_score': self._pending
+        }
@@ -0,0 +1,42 @@
+"""
+OCR Engine - Motor de OCR fuera del hilo de la GUI
+Ejecuta el reconocimiento en un pool de procesos para no bloquear el overlay
+"""
+import logging
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _tesseract_recognize(pixels: bytes, width: int, height: int, lang: str) -> str:
+    """Reconocer texto de una imagen en escala de grises (se ejecuta en el proceso worker)"""
+    import pytesseract
+    from PIL import Image
+
+    image = Image.frombytes('L', (width, height), pixels)
+    return pytesseract.image_to_string(image, lang=lang)
+
+
+class OCREngine:
+    def __init__(self, max_workers=1, lang='spa'):
+        self.max_workers = max_workers
+        self.lang = lang
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Crear el pool de forma perezosa: en modo mock nunca se lanzan procesos
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"OCR Engine: pool de {self.max_workers} proceso(s) iniciado")
+        return self._executor
+
+    def submit(self, pixels: bytes, width: int, height: int) -> Future:
+        """Enviar una imagen en escala de grises al pool de OCR"""
+        return self._get_executor().submit(_tesseract_recognize, pixels, width, height, self.lang)
+
+    def shutdown(self):
+        """Detener el pool de procesos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
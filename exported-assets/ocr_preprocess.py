@@ -0,0 +1,101 @@
+"""
+OCR Preprocess - Preprocesado vectorizado de frames antes del OCR
+Escala de grises, reducción por área, normalización de contraste y
+binarización (Otsu) con NumPy sobre buffers preasignados y reutilizados
+"""
+import numpy as np
+
+# Pesos BT.601 en punto fijo (suman 256)
+_WEIGHTS = (77, 150, 29)
+
+
+class FramePreprocessor:
+    def __init__(self, target_width=1920, clip_percent=1.0, binarize=True):
+        self.target_width = target_width  # Frames más anchos se reducen por un factor entero
+        self.clip_percent = clip_percent  # Percentil recortado en cada extremo al estirar contraste
+        self.binarize = binarize
+
+        self._shape = None
+        self._levels = np.arange(256, dtype=np.float32)
+
+    def _allocate(self, height: int, width: int):
+        """Reservar buffers para un tamaño de entrada (solo cuando cambia la resolución)"""
+        self._shape = (height, width)
+        self.factor = max(1, width // self.target_width)
+        f = self.factor
+        self.out_height, self.out_width = height // f, width // f
+
+        self._acc = np.empty((height, width), dtype=np.uint16)
+        self._tmp = np.empty((height, width), dtype=np.uint16)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._small16 = np.empty((self.out_height, self.out_width), dtype=np.uint16)
+        self._small = np.empty((self.out_height, self.out_width), dtype=np.uint8)
+        self._output = np.empty((self.out_height, self.out_width), dtype=np.uint8)
+        self._lut = np.empty(256, dtype=np.uint8)
+
+    def _grayscale(self, rgb: np.ndarray) -> np.ndarray:
+        """RGB(A) uint8 → gris uint8 en punto fijo, sin temporales"""
+        acc, tmp = self._acc, self._tmp
+        np.multiply(rgb[..., 0], _WEIGHTS[0], out=acc, dtype=np.uint16)
+        np.multiply(rgb[..., 1], _WEIGHTS[1], out=tmp, dtype=np.uint16)
+        np.add(acc, tmp, out=acc)
+        np.multiply(rgb[..., 2], _WEIGHTS[2], out=tmp, dtype=np.uint16)
+        np.add(acc, tmp, out=acc)
+        np.right_shift(acc, 8, out=acc)
+        np.copyto(self._gray, acc, casting='unsafe')
+        return self._gray
+
+    def _downscale(self, gray: np.ndarray) -> np.ndarray:
+        """Reducción por media de bloques f x f"""
+        f = self.factor
+        if f == 1:
+            return gray
+        h, w = self.out_height, self.out_width
+        # Sumar las f*f sub-rejillas con vistas estridadas (más rápido que reshape + sum)
+        self._small16.fill(0)
+        for dy in range(f):
+            for dx in range(f):
+                np.add(self._small16, gray[dy:h * f:f, dx:w * f:f], out=self._small16)
+        np.floor_divide(self._small16, f * f, out=self._small16)
+        np.copyto(self._small, self._small16, casting='unsafe')
+        return self._small
+
+    def _build_lut(self, histogram: np.ndarray) -> np.ndarray:
+        """Tabla de 256 entradas: estiramiento de contraste y, opcionalmente, umbral de Otsu"""
+        total = histogram.sum()
+        cumulative = np.cumsum(histogram)
+        clip = total * self.clip_percent / 100
+        low = int(np.searchsorted(cumulative, clip, side='right'))
+        high = int(np.searchsorted(cumulative, total - clip, side='left'))
+        if high <= low:
+            low, high = 0, 255
+
+        stretched = np.clip((self._levels - low) * (255.0 / (high - low)), 0, 255)
+
+        if self.binarize:
+            # Otsu sobre el histograma ya estirado (sin segunda pasada por la imagen)
+            mapped = np.bincount(stretched.astype(np.uint8), weights=histogram, minlength=256)
+            weight_bg = np.cumsum(mapped)
+            weight_fg = total - weight_bg
+            mass_bg = np.cumsum(mapped * self._levels)
+            mean_bg = mass_bg / np.maximum(weight_bg, 1)
+            mean_fg = (mass_bg[-1] - mass_bg) / np.maximum(weight_fg, 1)
+            variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+            threshold = int(np.argmax(variance))
+            np.copyto(self._lut, np.where(stretched > threshold, 255, 0), casting='unsafe')
+        else:
+            np.copyto(self._lut, stretched, casting='unsafe')
+
+        return self._lut
+
+    def process(self, rgb: np.ndarray) -> np.ndarray:
+        """Procesar un frame RGB(A) HxWxC; el resultado reutiliza un buffer interno"""
+        height, width = rgb.shape[:2]
+        if self._shape != (height, width):
+            self._allocate(height, width)
+
+        gray = self._grayscale(rgb)
+        small = self._downscale(gray)
+        histogram = np.bincount(small.ravel(), minlength=256)
+        np.take(self._build_lut(histogram), small, out=self._output)
+        return self._output
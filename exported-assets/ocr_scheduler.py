@@ -0,0 +1,76 @@
+"""
+OCR Scheduler - Planificador adaptativo de capturas de pantalla
+Retrocede exponencialmente mientras la pantalla está estable, vuelve a
+muestreo rápido tras un cambio y respeta un presupuesto de CPU
+"""
+import time
+from typing import Optional
+
+
+class AdaptiveCaptureScheduler:
+    def __init__(self, base_interval=2.0, min_interval=0.5, max_interval=8.0,
+                 backoff=1.5, cpu_budget=0.10, smoothing=0.2):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff  # Factor de retroceso por captura sin cambios
+        self.cpu_budget = cpu_budget  # Fracción máxima de tiempo dedicada a capturar
+        self.smoothing = smoothing  # Peso de la última muestra en las medias móviles
+
+        self.current_interval = min(max(base_interval, min_interval), max_interval)
+        self.next_capture_time = 0.0
+
+        # Métricas
+        self.captures = 0
+        self.changes = 0
+        self.change_rate = 0.0  # Media móvil de capturas con cambios (0-1)
+        self.avg_capture_seconds: Optional[float] = None
+        self.last_capture_seconds = 0.0
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """¿Toca capturar?"""
+        return (now if now is not None else time.time()) >= self.next_capture_time
+
+    def record(self, changed: bool, duration: float, now: Optional[float] = None):
+        """Registrar el resultado de una captura y planificar la siguiente"""
+        now = now if now is not None else time.time()
+        self.captures += 1
+        self.last_capture_seconds = duration
+
+        if self.avg_capture_seconds is None:
+            self.avg_capture_seconds = duration
+        else:
+            self.avg_capture_seconds += (duration - self.avg_capture_seconds) * self.smoothing
+        self.change_rate += (float(changed) - self.change_rate) * self.smoothing
+
+        if changed:
+            # Tras un cambio suelen venir más (scroll, escritura): muestrear rápido
+            self.changes += 1
+            interval = self.min_interval
+        else:
+            interval = min(self.current_interval * self.backoff, self.max_interval)
+
+        # Presupuesto de CPU: coste medio / intervalo <= cpu_budget
+        if self.cpu_budget > 0:
+            interval = max(interval, self.avg_capture_seconds / self.cpu_budget)
+
+        self.current_interval = interval
+        self.next_capture_time = now + interval
+
+    def reset(self):
+        """Volver a muestreo rápido (p.ej. al empezar a grabar)"""
+        self.current_interval = self.min_interval
+        self.next_capture_time = 0.0
+
+    def get_stats(self) -> dict:
+        """Intervalo actual, tasa de cambio y coste por captura"""
+        avg = self.avg_capture_seconds or 0.0
+        return {
+            'capture_interval': self.current_interval,
+            'change_rate': self.change_rate,
+            'captures': self.captures,
+            'changes': self.changes,
+            'avg_capture_ms': avg * 1000,
+            'last_capture_ms': self.last_capture_seconds * 1000,
+            'cpu_usage': avg / self.current_interval if self.current_interval else 0.0,
+            'cpu_budget': self.cpu_budget
+        }
@@ -3,8 +3,9 @@ Overlay Window - Ventana flotante invisible para sugerencias
 """
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTextEdit, QFrame, QApplication
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QPropertyAnimation, QRect
-from PyQt5.QtGui import QFont, QPalette, QColor
+from PyQt5.QtGui import QFont, QPalette, QColor, QTextCursor
 import platform
+import tracing
 
 class OverlayWindow(QWidget):
     suggestion_requested = pyqtSignal(str)
@@ -16,6 +17,13 @@ class OverlayWindow(QWidget):
         self.setup_animations()
         self.is_minimized = False
 
+        # Streaming: los fragmentos se acumulan y se pintan como mucho una vez por frame
+        self.render_interval_ms = 16
+        self._pending_deltas = []
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.timeout.connect(self._flush_deltas)
+
     def setup_window(self):
         """Configurar ventana para ser overlay invisible"""
         # Configuración básica de ventana
@@ -161,6 +169,40 @@ class OverlayWindow(QWidget):
         cursor.movePosition(cursor.End)
         self.suggestion_area.setTextCursor(cursor)
 
+    def begin_suggestion(self):
+        """Preparar el área para una sugerencia en streaming"""
+        self._pending_deltas.clear()
+        self._render_timer.stop()
+        self.suggestion_area.clear()
+        self.flash_overlay()
+
+    def append_suggestion_delta(self, delta):
+        """Encolar un fragmento de texto; el render se agrupa con un temporizador"""
+        self._pending_deltas.append(delta)
+        if not self._render_timer.isActive():
+            self._render_timer.start(self.render_interval_ms)
+
+    def end_suggestion(self):
+        """Pintar lo que quede pendiente al terminar el streaming"""
+        self._render_timer.stop()
+        self._flush_deltas()
+
+    def _flush_deltas(self):
+        """Insertar de una vez los fragmentos acumulados al final del QTextDocument"""
+        if not self._pending_deltas:
+            return
+        text = "".join(self._pending_deltas)
+        self._pending_deltas.clear()
+
+        with tracing.span('overlay.render'):
+            cursor = QTextCursor(self.suggestion_area.document())
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(text)
+
+            # Auto-scroll al final
+            scrollbar = self.suggestion_area.verticalScrollBar()
+            scrollbar.setValue(scrollbar.maximum())
+
     def flash_overlay(self):
         """Efecto de flash para nueva sugerencia"""
         original_style = self.styleSheet()
@@ -0,0 +1,276 @@
+"""
+PII Redactor - Anonimización del contexto antes de enviarlo al LLM
+Un único patrón compilado (emails, IBAN, tarjetas, teléfonos y términos
+propios) sustituye cada dato por un marcador estable como [EMAIL_1]; la
+correspondencia se queda en local para restaurar la sugerencia, también
+fragmento a fragmento durante el streaming
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Union
+
+EMAIL = 'EMAIL'
+IBAN = 'IBAN'
+CARD = 'TARJETA'
+PHONE = 'TELEFONO'
+TERM = 'TERMINO'
+
+_PLACEHOLDER = re.compile(r'\[[A-Z_]+_\d+\]')
+_CANDIDATE = re.compile(r'[\d@]')  # Emails, IBAN, tarjetas y teléfonos tienen @ o dígitos
+_LOCAL_PART = frozenset('._+-')
+_STEP = 4096
+
+# Cada alternativa empieza por un carácter de un conjunto pequeño que el patrón
+# consume primero: re salta en C las posiciones que no pueden iniciar un dato en
+# lugar de probar todas las alternativas en cada carácter. Cada alternativa
+# comprueba su carácter inicial y sus aserciones miran dos posiciones atrás.
+# Los emails se anclan en la @ y la parte local se recupera hacia atrás al
+# sustituir, sin invadir el dato anterior.
+# (nombre, carácter inicial, resto)
+_PATTERNS = (
+    ('email', '@', r'(?<=[\w.+-]@)[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}\b'),
+    ('iban', 'A-Z', r'(?<!\w[A-Z])[A-Z]\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,3})?\b'),
+    ('card', r'\d', r'(?<![\w+]\d)(?:[ -]?\d){12,18}(?!\w)'),
+    ('phone', r'\d+', r'(?<![\w+][\d+])(?:(?<=\+)\d|(?<=\d))[\d .-]{7,17}\d(?!\w)'),
+)
+
+
+def placeholders(text: str) -> set:
+    """Marcadores presentes en un texto anonimizado"""
+    return set(_PLACEHOLDER.findall(text))
+
+
+def luhn_valid(digits: str) -> bool:
+    """Dígito de control de tarjetas (Luhn)"""
+    total = 0
+    for position, char in enumerate(reversed(digits)):
+        value = ord(char) - 48
+        if position & 1:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return total % 10 == 0
+
+
+def iban_valid(iban: str) -> bool:
+    """Control mod 97 del IBAN"""
+    iban = iban.replace(' ', '')
+    rearranged = iban[4:] + iban[:4]
+    return int(''.join(str(int(char, 36)) for char in rearranged)) % 97 == 1
+
+
+def phone_valid(text: str) -> bool:
+    """Internacional (+, 9-15 dígitos) o nacional de 9 dígitos que empieza por 6-9.
+    Sin prefijo no se aceptan puntos: 600.000.000 suele ser un importe"""
+    digits = sum(char.isdigit() for char in text)
+    if text.startswith('+'):
+        return 9 <= digits <= 15
+    return digits == 9 and text[0] in '6789' and '.' not in text
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Longitud del prefijo común: se comparan bloques y se afina con búsqueda binaria"""
+    limit = min(len(a), len(b))
+    length = 0
+    while length < limit:
+        step = min(_STEP, limit - length)
+        if a[length:length + step] != b[length:length + step]:
+            break
+        length += step
+    low, high = length, min(length + _STEP, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[length:middle] == b[length:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    """Longitud del sufijo común, como mucho limit caracteres"""
+    end_a, end_b = len(a), len(b)
+    length = 0
+    while length < limit:
+        step = min(_STEP, limit - length)
+        if a[end_a - length - step:end_a - length] != b[end_b - length - step:end_b - length]:
+            break
+        length += step
+    low, high = length, min(length + _STEP, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[end_a - middle:end_a - length] == b[end_b - middle:end_b - length]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class PIIRedactor:
+    """Sustituye datos personales por marcadores reversibles con un solo regex"""
+
+    def __init__(self, terms: Union[Iterable[str], Dict[str, str], None] = None, max_lines=4096):
+        # Términos propios (nombres, clientes...): lista o {término: etiqueta}
+        if isinstance(terms, dict):
+            self.terms = {term.lower(): re.sub(r'[^A-Z_]', '', label.upper()) or TERM
+                          for term, label in terms.items() if term}
+        else:
+            self.terms = {term.lower(): TERM for term in (terms or ()) if term}
+        # Un marcador más corto que esto puede estar a medias al final de un fragmento
+        self.max_placeholder = max(map(len, [EMAIL, IBAN, CARD, PHONE, TERM, *self.terms.values()])) + 12
+
+        leads = ''.join(lead for _, lead, _ in _PATTERNS)
+        branches = [f'(?P<{name}>(?<=[{lead}]){rest})' for name, lead, rest in _PATTERNS]
+        if self.terms:
+            ordered = sorted(self.terms, key=len, reverse=True)
+            leads += re.escape(''.join({char for term in ordered for char in (term[0], term[0].upper())}))
+            alternatives = '|'.join(f'(?<={re.escape(term[0])}){re.escape(term[1:])}' for term in ordered)
+            branches.append(f'(?P<term>(?<!\\w.)(?i:{alternatives})(?!\\w))')
+        self.pattern = re.compile(f"[{leads}](?:{'|'.join(branches)})")
+
+        self._lock = threading.Lock()
+        self._placeholders: Dict[str, str] = {}  # valor -> marcador
+        self._values: Dict[str, str] = {}  # marcador -> valor
+        self._next: Dict[str, int] = {}
+
+        # Las líneas se repiten de un tick al siguiente: se memoriza su versión anonimizada
+        self.max_lines = max_lines
+        self._lines: OrderedDict = OrderedDict()
+
+        # Último contexto y sus líneas anonimizadas (el siguiente tick suele compartir casi todo)
+        self._previous = ''
+        self._previous_out = ['']
+        self._previous_redacted = ''
+
+        self.stats = {'calls': 0, 'lines_reused': 0, 'lines_cached': 0, 'lines_scanned': 0,
+                      'redactions': {}}
+
+    def _kind(self, group: str, text: str) -> Optional[str]:
+        if group == 'email':
+            return EMAIL
+        if group == 'iban':
+            return IBAN if iban_valid(text) else None
+        if group == 'card':
+            return CARD if luhn_valid(text.replace(' ', '').replace('-', '')) else None
+        if group == 'phone':
+            return PHONE if phone_valid(text) else None
+        return self.terms.get(text.lower())
+
+    def _placeholder(self, kind: str, value: str, key: str) -> str:
+        placeholder = self._placeholders.get(key)
+        if placeholder is None:
+            number = self._next.get(kind, 0) + 1
+            self._next[kind] = number
+            placeholder = self._placeholders[key] = f"[{kind}_{number}]"
+            self._values[placeholder] = value
+        redactions = self.stats['redactions']
+        redactions[kind] = redactions.get(kind, 0) + 1
+        return placeholder
+
+    def sub(self, line: str) -> str:
+        """Sustituir los datos de una línea (sin memoria ni reutilización)"""
+        pieces = []
+        last = 0
+        for match in self.pattern.finditer(line):
+            start, end = match.span()
+            kind = self._kind(match.lastgroup, line[start:end])
+            if kind is None:
+                continue
+            if kind == EMAIL:
+                # Parte local del email: hacia atrás desde la @, sin invadir el dato anterior
+                while start > last and (line[start - 1].isalnum() or line[start - 1] in _LOCAL_PART):
+                    start -= 1
+                while line[start] in '.+-':
+                    start += 1
+                if line[start] == '@':
+                    continue
+            value = line[start:end]
+            # Misma clave para variantes de mayúsculas de un email o término
+            key = value.lower() if match.lastgroup in ('email', 'term') else value
+            pieces.append(line[last:start])
+            pieces.append(self._placeholder(kind, value, key))
+            last = end
+        if not pieces:
+            return line
+        pieces.append(line[last:])
+        return ''.join(pieces)
+
+    def _redact_line(self, line: str) -> str:
+        redacted = self._lines.get(line)
+        if redacted is not None:
+            self._lines.move_to_end(line)
+            self.stats['lines_cached'] += 1
+            return redacted
+        self.stats['lines_scanned'] += 1
+        if self.terms or _CANDIDATE.search(line):
+            redacted = self.sub(line)
+        else:
+            redacted = line  # Sin dígitos ni @ solo podría haber términos propios
+        self._lines[line] = redacted
+        if len(self._lines) > self.max_lines:
+            self._lines.popitem(last=False)
+        return redacted
+
+    def redact(self, text: str) -> str:
+        """Anonimizar un texto; entre ticks solo se vuelven a analizar las líneas que cambian"""
+        with self._lock:
+            self.stats['calls'] += 1
+            previous, out = self._previous, self._previous_out
+            if text == previous:
+                return self._previous_redacted
+
+            # Las líneas iguales al principio y al final del contexto anterior se reutilizan
+            common = _common_prefix(previous, text)
+            start = text.rfind('\n', 0, common) + 1
+            kept = text.count('\n', 0, start)
+            tail = _common_suffix(previous, text, min(len(previous), len(text)) - start)
+            end = text.find('\n', len(text) - tail) if tail else -1
+            reused = text.count('\n', end) if end != -1 else 0
+
+            middle = [self._redact_line(line)
+                      for line in text[start:end if end != -1 else len(text)].split('\n')]
+            out = out[:kept] + middle + (out[len(out) - reused:] if reused else [])
+            self.stats['lines_reused'] += kept + reused
+            self._previous, self._previous_out = text, out
+            self._previous_redacted = '\n'.join(out)
+            return self._previous_redacted
+
+    def restore(self, text: str) -> str:
+        """Volver a poner los datos originales en un texto con marcadores"""
+        if '[' not in text:
+            return text
+        values = self._values
+        return _PLACEHOLDER.sub(lambda match: values.get(match.group(), match.group()), text)
+
+    def restorer(self) -> 'StreamRestorer':
+        return StreamRestorer(self)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, redactions=dict(self.stats['redactions']))
+            stats['values'] = len(self._values)
+            return stats
+
+
+class StreamRestorer:
+    """Restaura un stream de fragmentos; retiene un marcador partido entre dos fragmentos"""
+
+    def __init__(self, redactor: PIIRedactor):
+        self.redactor = redactor
+        self._pending = ''
+
+    def feed(self, delta: str) -> str:
+        text = self._pending + delta
+        start = text.rfind('[')
+        if start != -1 and ']' not in text[start:] and len(text) - start < self.redactor.max_placeholder:
+            self._pending = text[start:]
+            text = text[:start]
+        else:
+            self._pending = ''
+        return self.redactor.restore(text)
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ''
+        return self.redactor.restore(text)
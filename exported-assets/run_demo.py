@@ -18,6 +18,12 @@ def check_requirements():
         return False
 
 def main():
+    if '--headless' in sys.argv:
+        # Sin interfaz: no requiere PyQt5 ni keyboard
+        from cli import main as cli_main
+        cli_main([arg for arg in sys.argv[1:] if arg != '--headless'] or ['--mock-seconds', '30'])
+        return
+
     print("🚀 Iniciando Cluely Clone en modo DEMO")
     print("=" * 50)
 
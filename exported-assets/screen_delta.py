@@ -0,0 +1,83 @@
+"""
+Screen Delta - Cambios de texto en pantalla a nivel de línea
+Cada línea se identifica por un hash estable; el estado de pantalla es un
+conjunto ordenado y deduplicado que se compara en O(líneas) con otro estado
+"""
+import hashlib
+from typing import Dict, List, Optional
+
+
+def normalize_line(line: str) -> str:
+    """Normalizar espacios para que el ruido de OCR no cambie la identidad de la línea"""
+    return " ".join(line.split())
+
+
+def line_id(line: str) -> int:
+    """ID de 64 bits estable entre ejecuciones para una línea normalizada"""
+    return int.from_bytes(hashlib.blake2b(line.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ScreenState:
+    """Líneas únicas de la pantalla en orden de aparición, indexadas por ID"""
+    __slots__ = ('version', 'lines', '_text')
+
+    def __init__(self, lines: Optional[Dict[int, str]] = None, version: int = 0):
+        self.version = version
+        self.lines: Dict[int, str] = lines or {}
+        self._text: Optional[str] = None
+
+    @classmethod
+    def from_text(cls, text: str, version: int = 0) -> 'ScreenState':
+        """Construir estado deduplicado a partir del texto OCR"""
+        lines = {}
+        for raw in text.splitlines():
+            line = normalize_line(raw)
+            if line:
+                lines.setdefault(line_id(line), line)
+        return cls(lines, version)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(self.lines.values())
+        return self._text
+
+    def __len__(self):
+        return len(self.lines)
+
+    def same_lines(self, other: 'ScreenState') -> bool:
+        return self.lines.keys() == other.lines.keys()
+
+    def diff(self, previous: 'ScreenState', timestamp: Optional[float] = None) -> 'ScreenDelta':
+        """Calcular líneas añadidas, eliminadas y sin cambios respecto a previous"""
+        added = [line for key, line in self.lines.items() if key not in previous.lines]
+        removed = [line for key, line in previous.lines.items() if key not in self.lines]
+        unchanged = [line for key, line in self.lines.items() if key in previous.lines]
+        return ScreenDelta(added, removed, unchanged, self, previous.version, timestamp)
+
+
+class ScreenDelta:
+    """Diferencia entre dos estados de pantalla"""
+    __slots__ = ('added', 'removed', 'unchanged', 'state', 'base_version', 'timestamp')
+
+    def __init__(self, added: List[str], removed: List[str], unchanged: List[str],
+                 state: ScreenState, base_version: int, timestamp: Optional[float] = None):
+        self.added = added
+        self.removed = removed
+        self.unchanged = unchanged
+        self.state = state
+        self.base_version = base_version
+        self.timestamp = timestamp  # Hora de la captura (reloj del servicio OCR)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed)
+
+    def to_dict(self) -> dict:
+        return {
+            'version': self.state.version,
+            'base_version': self.base_version,
+            'added': self.added,
+            'removed': self.removed,
+            'unchanged': len(self.unchanged)
+        }
@@ -0,0 +1,611 @@
+"""
+Session Database - Almacén persistente de sesiones en SQLite (WAL + FTS5)
+Un hilo escritor agrupa las escrituras en commits por lotes; quien graba
+solo encola en memoria y nunca espera al disco. FTS5 indexa transcripción,
+texto de pantalla, sugerencias y notas para buscar en meses de reuniones.
+Las entradas se reparten en particiones por franja de tiempo: la retención
+borra particiones enteras (DROP TABLE), nunca fila a fila. Con cifrado, el
+texto va a un fichero cifrado por partición y SQLite solo guarda su posición
+y un índice ciego (HMAC de cada palabra)
+"""
+import base64
+import bisect
+import functools
+import hashlib
+import hmac
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from event_bus import EventBus, DROP_OLDEST, SCREEN_DELTA, TRANSCRIPT_SEGMENT
+from clock import SYSTEM_CLOCK
+from encrypted_store import ChunkedCipherFile, IntegrityError
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT = 'transcript'
+SCREEN = 'screen'
+SUGGESTION = 'suggestion'
+NOTE = 'note'
+KINDS = (TRANSCRIPT, SCREEN, SUGGESTION, NOTE)
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY,
+        started REAL NOT NULL,
+        ended REAL,
+        title TEXT
+    )""",
+    # Registro de particiones: una por franja [start, end)
+    """CREATE TABLE IF NOT EXISTS partitions (
+        bucket INTEGER PRIMARY KEY,
+        start REAL NOT NULL,
+        end REAL NOT NULL
+    )""",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+)
+
+PARTITION_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL,
+        timestamp REAL NOT NULL,
+        kind TEXT NOT NULL,
+        text TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS {name}_session ON {name}(session_id, timestamp)",
+    # Índice de contenido externo: el texto vive una sola vez, en la partición
+    """CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5(
+        text, content='{name}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )"""
+)
+
+# Cifrado: el texto está en {name}.enc (offset, length) y el índice FTS5 no guarda
+# contenido ni posiciones (detail=none). Cada palabra se indexa como su HMAC con
+# una clave derivada de la de datos: sin la clave no se leen los términos, pero
+# sí se ve qué entradas comparten una palabra y cuántas palabras distintas hay
+ENCRYPTED_PARTITION_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        session_id INTEGER NOT NULL,
+        timestamp REAL NOT NULL,
+        kind TEXT NOT NULL,
+        offset INTEGER NOT NULL,
+        length INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS {name}_session ON {name}(session_id, timestamp)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5(text, content='', detail=none)"
+)
+
+_WORD = re.compile(r'\w+')
+
+
+def fts_query(text: str) -> str:
+    """Convertir texto libre en una consulta FTS5 (todas las palabras, sin operadores)"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def has_encrypted_data(path: str) -> bool:
+    """La base de datos existe, está marcada como cifrada y tiene particiones"""
+    if not os.path.exists(path):
+        return False
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'encrypted'").fetchone()
+            return bool(row and row[0] == '1'
+                        and connection.execute("SELECT 1 FROM partitions LIMIT 1").fetchone())
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return False
+
+
+def key_check(key: bytes) -> str:
+    """Huella de la clave guardada en meta para detectar una clave equivocada al abrir"""
+    return hmac.new(key, b'cluely-key-check', hashlib.sha256).hexdigest()[:32]
+
+
+def index_terms(text: str) -> List[str]:
+    """Palabras en minúsculas y sin tildes, como las separa unicode61 remove_diacritics"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return _WORD.findall("".join(ch for ch in text if not unicodedata.combining(ch)))
+
+
+def partition_name(bucket: int) -> str:
+    return f"entries_p{bucket}"
+
+
+def make_snippet(text: str, query: str, width=60) -> str:
+    """Fragmento alrededor del primer término (snippet() no funciona sin contenido en FTS5)"""
+    for term in query.split():
+        match = re.search(re.escape(term), text, re.IGNORECASE)
+        if match:
+            start = max(0, match.start() - width // 2)
+            end = min(len(text), match.end() + width // 2)
+            return ('…' if start else '') + text[start:match.start()] + f"[{match.group()}]" + \
+                text[match.end():end] + ('…' if end < len(text) else '')
+    return text[:width]
+
+
+class SessionDatabase:
+    def __init__(self, path='sessions.db', flush_interval=0.5, batch_size=2000, max_pending=10000,
+                 store_transcripts=True, retention_hours: Optional[float] = None,
+                 partition_hours: Optional[float] = None, sweep_interval=30.0, max_drops_per_sweep=4,
+                 vacuum_pages_per_sweep=2048, encryption_key: Optional[bytes] = None, clock=SYSTEM_CLOCK):
+        self.path = path
+        self.flush_interval = flush_interval  # Latencia máxima de un commit agrupado
+        self.batch_size = batch_size  # Filas por transacción (acota la duración de cada commit)
+        self.max_pending = max_pending  # Tope de la cola en memoria (se descarta lo más antiguo)
+        self.store_transcripts = store_transcripts  # Guardar transcripción y pantalla (privacidad)
+        self.clock = clock
+
+        # Retención: None o 0 = conservar siempre. Particiones de ~1/24 de la retención
+        # (un día si no hay retención) para que el número de tablas no crezca con el historial
+        self.retention_hours = retention_hours or None
+        if partition_hours is None:
+            partition_hours = max(1.0, self.retention_hours / 24) if self.retention_hours else 24.0
+        self.partition_seconds = partition_hours * 3600
+        self.sweep_interval = sweep_interval
+        self.max_drops_per_sweep = max_drops_per_sweep  # E/S acotada por ciclo del barrido
+        self.vacuum_pages_per_sweep = vacuum_pages_per_sweep
+        self._next_sweep = 0.0
+
+        self._connection = self._connect()
+        for statement in SCHEMA:
+            self._connection.execute(statement)
+        self._connection.commit()
+        self._check_encryption(encryption_key)
+        self.encryption_key = encryption_key
+        self.log_dir = f"{path}.d"  # Ficheros cifrados de cada partición
+        self._logs: Dict[int, ChunkedCipherFile] = {}
+        self._logs_lock = threading.Lock()
+        self._partitions = {row[0] for row in self._connection.execute("SELECT bucket FROM partitions")}
+        if encryption_key:
+            # Las páginas liberadas (particiones borradas, índices reconstruidos) se sobrescriben
+            self._connection.execute("PRAGMA secure_delete=ON")
+            index_key = hmac.new(encryption_key, b'cluely-fts-blind-index', hashlib.sha256).digest()
+            self._blind_term = functools.lru_cache(maxsize=65536)(
+                lambda term: base64.b32encode(
+                    hmac.new(index_key, term.encode('utf-8'), hashlib.sha256).digest()[:10]).decode().lower())
+        # Un solo proceso escribe: los ids de sesión se asignan en memoria, sin leer el disco
+        row = self._connection.execute("SELECT COALESCE(MAX(id), 0) FROM sessions").fetchone()
+        self._last_session_id = row[0]
+
+        # Las escrituras pasan por memoria: bus (ASR/OCR) y cola propia (sugerencias, notas)
+        self.subscription = None
+        self._pending = deque(maxlen=max_pending)
+        self._readers = threading.local()
+        self._reader_connections: List[sqlite3.Connection] = []
+
+        self.session_id: Optional[int] = None
+        # Cambios de sesión con la hora del bus (time.monotonic): un evento se asigna a la
+        # sesión activa cuando se publicó, no a la activa cuando el escritor lo vacía
+        self._timeline: deque = deque([(float('-inf'), None)], maxlen=256)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._condition = threading.Condition()
+        self._rounds_started = 0
+        self._rounds_done = 0
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'written': 0, 'commits': 0, 'dropped': 0, 'max_batch': 0, 'commit_ms': 0.0,
+                      'partitions_dropped': 0, 'sweep_max_ms': 0.0}
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False: la conexión se crea aquí pero solo la usa un hilo a la vez
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        # Solo tiene efecto en bases nuevas (antes de WAL): permite devolver páginas libres poco a poco
+        connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.execute("PRAGMA journal_mode=WAL")
+        # En WAL, NORMAL solo arriesga el último commit ante un corte de luz, nunca corrompe
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _check_encryption(self, key: Optional[bytes]):
+        """Nunca mezclar: una base en claro no se abre cifrada ni al revés, ni con otra clave"""
+        connection = self._connection
+        encrypted = key is not None
+        row = connection.execute("SELECT value FROM meta WHERE key = 'encrypted'").fetchone()
+        if row is None:
+            # Base nueva: queda marcada con el modo con el que se crea
+            stored = encrypted
+            with connection:
+                connection.execute("INSERT INTO meta (key, value) VALUES ('encrypted', ?)", (str(int(stored)),))
+        else:
+            stored = row[0] == '1'
+        if stored != encrypted:
+            state = "cifrada" if stored else "sin cifrar"
+            raise RuntimeError(f"La base de datos {self.path} está {state}; usa otra ruta o ajusta privacy.encrypt_data")
+        if encrypted:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'key_check'").fetchone()
+            if row is None:
+                with connection:
+                    connection.execute("INSERT INTO meta (key, value) VALUES ('key_check', ?)", (key_check(key),))
+            elif not hmac.compare_digest(row[0], key_check(key)):
+                raise RuntimeError(f"La clave de cifrado no corresponde a la base de datos {self.path}")
+
+    def _blind(self, text: str) -> List[str]:
+        """Índice ciego: HMAC de cada palabra (el mismo al escribir y al buscar)"""
+        return [self._blind_term(term) for term in index_terms(text)]
+
+    def attach(self, bus: EventBus):
+        """Suscribirse a los segmentos de ASR y a los cambios de pantalla"""
+        if not self.store_transcripts or self.subscription is not None:
+            return
+        # DROP_OLDEST: si el disco se queda atrás se pierde historia, nunca se bloquea al ASR
+        self.subscription = bus.subscribe((TRANSCRIPT_SEGMENT, SCREEN_DELTA),
+                                          maxsize=self.max_pending, policy=DROP_OLDEST)
+
+    def start(self):
+        """Arrancar el hilo escritor (que también ejecuta el barrido de retención)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='session-db-writer', daemon=True)
+        self._thread.start()
+
+    def begin_session(self, title: Optional[str] = None, started: Optional[float] = None) -> int:
+        """Abrir una sesión nueva; las entradas siguientes quedan asociadas a ella"""
+        started = self.clock.time() if started is None else started
+        self._last_session_id += 1
+        self.session_id = self._last_session_id
+        self._timeline.append((time.monotonic(), self.session_id))
+        self._enqueue(('begin', self.session_id, started, title))
+        return self.session_id
+
+    def end_session(self, ended: Optional[float] = None):
+        if self.session_id is None:
+            return
+        self._enqueue(('end', self.session_id, self.clock.time() if ended is None else ended))
+        self.session_id = None
+        self._timeline.append((time.monotonic(), None))
+
+    def record(self, kind: str, text: str, timestamp: Optional[float] = None):
+        """Encolar una entrada (O(1), sin E/S)"""
+        if not text or self.session_id is None:
+            return
+        if kind in (TRANSCRIPT, SCREEN) and not self.store_transcripts:
+            return
+        self._enqueue(('entry', self.session_id, self.clock.time() if timestamp is None else timestamp,
+                       kind, text))
+
+    def add_note(self, text: str, timestamp: Optional[float] = None):
+        self.record(NOTE, text, timestamp)
+        self._wake.set()  # Las notas manuales se escriben sin esperar al siguiente lote
+
+    def _enqueue(self, item: tuple):
+        if len(self._pending) == self.max_pending:
+            self.stats['dropped'] += 1
+        self._pending.append(item)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write_round()
+            if self.retention_hours and self.clock.monotonic() >= self._next_sweep:
+                self._next_sweep = self.clock.monotonic() + self.sweep_interval
+                self._safe_sweep()
+        self._write_round()
+
+    def _collect(self) -> List[tuple]:
+        items = []
+        while self._pending:
+            items.append(self._pending.popleft())
+        if self.subscription is not None:
+            now = self.clock.time()
+            timeline = list(self._timeline)
+            starts = [start for start, _ in timeline]
+            for event in self.subscription.drain():
+                session_id = timeline[max(bisect.bisect_right(starts, event.published_at) - 1, 0)][1]
+                if session_id is None:
+                    continue
+                if event.topic == TRANSCRIPT_SEGMENT:
+                    entry = event.payload['entry']
+                    items.append(('entry', session_id, entry['timestamp'], TRANSCRIPT, entry['text']))
+                elif event.payload.added:
+                    # Solo las líneas nuevas: la pantalla completa se repetiría en cada cambio
+                    timestamp = event.payload.timestamp if event.payload.timestamp is not None else now
+                    items.append(('entry', session_id, timestamp, SCREEN, "\n".join(event.payload.added)))
+        return items
+
+    def _write_round(self):
+        with self._condition:
+            self._rounds_started += 1
+        try:
+            items = self._collect()
+            for start in range(0, len(items), self.batch_size):
+                self._commit(items[start:start + self.batch_size])
+        except Exception as e:
+            logger.error(f"Error escribiendo en la base de datos de sesiones: {e}")
+        finally:
+            with self._condition:
+                self._rounds_done += 1
+                self._condition.notify_all()
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.partition_seconds)
+
+    def _ensure_partition(self, bucket: int) -> str:
+        """Crear la partición de la franja si no existe (dentro de la transacción en curso)"""
+        name = partition_name(bucket)
+        if bucket not in self._partitions:
+            for statement in ENCRYPTED_PARTITION_SCHEMA if self.encryption_key else PARTITION_SCHEMA:
+                self._connection.execute(statement.format(name=name))
+            start = bucket * self.partition_seconds
+            self._connection.execute("INSERT OR IGNORE INTO partitions (bucket, start, end) VALUES (?, ?, ?)",
+                                     (bucket, start, start + self.partition_seconds))
+            self._partitions.add(bucket)
+        return name
+
+    def _commit(self, items: List[tuple]):
+        """Escribir un lote en una sola transacción (un único fsync del WAL)"""
+        started = time.perf_counter()
+        connection = self._connection
+        by_bucket: Dict[int, list] = {}
+        entries = 0
+        with connection:
+            for item in items:
+                if item[0] == 'entry':
+                    by_bucket.setdefault(self._bucket(item[2]), []).append(item[1:])
+                    entries += 1
+                elif item[0] == 'begin':
+                    connection.execute("INSERT OR IGNORE INTO sessions (id, started, title) VALUES (?, ?, ?)",
+                                       item[1:])
+                elif item[0] == 'end':
+                    connection.execute("UPDATE sessions SET ended = ? WHERE id = ?", (item[2], item[1]))
+            for bucket, rows in by_bucket.items():
+                name = self._ensure_partition(bucket)
+                last_id = connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {name}").fetchone()[0]
+                if self.encryption_key:
+                    self._commit_encrypted(bucket, name, last_id, rows)
+                    continue
+                connection.executemany(
+                    f"INSERT INTO {name} (session_id, timestamp, kind, text) VALUES (?, ?, ?, ?)", rows)
+                connection.execute(
+                    f"INSERT INTO {name}_fts (rowid, text) SELECT id, text FROM {name} WHERE id > ?", (last_id,))
+        self.stats['written'] += entries
+        self.stats['commits'] += 1
+        self.stats['max_batch'] = max(self.stats['max_batch'], entries)
+        self.stats['commit_ms'] += (time.perf_counter() - started) * 1000
+
+    def _log(self, bucket: int) -> ChunkedCipherFile:
+        with self._logs_lock:
+            log = self._logs.get(bucket)
+            if log is None:
+                os.makedirs(self.log_dir, exist_ok=True)
+                path = os.path.join(self.log_dir, f"{partition_name(bucket)}.enc")
+                log = self._logs[bucket] = ChunkedCipherFile(path, self.encryption_key)
+            return log
+
+    def _commit_encrypted(self, bucket: int, name: str, last_id: int, rows: list):
+        """Un solo append cifrado por partición y lote; SQLite guarda (offset, length)"""
+        payloads = [row[3].encode('utf-8') for row in rows]
+        log = self._log(bucket)
+        offset = log.append(b''.join(payloads))
+        # En disco antes del commit de SQLite: una fila nunca apunta a bytes que no están
+        log.sync()
+        records, texts = [], []
+        for index, (row, payload) in enumerate(zip(rows, payloads)):
+            records.append((last_id + 1 + index, row[0], row[1], row[2], offset, len(payload)))
+            texts.append((last_id + 1 + index, " ".join(self._blind(row[3]))))
+            offset += len(payload)
+        self._connection.executemany(
+            f"INSERT INTO {name} (id, session_id, timestamp, kind, offset, length) VALUES (?, ?, ?, ?, ?, ?)",
+            records)
+        self._connection.executemany(f"INSERT INTO {name}_fts (rowid, text) VALUES (?, ?)", texts)
+
+    def _decrypt_rows(self, bucket: int, rows) -> List[dict]:
+        log = self._log(bucket)
+        results = []
+        for row in rows:
+            entry = dict(row)
+            entry['text'] = log.read(entry.pop('offset'), entry.pop('length')).decode('utf-8')
+            results.append(entry)
+        return results
+
+    def _safe_sweep(self):
+        try:
+            self.sweep()
+        except Exception as e:
+            logger.error(f"Error en el barrido de retención: {e}")
+
+    def sweep(self, now: Optional[float] = None, max_partitions: Optional[int] = None) -> int:
+        """Borrar particiones caducadas (como mucho max_partitions); devuelve cuántas se borraron
+
+        Cada partición se borra con DROP TABLE en su propia transacción: el
+        coste depende del tamaño de la partición, no de las horas guardadas.
+        """
+        if not self.retention_hours:
+            return 0
+        started = time.perf_counter()
+        cutoff = (self.clock.time() if now is None else now) - self.retention_hours * 3600
+        limit = self.max_drops_per_sweep if max_partitions is None else max_partitions
+        connection = self._connection
+        expired = [row[0] for row in connection.execute(
+            "SELECT bucket FROM partitions WHERE end <= ? ORDER BY bucket LIMIT ?", (cutoff, limit))]
+        for bucket in expired:
+            name = partition_name(bucket)
+            with connection:
+                connection.execute(f"DROP TABLE IF EXISTS {name}_fts")
+                connection.execute(f"DROP TABLE IF EXISTS {name}")
+                connection.execute("DELETE FROM partitions WHERE bucket = ?", (bucket,))
+            self._partitions.discard(bucket)
+            if self.encryption_key:
+                self._remove_log(bucket)
+        with connection:
+            connection.execute("DELETE FROM sessions WHERE ended IS NOT NULL AND ended <= ?", (cutoff,))
+        if expired and self.vacuum_pages_per_sweep:
+            # Devolver al sistema un número acotado de páginas libres por ciclo
+            connection.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages_per_sweep)})").fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats['partitions_dropped'] += len(expired)
+        self.stats['sweep_max_ms'] = max(self.stats['sweep_max_ms'], elapsed)
+        if expired:
+            logger.info(f"Retención: {len(expired)} particiones borradas en {elapsed:.1f} ms")
+        return len(expired)
+
+    def _remove_log(self, bucket: int):
+        with self._logs_lock:
+            log = self._logs.pop(bucket, None)
+        if log is not None:
+            log.close()
+        path = os.path.join(self.log_dir, f"{partition_name(bucket)}.enc")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Esperar a que lo encolado hasta ahora esté en disco"""
+        if self._thread is None or not self._thread.is_alive():
+            self._write_round()
+            return True
+        with self._condition:
+            target = self._rounds_started + 1
+            self._wake.set()
+            return self._condition.wait_for(lambda: self._rounds_done >= target, timeout)
+
+    def _reader(self) -> sqlite3.Connection:
+        """Conexión de lectura por hilo (WAL permite leer mientras se escribe)"""
+        connection = getattr(self._readers, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            self._readers.connection = connection
+            self._reader_connections.append(connection)
+        return connection
+
+    def _buckets(self, reader: sqlite3.Connection, session_id: Optional[int] = None) -> List[int]:
+        """Particiones vivas de la más reciente a la más antigua (solo las de la sesión si se indica)"""
+        sql, params = "SELECT bucket FROM partitions", []
+        if session_id is not None:
+            row = reader.execute("SELECT started, ended FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return []
+            sql += " WHERE end > ? AND start <= ?"
+            params = [row['started'], row['ended'] if row['ended'] is not None else float('inf')]
+        return [row[0] for row in reader.execute(sql + " ORDER BY bucket DESC", params)]
+
+    @staticmethod
+    def _filters(kinds: Optional[Iterable[str]], session_id: Optional[int]) -> Tuple[str, list]:
+        sql, params = "", []
+        if kinds:
+            kinds = list(kinds)
+            sql += f" AND e.kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        if session_id is not None:
+            sql += " AND e.session_id = ?"
+            params.append(session_id)
+        return sql, params
+
+    def search(self, text: str, kinds: Optional[Iterable[str]] = None, session_id: Optional[int] = None,
+               limit=20, by_rank=False) -> List[dict]:
+        """Búsqueda de texto completo, de lo más reciente a lo más antiguo
+
+        Con by_rank=True ordena por relevancia (bm25), que puntúa todas las
+        coincidencias: con términos frecuentes en meses de sesiones pasa de
+        milisegundos a cientos de milisegundos. El orden es aproximado: cada
+        partición tiene su propio índice y bm25 calcula la rareza de un término
+        (IDF) y la longitud media solo con los documentos de esa partición, así
+        que una misma coincidencia puntúa distinto en una franja con pocas
+        entradas que en una llena. Dentro de una partición el orden es exacto.
+        Con cifrado el índice no guarda frecuencias y el orden es siempre por fecha.
+        """
+        if self.encryption_key:
+            query = " ".join(f'"{term}"' for term in self._blind(text))
+            by_rank = False
+        else:
+            query = fts_query(text)
+        if not query:
+            return []
+        filters, filter_params = self._filters(kinds, session_id)
+        if self.encryption_key:
+            columns = "e.offset, e.length"
+        else:
+            columns = "e.text, snippet({name}_fts, 0, '[', ']', '…', 12) AS snippet"
+        reader = self._reader()
+        results = []
+        try:
+            for bucket in self._buckets(reader, session_id):
+                name = partition_name(bucket)
+                # Orden por rowid: FTS5 recorre el índice hacia atrás y para en el límite
+                sql = (
+                    f"SELECT e.id, e.session_id, e.timestamp, e.kind, {columns.format(name=name)}, "
+                    f"bm25({name}_fts) AS score "
+                    f"FROM {name}_fts JOIN {name} e ON e.id = {name}_fts.rowid "
+                    f"WHERE {name}_fts MATCH ?{filters} "
+                    f"ORDER BY {'score' if by_rank else f'{name}_fts.rowid DESC'} LIMIT ?"
+                )
+                remaining = limit if by_rank else limit - len(results)
+                try:
+                    rows = reader.execute(sql, [query, *filter_params, remaining]).fetchall()
+                except sqlite3.OperationalError:
+                    continue  # Partición borrada por el barrido durante la búsqueda
+                if self.encryption_key:
+                    rows = [dict(row, snippet=make_snippet(row['text'], text))
+                            for row in self._decrypt_rows(bucket, rows)]
+                results.extend(dict(row, partition=bucket) for row in rows)
+                if not by_rank and len(results) >= limit:
+                    break
+        except (sqlite3.Error, IntegrityError, ValueError) as e:
+            logger.error(f"Error buscando '{text}': {e}")
+            return []
+        if by_rank:
+            # Mezcla de puntuaciones de índices distintos: ver la nota del docstring
+            results.sort(key=lambda row: row['score'])
+        return results[:limit]
+
+    def get_session_entries(self, session_id: int, kinds: Optional[Iterable[str]] = None) -> List[dict]:
+        filters, params = self._filters(kinds, session_id)
+        reader = self._reader()
+        results = []
+        try:
+            for bucket in reversed(self._buckets(reader, session_id)):
+                name = partition_name(bucket)
+                columns = "e.offset, e.length" if self.encryption_key else "e.text"
+                try:
+                    rows = reader.execute(
+                        f"SELECT e.id, e.session_id, e.timestamp, e.kind, {columns} FROM {name} e "
+                        f"WHERE 1{filters} ORDER BY e.timestamp, e.id", params).fetchall()
+                except sqlite3.OperationalError:
+                    continue
+                if self.encryption_key:
+                    rows = self._decrypt_rows(bucket, rows)
+                results.extend(dict(row, partition=bucket) for row in rows)
+        except (sqlite3.Error, IntegrityError, ValueError) as e:
+            logger.error(f"Error leyendo la sesión {session_id}: {e}")
+            return []
+        return results
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats, pending=len(self._pending), partitions=len(self._partitions))
+        if self.subscription is not None:
+            stats['pending'] += len(self.subscription)
+            stats['dropped'] += self.subscription.stats['dropped']
+        return stats
+
+    def close(self):
+        """Vaciar la cola, detener el escritor y cerrar las conexiones"""
+        self.end_session()
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self._write_round()
+        if self.subscription is not None:
+            self.subscription.close()
+        for connection in self._reader_connections:
+            connection.close()
+        for log in self._logs.values():
+            log.close()
+        self._logs.clear()
+        self._reader_connections.clear()
+        self._connection.close()
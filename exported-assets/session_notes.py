@@ -0,0 +1,135 @@
+"""
+Session Notes - Notas de sesión compactas con contexto deduplicado
+Cada contexto se trocea por contenido (cortes que dependen de las palabras,
+no de la posición) y cada trozo se guarda una sola vez; las notas solo
+guardan referencias. La memoria crece con la información nueva, no con el
+número de sugerencias
+"""
+import re
+import sys
+import threading
+import zlib
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+_TOKEN = re.compile(r'\S+\s*|\s+')
+
+
+class NoteRecord:
+    """Vista de una nota reconstruida a partir de sus trozos"""
+    __slots__ = ('timestamp', 'context', 'suggestion')
+
+    def __init__(self, timestamp: float, context: str, suggestion: str):
+        self.timestamp = timestamp
+        self.context = context
+        self.suggestion = suggestion
+
+    def to_dict(self) -> dict:
+        return {
+            'timestamp': datetime.fromtimestamp(self.timestamp).isoformat(),
+            'context': self.context,
+            'suggestion': self.suggestion
+        }
+
+
+class ChunkInterner:
+    """Trozos de texto únicos; el propio texto es la clave (hash de contenido sin colisiones)"""
+
+    def __init__(self, cut_mask=7, max_words=64):
+        self.cut_mask = cut_mask  # Corte tras ~1 de cada (cut_mask + 1) palabras
+        self.max_words = max_words
+        self._ids: Dict[str, int] = {}
+        self.chunks: List[str] = []
+        self.chunk_bytes = 0  # Memoria de los objetos str únicos
+
+    def intern(self, text: str) -> int:
+        chunk_id = self._ids.get(text)
+        if chunk_id is None:
+            chunk_id = self._ids[text] = len(self.chunks)
+            self.chunks.append(text)
+            self.chunk_bytes += sys.getsizeof(text)
+        return chunk_id
+
+    def split(self, text: str) -> List[str]:
+        """Trocear por contenido: el mismo texto desplazado produce los mismos trozos"""
+        chunks, current, words = [], [], 0
+        for token in _TOKEN.findall(text):
+            current.append(token)
+            words += 1
+            word = token.rstrip()
+            if ("\n" in token or words >= self.max_words
+                    or (word and zlib.crc32(word.encode('utf-8')) & self.cut_mask == 0)):
+                chunks.append("".join(current))
+                current, words = [], 0
+        if current:
+            chunks.append("".join(current))
+        return chunks
+
+    def __len__(self):
+        return len(self.chunks)
+
+
+class SessionNotes:
+    """Notas de la sesión en columnas (array) con el contexto por referencia a trozos"""
+
+    def __init__(self, interner: ChunkInterner = None):
+        self.interner = interner or ChunkInterner()
+        self._lock = threading.Lock()
+
+        # Columnas: la nota i usa refs[offsets[i]:offsets[i + 1]]
+        self.timestamps = array('d')
+        self.suggestions = array('I')
+        self.offsets = array('I', [0])
+        self.refs = array('I')
+        self.raw_bytes = 0  # Lo que ocuparían los dicts con el contexto completo
+
+    def add(self, timestamp: float, context: str, suggestion: str) -> int:
+        """Registrar una nota; devuelve su índice"""
+        with self._lock:
+            chunk_ids = [self.interner.intern(chunk) for chunk in self.interner.split(context)]
+            self.refs.extend(chunk_ids)
+            self.offsets.append(len(self.refs))
+            self.suggestions.append(self.interner.intern(suggestion))
+            self.timestamps.append(timestamp)
+            self.raw_bytes += sys.getsizeof(context) + sys.getsizeof(suggestion)
+            return len(self.timestamps) - 1
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, index: int) -> NoteRecord:
+        with self._lock:
+            if index < 0:
+                index += len(self.timestamps)
+            if not 0 <= index < len(self.timestamps):
+                raise IndexError("índice de nota fuera de rango")
+            chunks = self.interner.chunks
+            refs = self.refs[self.offsets[index]:self.offsets[index + 1]]
+            return NoteRecord(self.timestamps[index], "".join(chunks[ref] for ref in refs),
+                              chunks[self.suggestions[index]])
+
+    def __iter__(self) -> Iterator[NoteRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def memory_bytes(self) -> int:
+        """Memoria aproximada: trozos únicos, índice de trozos y columnas"""
+        columns = sum(column.buffer_info()[1] * column.itemsize
+                      for column in (self.timestamps, self.suggestions, self.offsets, self.refs))
+        return (self.interner.chunk_bytes + sys.getsizeof(self.interner._ids)
+                + sys.getsizeof(self.interner.chunks) + columns)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            notes = len(self.timestamps)
+            memory = self.memory_bytes()
+            hours = (self.timestamps[-1] - self.timestamps[0]) / 3600 if notes > 1 else 0.0
+            return {
+                'notes': notes,
+                'chunks': len(self.interner),
+                'memory_bytes': memory,
+                'raw_bytes': self.raw_bytes,
+                'dedup_ratio': self.raw_bytes / memory if memory else 0.0,
+                'bytes_per_hour': memory / hours if hours > 0 else 0.0
+            }
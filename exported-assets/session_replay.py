@@ -0,0 +1,297 @@
+"""
+Session Replay - Grabación y repetición determinista de sesiones
+Una sesión es un fichero JSON lines con los segmentos de transcripción y el
+texto de pantalla en su instante relativo. Al repetirla, la pantalla se
+vuelve a renderizar como frame sintético y todo pasa por el pipeline real
+(ASR -> OCR -> contexto -> sugerencia) con un reloj virtual
+"""
+import json
+import random
+import threading
+import time
+import tracemalloc
+import logging
+from typing import Dict, List, Optional, Tuple
+from clock import VirtualClock
+from event_bus import EventBus, SCREEN_DELTA, TRANSCRIPT_SEGMENT
+from frame_diff import render_text_frame
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class SessionRecorder:
+    """Graba los eventos del bus (segmentos de ASR y estados de pantalla) en un fichero"""
+
+    def __init__(self, bus: EventBus, path: str, seed: Optional[int] = None):
+        self.path = path
+        self.seed = seed
+        self.subscription = bus.subscribe((TRANSCRIPT_SEGMENT, SCREEN_DELTA), maxsize=1024)
+        self._file = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self.events = 0
+
+    def start(self):
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._started = time.monotonic()
+        self._write({'type': 'header', 'version': FORMAT_VERSION, 'seed': self.seed,
+                     'created': time.time()})
+        self._thread = threading.Thread(target=self._run, name='session-recorder', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            event = self.subscription.get(timeout=0.5)
+            if event is None:
+                if self.subscription.closed:
+                    break
+                continue
+            t = round(event.published_at - self._started, 3)
+            if event.topic == TRANSCRIPT_SEGMENT:
+                entry = event.payload['entry']
+                self._write({'t': t, 'type': 'transcript', 'text': entry['text'],
+                             'confidence': entry.get('confidence', 1.0)})
+            else:
+                self._write({'t': t, 'type': 'screen', 'lines': event.payload.state.text.split("\n")})
+            self.events += 1
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def stop(self):
+        self.subscription.close()
+        if self._thread is not None:
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        logger.info(f"Sesión grabada en {self.path}: {self.events} eventos")
+
+
+def load_session(path: str) -> Tuple[dict, List[dict]]:
+    """Leer una sesión: (cabecera, eventos ordenados por instante)"""
+    header, events = {}, []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('type') == 'header':
+                header = record
+            else:
+                events.append(record)
+    events.sort(key=lambda record: record['t'])
+    return header, events
+
+
+def generate_session(path: str, minutes=60.0, seed=0, phrases: List[str] = None,
+                     screens: Dict[str, List[str]] = None) -> int:
+    """Generar una sesión sintética con el ritmo de los mocks (frase cada 3-8 s, pantalla cada 2 s)"""
+    from asr_service import ASRService
+    from ocr_service import OCRService
+
+    rng = random.Random(seed)
+    phrases = phrases or ASRService().mock_phrases
+    screens = screens or OCRService().mock_screen_scenarios
+    scenarios = list(screens)
+    duration = minutes * 60
+    events = []
+
+    t = 0.0
+    while True:
+        t += rng.uniform(3, 8)
+        if t >= duration:
+            break
+        events.append({'t': round(t, 3), 'type': 'transcript', 'text': rng.choice(phrases),
+                       'confidence': round(rng.uniform(0.8, 0.95), 3)})
+
+    t, rotation, previous = 0.0, 0, None
+    while t < duration:
+        lines = screens[scenarios[rotation % len(scenarios)]]
+        lines = lines[:rng.randint(2, len(lines))]
+        if lines != previous:
+            events.append({'t': round(t, 3), 'type': 'screen', 'lines': lines})
+            previous = lines
+        if rng.random() < 0.1:
+            rotation += 1
+        t += 2.0
+
+    events.sort(key=lambda record: record['t'])
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'type': 'header', 'version': FORMAT_VERSION, 'seed': seed,
+                            'synthetic': True, 'minutes': minutes}) + "\n")
+        for record in events:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return len(events)
+
+
+class _StageTimer:
+    __slots__ = ('samples', 'busy')
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.busy = 0.0  # Tiempo total dentro de la etapa (segundos)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.busy += seconds
+
+    def summary(self) -> dict:
+        values = sorted(self.samples)
+        return {
+            'count': len(values),
+            'throughput_per_s': len(values) / self.busy if self.busy > 0 else 0.0,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': (values[-1] if values else 0.0) * 1000
+        }
+
+
+class SessionPlayer:
+    """Repite una sesión por el pipeline con reloj virtual y semilla fija"""
+
+    def __init__(self, path: str, seed: Optional[int] = None, speed=0.0, config=None,
+                 track_memory=True):
+        self.path = path
+        self.header, self.events = load_session(path)
+        self.seed = seed if seed is not None else self.header.get('seed') or 0
+        self.speed = speed  # 0 = lo más rápido posible, 1 = tiempo real, 10 = 10x
+        self.config = config
+        self.track_memory = track_memory  # tracemalloc encarece las asignaciones (latencias infladas)
+        self.clock = VirtualClock()
+
+    def _create_engine(self):
+        from engine import PipelineEngine
+        from claude_service import ClaudeService
+        from ocr_service import OCRService
+
+        # El tiempo de la sesión lo marca el reloj virtual, no el de pared
+        claude = ClaudeService(mock_token_delay=0.03 if self.speed else 0.0,
+                               clock=self.clock, seed=self.seed + 3)
+        return PipelineEngine(self.config, ocr_service=OCRService(use_mock=True, clock=self.clock),
+                              claude_service=claude, clock=self.clock, seed=self.seed)
+
+    def run(self) -> dict:
+        """Repetir la sesión y devolver métricas por etapa"""
+        engine = self._create_engine()
+        stages = {name: _StageTimer() for name in ('asr', 'ocr', 'context', 'suggestion')}
+        suggestions = 0
+
+        if self.track_memory:
+            tracemalloc.start()
+        engine.start(live=False, threaded=False)
+        started = time.perf_counter()
+        try:
+            for record in self.events:
+                if self.speed > 0:
+                    # Ritmo real (o acelerado): esperar al instante del evento
+                    delay = record['t'] / self.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                self.clock.set(record['t'])
+
+                stage_started = time.perf_counter()
+                if record['type'] == 'transcript':
+                    engine.asr_service.add_transcript(record['text'], self.clock.time(),
+                                                      record.get('confidence', 1.0))
+                    stages['asr'].add(time.perf_counter() - stage_started)
+                else:
+                    frame = render_text_frame(record['lines'])
+                    stage_started = time.perf_counter()
+                    engine.ocr_service.process_frame(frame)
+                    stages['ocr'].add(time.perf_counter() - stage_started)
+
+                stage_started = time.perf_counter()
+                triggered = engine.pump()
+                stages['context'].add(time.perf_counter() - stage_started)
+
+                if triggered:
+                    stage_started = time.perf_counter()
+                    engine.wait_idle()
+                    stages['suggestion'].add(time.perf_counter() - stage_started)
+                    suggestions += 1
+
+            wall = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if self.track_memory else 0
+        finally:
+            if self.track_memory:
+                tracemalloc.stop()
+            engine.close()
+
+        session_seconds = self.events[-1]['t'] if self.events else 0.0
+        return {
+            'session': self.path,
+            'seed': self.seed,
+            'speed': self.speed,
+            'events': len(self.events),
+            'session_seconds': session_seconds,
+            'wall_seconds': wall,
+            'speedup': session_seconds / wall if wall > 0 else 0.0,
+            'suggestions': suggestions,
+            'peak_memory_mb': peak / (1024 * 1024),
+            'stages': {name: timer.summary() for name, timer in stages.items()},
+            'novelty': engine.novelty.get_stats(),
+            'ocr_invocations': engine.ocr_service.ocr_invocations
+        }
+
+
+def simulate_live_session(minutes=60.0, seed=0, config=None, step_seconds=5.0,
+                          track_memory=True) -> dict:
+    """Ejecutar el pipeline en vivo (hilos de ASR mock, OCR y agregador) con reloj virtual
+
+    Los mocks duermen en el reloj virtual, así que una hora de reunión se
+    simula en segundos; útil para pruebas de soak y de memoria.
+    """
+    from engine import PipelineEngine
+    from claude_service import ClaudeService
+
+    clock = VirtualClock(threaded=True)
+    claude = ClaudeService(mock_token_delay=0.0, clock=clock, seed=seed + 3)
+    engine = PipelineEngine(config, claude_service=claude, clock=clock, seed=seed)
+    engine.asr_service.use_mock = True
+    engine.ocr_service.use_mock = True
+
+    if track_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        engine.start(live=True)
+        # Esperar a que los hilos de ASR y OCR duerman en el reloj virtual
+        clock.wait_sleepers(2)
+        duration = minutes * 60
+        while clock.monotonic() < duration:
+            clock.advance(min(step_seconds, duration - clock.monotonic()))
+            engine.wait_idle(timeout=5.0)
+        wall = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if track_memory else 0
+        stats = engine.get_stats()
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+        engine.stop()
+        clock.release()  # Despertar a los hilos dormidos para que terminen
+        engine.close()
+
+    return {
+        'simulated_seconds': minutes * 60,
+        'wall_seconds': wall,
+        'speedup': minutes * 60 / wall if wall > 0 else 0.0,
+        'seed': seed,
+        'transcript_segments': len(engine.asr_service.transcript_store),
+        'suggestions': len(engine.session_notes),
+        'session_notes': stats['session_notes'],
+        'peak_memory_mb': peak / (1024 * 1024),
+        'novelty': stats['novelty'],
+        'ocr': {key: stats['ocr'][key] for key in ('captures', 'changes', 'ocr_invocations')},
+        'aggregator': stats['aggregator']
+    }
@@ -0,0 +1,157 @@
+"""
+Suggestion Cache - Cache de respuestas por huella de contexto normalizado
+SimHash de 64 bits para reutilizar sugerencias de contextos casi idénticos,
+con TTL, expulsión LRU y métricas de aciertos
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+# Horas de reloj (12:30, 09:15:02, 00:01:23.5), también la parte horaria de un ISO 8601
+_CLOCK_RE = re.compile(r"(?<![\d:])\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?(?![\d:])")
+
+
+def normalize_context(text: str) -> str:
+    """Minúsculas, sin tildes, horas colapsadas y espacios normalizados"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    # Los relojes en pantalla cambian cada tick sin aportar contexto; importes, fechas y
+    # otras cifras sí cuentan (con otro precio la sugerencia no sirve)
+    text = _CLOCK_RE.sub(' 0 ', text)
+    return " ".join(_TOKEN_RE.findall(text))
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(normalized: str) -> int:
+    """SimHash de 64 bits sobre palabras y bigramas"""
+    tokens = normalized.split()
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    weights = [0] * 64
+    for feature in features:
+        value = _feature_hash(feature)
+        for bit in range(64):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def figures(normalized: str) -> Tuple[str, ...]:
+    """Palabras con cifras (importes, fechas, cantidades) en orden"""
+    return tuple(token for token in normalized.split() if any(ch.isdigit() for ch in token))
+
+
+class _CacheEntry:
+    __slots__ = ('playbook', 'fingerprint', 'figures', 'suggestion', 'created')
+
+    def __init__(self, playbook: str, fingerprint: int, figures: Tuple[str, ...], suggestion: str,
+                 created: float):
+        self.playbook = playbook
+        self.fingerprint = fingerprint
+        self.figures = figures
+        self.suggestion = suggestion
+        self.created = created
+
+
+class SuggestionCache:
+    def __init__(self, max_entries=256, ttl_seconds=60.0, hamming_threshold=3,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hamming_threshold = hamming_threshold  # Bits de diferencia aceptados como "casi igual"
+        self.clock = clock
+        self._entries: OrderedDict = OrderedDict()  # (playbook, digest exacto) -> _CacheEntry
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(context: str, playbook: str) -> Tuple[Tuple[str, bytes], int, Tuple[str, ...]]:
+        normalized = normalize_context(context)
+        digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+        return (playbook, digest), simhash(normalized), figures(normalized)
+
+    def get(self, context: str, playbook: str = '') -> Optional[str]:
+        """Buscar una sugerencia para el contexto (exacta o casi duplicada)"""
+        key, fingerprint, numbers = self._key(context, playbook)
+        with self._lock:
+            return self._lookup(key, fingerprint, numbers, playbook, self.clock())
+
+    def _lookup(self, key, fingerprint: int, numbers: Tuple[str, ...], playbook: str,
+                now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and self._alive(key, entry, now):
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.suggestion
+
+        best = None
+        for candidate_key, candidate in list(self._entries.items()):
+            if candidate.playbook != playbook or not self._alive(candidate_key, candidate, now):
+                continue
+            # Casi igual nunca vale con otras cifras: otro precio u otra fecha, otra sugerencia
+            if candidate.figures != numbers:
+                continue
+            distance = bin(candidate.fingerprint ^ fingerprint).count('1')
+            if distance <= self.hamming_threshold and (best is None or distance < best[0]):
+                best = (distance, candidate_key, candidate)
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(best[1])
+        self.near_hits += 1
+        return best[2].suggestion
+
+    def put(self, context: str, suggestion: str, playbook: str = ''):
+        """Guardar la sugerencia generada para un contexto"""
+        key, fingerprint, numbers = self._key(context, playbook)
+        with self._lock:
+            self._entries[key] = _CacheEntry(playbook, fingerprint, numbers, suggestion, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _alive(self, key, entry: _CacheEntry, now: float) -> bool:
+        if now - entry.created <= self.ttl_seconds:
+            return True
+        del self._entries[key]
+        self.expirations += 1
+        return False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Métricas de aciertos de la cache"""
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'exact_hits': self.exact_hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
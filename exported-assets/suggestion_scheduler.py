@@ -0,0 +1,139 @@
+"""
+Suggestion Scheduler - Planificador single-flight de sugerencias
+Agrupa peticiones concurrentes para el mismo contexto, cancela las que un
+contexto más nuevo deja obsoletas y solo entrega el resultado más reciente
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import tracing
+from concurrent.futures import Future
+from contextlib import aclosing
+from typing import Callable, Dict, Optional
+from suggestion_cache import normalize_context
+from claude_service import ClaudeService
+
+logger = logging.getLogger(__name__)
+
+
+def _noop(*args):
+    pass
+
+
+class _Flight:
+    """Generación de sugerencia en curso"""
+    __slots__ = ('key', 'generation', 'task', 'requested_at')
+
+    def __init__(self, key: bytes, generation: int, requested_at: float):
+        self.key = key
+        self.generation = generation
+        self.task: Optional[asyncio.Task] = None
+        self.requested_at = requested_at  # perf_counter() de la petición (para el tiempo en cola)
+
+
+class SuggestionScheduler:
+    def __init__(self, claude_service,
+                 on_started: Callable[[int], None] = _noop,
+                 on_delta: Callable[[int, str], None] = _noop,
+                 on_finished: Callable[[int, str, str], None] = _noop):
+        self.claude_service = claude_service
+        self.on_started = on_started
+        self.on_delta = on_delta
+        self.on_finished = on_finished
+
+        # Solo se accede desde el event loop de ClaudeService
+        self._generation = 0
+        self._current: Optional[_Flight] = None
+
+        self.stats = {
+            'requested': 0,
+            'coalesced': 0,
+            'cancelled': 0,
+            'delivered': 0,
+            'discarded': 0
+        }
+
+    @property
+    def generation(self) -> int:
+        """Generación más reciente (la única que puede llegar al overlay)"""
+        return self._generation
+
+    @staticmethod
+    def _key(context: str, playbook: Dict = None) -> bytes:
+        # Mismo ámbito de playbook que la cache de ClaudeService
+        normalized = f"{ClaudeService._playbook_key(playbook)}\x00{normalize_context(context)}"
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+    def request(self, context: str, playbook: Dict = None) -> Future:
+        """Solicitar sugerencia desde cualquier hilo; el Future devuelve None si quedó obsoleta"""
+        return self.claude_service.run_coroutine(
+            self.request_async(context, playbook, requested_at=time.perf_counter())
+        )
+
+    async def request_async(self, context: str, playbook: Dict = None,
+                            requested_at: Optional[float] = None) -> Optional[str]:
+        """Solicitar sugerencia desde el event loop"""
+        flight = self._submit(context, playbook, requested_at or time.perf_counter())
+        try:
+            # shield: si quien espera se cancela, el vuelo compartido sigue
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.task.cancelled():
+                return None
+            raise
+
+    def _submit(self, context: str, playbook: Dict, requested_at: float) -> _Flight:
+        self.stats['requested'] += 1
+        key = self._key(context, playbook)
+        current = self._current
+
+        if current is not None and not current.task.done():
+            if current.key == key:
+                # Mismo contexto ya en vuelo: compartir el resultado
+                self.stats['coalesced'] += 1
+                return current
+            # Contexto nuevo: la generación anterior ya no interesa
+            current.task.cancel()
+            self.stats['cancelled'] += 1
+
+        self._generation += 1
+        flight = _Flight(key, self._generation, requested_at)
+        flight.task = asyncio.get_running_loop().create_task(self._run(flight, context, playbook))
+        self._current = flight
+        return flight
+
+    def _is_latest(self, flight: _Flight) -> bool:
+        return flight.generation == self._generation
+
+    async def _run(self, flight: _Flight, context: str, playbook: Dict = None) -> Optional[str]:
+        parts = []
+        tracing.record('llm.queued', time.perf_counter() - flight.requested_at)
+        self.on_started(flight.generation)
+        try:
+            # aclosing: al salir con break el stream se cierra ya (cancela la petición HTTP
+            # y guarda las métricas) en lugar de esperar al recolector de basura
+            async with aclosing(self.claude_service.stream_suggestion_async(context, playbook)) as stream:
+                async for delta in stream:
+                    if not self._is_latest(flight):
+                        break
+                    parts.append(delta)
+                    self.on_delta(flight.generation, delta)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error generando sugerencia: {e}")
+
+        suggestion = "".join(parts)
+        if not self._is_latest(flight):
+            self.stats['discarded'] += 1
+            return None
+
+        self.stats['delivered'] += 1
+        self.on_finished(flight.generation, suggestion, context)
+        return suggestion
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats['generation'] = self._generation
+        return stats
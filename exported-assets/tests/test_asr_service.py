@@ -0,0 +1,27 @@
+import math
+import struct
+import wave
+
+from asr_service import ASRService
+from clock import VirtualClock
+
+
+def test_wav_segments_are_stamped_with_the_service_clock(tmp_path):
+    path = str(tmp_path / 'voz.wav')
+    rate = 16000
+    # 0.5 s de silencio, 1 s de tono (voz) y 1 s de silencio
+    samples = [0] * (rate // 2) + [int(8000 * math.sin(2 * math.pi * 220 * n / rate)) for n in range(rate)]
+    samples += [0] * rate
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(struct.pack(f'<{len(samples)}h', *samples))
+
+    clock = VirtualClock()
+    service = ASRService(use_mock=False, clock=clock)
+    service.transcribe_wav(path, recognizer=lambda pcm, sample_rate: "hola")
+
+    segments = service.get_full_transcript()
+    assert [segment['timestamp'] for segment in segments] == [clock.time()]
+    assert service.get_recent_transcript(30) == "hola"
@@ -0,0 +1,68 @@
+import math
+import random
+import struct
+import wave
+
+import pytest
+
+from audio_pipeline import StreamingASRPipeline, VoiceActivityDetector, WavFrameSource
+
+RATE = 16000
+
+
+def _write_wav(path, bursts, seconds):
+    """Ruido de fondo bajo con ráfagas de tono (voz) en los intervalos dados"""
+    noise = random.Random(7)
+    samples = []
+    for n in range(int(seconds * RATE)):
+        t = n / RATE
+        value = noise.randint(-60, 60)
+        if any(start <= t < end for start, end in bursts):
+            value += int(8000 * math.sin(2 * math.pi * 220 * t))
+        samples.append(value)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(struct.pack(f'<{len(samples)}h', *samples))
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_segments_close_on_pauses_and_silence_is_gated(tmp_path, use_numpy):
+    path = str(tmp_path / 'voz.wav')
+    _write_wav(path, [(0.3, 0.9), (2.1, 2.7)], seconds=3.6)
+
+    vad = VoiceActivityDetector()
+    if not use_numpy:
+        vad._np = None
+    segments = []
+    heard = []
+
+    def recognizer(pcm, sample_rate):
+        heard.append(len(pcm))
+        return f"enunciado {len(heard)}"
+
+    pipeline = StreamingASRPipeline(WavFrameSource(path), recognizer, segments.append, vad=vad, close_source=True)
+    stats = pipeline.run()
+
+    # Frames de 30 ms: 150 ms de pre-roll antes de la voz y cierre tras 600 ms de pausa
+    assert [(s['start'], s['end']) for s in segments] == [(0.15, 1.5), (1.95, 3.3)]
+    assert [s['text'] for s in segments] == ["enunciado 1", "enunciado 2"]
+    assert heard == [45 * 480 * 2, 45 * 480 * 2]
+    assert stats['frames_total'] == 120
+    assert stats['frames_speech'] == 40
+    assert pipeline.gating_ratio() == pytest.approx(0.25)
+
+
+def test_short_click_does_not_reach_the_recognizer(tmp_path):
+    path = str(tmp_path / 'clic.wav')
+    _write_wav(path, [(0.48, 0.54)], seconds=1.5)
+    calls = []
+
+    pipeline = StreamingASRPipeline(WavFrameSource(path), lambda pcm, rate: calls.append(pcm) or "x",
+                                    lambda segment: None, close_source=True)
+    stats = pipeline.run()
+
+    assert stats['frames_speech'] == 2
+    assert calls == []
+    assert pipeline.gating_ratio() == 1.0
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from claude_client import AsyncClaudeClient
+from mock_claude_server import MockClaudeServer
+
+MESSAGES = [{'role': 'user', 'content': 'presupuesto del contrato'}]
+
+
+def test_keep_alive_connection_is_reused_and_stream_matches():
+    async def scenario():
+        server = MockClaudeServer(latency=0, jitter=0, token_interval=0, seed=0)
+        await server.start()
+        client = AsyncClaudeClient('clave', base_url=server.base_url, max_connections=2)
+        try:
+            first = await client.create_message(MESSAGES, model='mock')
+            second = await client.create_message(MESSAGES, model='mock')
+            streamed = "".join([text async for text in client.stream_message(MESSAGES, model='mock')])
+        finally:
+            await client.close()
+            await server.stop()
+        return first, second, streamed, client.stats, server.stats
+
+    first, second, streamed, stats, server_stats = asyncio.run(scenario())
+
+    text = first['content'][0]['text']
+    assert second['content'][0]['text'] == text
+    assert streamed == text
+    assert server_stats['connections'] == 1
+    assert stats['reused_connections'] == 2
+
+
+def test_body_without_length_is_read_until_the_server_closes():
+    body = json.dumps({'content': [{'type': 'text', 'text': 'hola'}]}).encode()
+
+    async def handle(reader, writer):
+        while (await reader.readline()) not in (b'\r\n', b''):
+            pass
+        await reader.read(1)  # Cuerpo de la petición (irrelevante)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n")
+        for start in range(0, len(body), 8):
+            writer.write(body[start:start + 8])
+            await writer.drain()
+            await asyncio.sleep(0.001)
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        client = AsyncClaudeClient('clave', base_url=f"http://127.0.0.1:{port}")
+        try:
+            response = await client.create_message(MESSAGES, model='mock')
+            idle = len(client.pool._idle)
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+        return response, idle
+
+    response, idle = asyncio.run(scenario())
+
+    assert response['content'][0]['text'] == 'hola'
+    assert idle == 0  # La conexión terminó con el cuerpo: no vuelve al pool
+
+
+def test_pool_follows_the_client_to_a_new_event_loop():
+    client = AsyncClaudeClient('clave', base_url='http://127.0.0.1', max_connections=1)
+
+    async def burst():
+        # Mismo puerto en cada loop: el pool del cliente sigue apuntando a él
+        server = MockClaudeServer(port=client.port if client._pool else 0, latency=0.01, jitter=0, seed=0)
+        await server.start()
+        client.port = server.port
+        try:
+            # Dos peticiones con una sola conexión: la segunda espera en el semáforo
+            return await asyncio.gather(*(client.create_message(MESSAGES, model='mock') for _ in range(2)))
+        finally:
+            await server.stop()
+
+    assert len(asyncio.run(burst())) == 2
+    assert len(asyncio.run(burst())) == 2
+    assert client.stats['errors'] == 0
+    assert client.stats['retries'] == 0
@@ -0,0 +1,72 @@
+import time
+
+from claude_service import ClaudeService
+from mock_claude_server import MockClaudeServer
+from pii_redactor import PIIRedactor, placeholders
+from suggestion_cache import SuggestionCache
+
+
+def _service():
+    service = ClaudeService(mock_token_delay=0, cache=SuggestionCache(), redactor=PIIRedactor(), seed=0)
+    # El mock responde citando el marcador del contexto, como haría el modelo
+    service._generate_mock_suggestion = (
+        lambda context, playbook=None: f"Envía el contrato a {sorted(placeholders(context))[0]}")
+    return service
+
+
+def test_cache_does_not_restore_another_persons_data():
+    service = _service()
+    first = service.generate_suggestion("Pantalla: correo de ana@x.com sobre el contrato")
+    second = service.generate_suggestion("Pantalla: correo de luis@y.com sobre el contrato")
+
+    assert first == "Envía el contrato a ana@x.com"
+    assert second == "Envía el contrato a luis@y.com"
+
+
+def test_cache_hits_for_the_same_person():
+    service = _service()
+    service.generate_suggestion("Pantalla: correo de ana@x.com sobre el contrato")
+    again = service.generate_suggestion("Pantalla: correo de ana@x.com sobre el contrato")
+
+    assert again == "Envía el contrato a ana@x.com"
+    assert service.counters['cached'] == 1
+
+
+def test_stream_from_the_api_arrives_in_fragments():
+    service = ClaudeService(api_key='clave', base_url='http://127.0.0.1', seed=0)
+    server = MockClaudeServer(latency=0.05, jitter=0, token_interval=0.01, seed=0)
+    service.run_coroutine(server.start()).result(timeout=5)
+    service.base_url = server.base_url
+    try:
+        deltas = list(service.stream_suggestion("Cliente: ¿y el presupuesto?"))
+        complete = service.generate_suggestion("Cliente: ¿y el presupuesto?")
+    finally:
+        service.run_coroutine(server.stop()).result(timeout=5)
+        service.close()
+
+    assert len(deltas) > 5
+    assert "".join(deltas) == complete
+    streamed = service.request_timings[0]
+    # El primer fragmento llega con la latencia del servidor, no al final del texto
+    assert streamed['streamed'] and streamed['completed']
+    assert streamed['ttft'] < streamed['ttlt'] - 0.03
+
+
+def test_abandoned_stream_is_counted_as_incomplete_and_not_cached():
+    service = ClaudeService(mock_token_delay=0.01, cache=SuggestionCache(), seed=0)
+    try:
+        stream = service.stream_suggestion("Pantalla: propuesta de renovación")
+        first = next(stream)
+        stream.close()
+        deadline = time.monotonic() + 5
+        while service.counters['requests'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert first
+        assert service.counters['incomplete'] == 1
+        # La sugerencia cortada no entra en la cache: la siguiente se genera entera
+        again = list(service.stream_suggestion("Pantalla: propuesta de renovación"))
+        assert len(again) > 1
+        assert service.counters['cached'] == 0
+    finally:
+        service.close()
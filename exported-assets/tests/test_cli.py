@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+import cli
+
+
+def test_transcript_file_produces_json_suggestions_and_a_searchable_history(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('CLUELY_DATA_KEY', raising=False)
+    transcript = tmp_path / 'reunion.txt'
+    transcript.write_text("Cliente: ¿cuál es el precio de las licencias?\n\n"
+                          "Ana: enviaremos la propuesta del contrato el lunes\n", encoding='utf-8')
+    output = tmp_path / 'sugerencias.jsonl'
+    db = str(tmp_path / 'sesiones.db')
+
+    code = cli.run(cli.parse_args(['--transcript', str(transcript), '--output', str(output),
+                                   '--db', db, '--timeout', '10']))
+
+    assert code == 0
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert records
+    assert all(record['suggestion'] and 'precio' in record['context'] for record in records)
+
+    # Por defecto (privacy.store_transcripts) solo se guardan las sugerencias
+    word = max(records[0]['suggestion'].split(), key=len).strip("'¿?:.,")
+    assert cli.run(cli.parse_args(['--db', db, '--search', word])) == 0
+    hits = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert any(hit['text'] == records[0]['suggestion'] for hit in hits)
+    assert cli.run(cli.parse_args(['--db', db, '--search', 'licencias'])) == 0
+    assert capsys.readouterr().out == ""
+
+
+def test_search_requires_a_database(capsys):
+    assert cli.run(cli.parse_args(['--search', 'precio'])) == 2
+    assert '--db' in capsys.readouterr().err
+
+
+def test_cli_does_not_import_qt(tmp_path):
+    code = "import sys, cli; sys.exit(int(any(name.startswith('PyQt5') for name in sys.modules)))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path,
+                            env=dict(os.environ, PYTHONPATH=os.path.dirname(cli.__file__)))
+    assert result.returncode == 0
@@ -0,0 +1,69 @@
+import time
+
+from asr_service import ASRService
+from clock import VirtualClock
+from context_aggregator import ContextAggregator
+from event_bus import EventBus, SCREEN_DELTA
+from novelty import NoveltyDetector
+from screen_delta import ScreenState
+
+
+class _ASR:
+    transcript_store = None
+
+    def get_recent_transcript(self, seconds, now):
+        return "hola"
+
+
+class _Novelty:
+    def observe(self, store, delta):
+        return False
+
+
+def test_context_sends_the_whole_screen_with_the_last_change_marked():
+    bus = EventBus()
+    aggregator = ContextAggregator(bus, _ASR(), novelty=_Novelty())
+    assert aggregator._screen_context() == "Pantalla: (vacía)"
+
+    previous = ScreenState()
+    for version, text in enumerate(["Participantes: Ana\nAgenda: presupuesto\nCompartiendo: slides.pptx",
+                                    "Participantes: Ana\nAgenda: presupuesto\nChat: ¿descuento?"], 1):
+        state = ScreenState.from_text(text, version)
+        bus.publish(SCREEN_DELTA, state.diff(previous))
+        previous = state
+        aggregator.process(aggregator.subscription.drain())
+
+    assert aggregator.context == ("Pantalla:\nParticipantes: Ana\nAgenda: presupuesto\n+ Chat: ¿descuento?\n"
+                                  "Ya no en pantalla: Compartiendo: slides.pptx\nAudio: hola")
+
+    # Un tick solo de audio mantiene el último cambio
+    aggregator.process([])
+    assert "+ Chat: ¿descuento?" in aggregator.context
+
+
+def test_held_question_fires_after_the_refractory_period_in_silence():
+    clock = VirtualClock()
+    bus = EventBus()
+    asr = ASRService(event_bus=bus, clock=clock)
+    fired = []
+    aggregator = ContextAggregator(bus, asr, NoveltyDetector(refractory_seconds=6, clock=clock.monotonic),
+                                   on_context=lambda context, trigger: trigger and fired.append(clock.monotonic()),
+                                   clock=clock.time, tick_interval=0.01)
+
+    asr.add_transcript("Revisamos el presupuesto de licencias del equipo comercial")
+    aggregator.process(aggregator.subscription.drain())
+    clock.advance(2)
+    asr.add_transcript("¿Cuándo necesitáis firmar el contrato de soporte?")
+    aggregator.process(aggregator.subscription.drain())
+    assert fired == [0]  # La pregunta queda retenida por el periodo refractario
+
+    # Silencio: sin eventos nuevos, el bucle del agregador la dispara al terminar el periodo
+    aggregator.start()
+    try:
+        clock.advance(5)
+        deadline = time.monotonic() + 2
+        while len(fired) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        aggregator.close()
+    assert fired == [0, 7]
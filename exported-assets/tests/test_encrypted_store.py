@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+pytest.importorskip('cryptography')
+
+from encrypted_store import ChunkedCipherFile, IntegrityError, HEADER  # noqa: E402
+
+KEY = bytes(range(32))
+
+
+def _store(path, chunk_size=16):
+    store = ChunkedCipherFile(str(path), KEY, chunk_size=chunk_size)
+    offsets = [store.append(f"entrada {n}: presupuesto del contrato".encode()) for n in range(3)]
+    store.sync()
+    store.close()
+    return offsets
+
+
+def test_ranges_read_back_across_chunks_and_reopen(tmp_path):
+    path = tmp_path / 'p.enc'
+    offsets = _store(path)
+
+    store = ChunkedCipherFile(str(path), KEY)
+    try:
+        assert store.chunk_size == 16
+        assert store.read(offsets[1], 10) == b"entrada 1:"
+        assert store.read(offsets[2] + 11, 11) == b"presupuesto"
+        assert store.append(b"mas") == store.size - 3
+        with pytest.raises(ValueError):
+            store.read(store.size - 1, 2)
+    finally:
+        store.close()
+    assert b"presupuesto" not in path.read_bytes()
+
+
+def test_torn_tail_is_dropped_on_open(tmp_path):
+    path = tmp_path / 'p.enc'
+    offsets = _store(path)
+    intact = os.path.getsize(path)
+    with open(path, 'ab') as f:
+        f.write(b'\x00\x00\x00\x10' + os.urandom(9))  # Registro a medio escribir
+
+    store = ChunkedCipherFile(str(path), KEY)
+    try:
+        assert os.path.getsize(path) == intact
+        assert store.read(offsets[2], 10) == b"entrada 2:"
+        # Se sigue añadiendo tras el último registro completo
+        offset = store.append(b"tras el corte")
+        assert store.read(offset, 13) == b"tras el corte"
+    finally:
+        store.close()
+
+
+def test_tampering_is_detected(tmp_path):
+    path = tmp_path / 'p.enc'
+    offsets = _store(path)
+    data = bytearray(path.read_bytes())
+    data[HEADER.size + 4 + 12 + 2] ^= 1  # Un bit del texto cifrado del primer registro
+    path.write_bytes(bytes(data))
+
+    store = ChunkedCipherFile(str(path), KEY)
+    try:
+        with pytest.raises(IntegrityError):
+            store.read(offsets[0], 5)
+        assert store.read(offsets[2], 10) == b"entrada 2:"
+    finally:
+        store.close()
+
+    wrong_key = ChunkedCipherFile(str(path), bytes(32))
+    try:
+        with pytest.raises(IntegrityError):
+            wrong_key.read(offsets[2], 10)
+    finally:
+        wrong_key.close()
+
+
+def test_invalid_length_before_the_tail_is_an_error(tmp_path):
+    path = tmp_path / 'p.enc'
+    _store(path)
+    data = bytearray(path.read_bytes())
+    data[HEADER.size:HEADER.size + 4] = b'\xff\xff\xff\xff'
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(IntegrityError):
+        ChunkedCipherFile(str(path), KEY)
+
+
+def test_encrypted_database_searches_without_storing_plaintext(tmp_path):
+    from session_db import SessionDatabase
+
+    path = str(tmp_path / 's.db')
+    db = SessionDatabase(path, encryption_key=KEY)
+    db.begin_session('demo')
+    db.add_note('presupuesto del contrato firmado')
+    db.close()
+
+    db = SessionDatabase(path, encryption_key=KEY)
+    try:
+        assert [hit['text'] for hit in db.search('contrato')] == ['presupuesto del contrato firmado']
+    finally:
+        db.close()
+    for name in [path] + [os.path.join(path + '.d', entry) for entry in os.listdir(path + '.d')]:
+        with open(name, 'rb') as f:
+            assert b'contrato' not in f.read()
+    with pytest.raises(RuntimeError):
+        SessionDatabase(path, encryption_key=bytes(32))
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from event_bus import BLOCK, DROP_NEWEST, DROP_OLDEST, EventBus, SCREEN_DELTA, TRANSCRIPT_SEGMENT
+
+
+def _payloads(subscription):
+    return [event.payload for event in subscription.drain()]
+
+
+def test_drop_oldest_keeps_the_latest_events():
+    bus = EventBus()
+    subscription = bus.subscribe(TRANSCRIPT_SEGMENT, maxsize=3, policy=DROP_OLDEST)
+    for n in range(5):
+        assert bus.publish(TRANSCRIPT_SEGMENT, n) == 1
+
+    assert _payloads(subscription) == [2, 3, 4]
+    assert subscription.stats['dropped'] == 2
+
+
+def test_drop_newest_keeps_the_first_events():
+    bus = EventBus()
+    subscription = bus.subscribe(TRANSCRIPT_SEGMENT, maxsize=3, policy=DROP_NEWEST)
+    delivered = [bus.publish(TRANSCRIPT_SEGMENT, n) for n in range(5)]
+
+    assert delivered == [1, 1, 1, 0, 0]
+    assert _payloads(subscription) == [0, 1, 2]
+
+
+def test_block_waits_for_the_consumer():
+    bus = EventBus()
+    subscription = bus.subscribe(TRANSCRIPT_SEGMENT, maxsize=1, policy=BLOCK, block_timeout=5.0)
+    bus.publish(TRANSCRIPT_SEGMENT, 'primero')
+    consumer = threading.Timer(0.05, subscription.get)
+    consumer.start()
+
+    started = time.monotonic()
+    assert bus.publish(TRANSCRIPT_SEGMENT, 'segundo') == 1
+    assert time.monotonic() - started >= 0.04
+    consumer.join()
+    assert _payloads(subscription) == ['segundo']
+    assert subscription.stats['blocked'] == 1
+
+
+def test_block_gives_up_after_the_timeout():
+    bus = EventBus()
+    subscription = bus.subscribe(TRANSCRIPT_SEGMENT, maxsize=1, policy=BLOCK, block_timeout=0.02)
+    bus.publish(TRANSCRIPT_SEGMENT, 'primero')
+
+    assert bus.publish(TRANSCRIPT_SEGMENT, 'segundo') == 0
+    assert subscription.stats['dropped'] == 1
+
+
+def test_each_subscriber_has_its_own_queue_and_topics():
+    bus = EventBus()
+    slow = bus.subscribe((TRANSCRIPT_SEGMENT, SCREEN_DELTA), maxsize=1, policy=DROP_NEWEST)
+    fast = bus.subscribe(TRANSCRIPT_SEGMENT, maxsize=10, policy=DROP_OLDEST)
+    bus.publish(TRANSCRIPT_SEGMENT, 'a')
+    bus.publish(SCREEN_DELTA, 'b')
+    bus.publish(TRANSCRIPT_SEGMENT, 'c')
+
+    assert _payloads(slow) == ['a']
+    assert _payloads(fast) == ['a', 'c']
+
+
+def test_close_wakes_a_waiting_consumer_and_stops_delivery():
+    bus = EventBus()
+    subscription = bus.subscribe(TRANSCRIPT_SEGMENT)
+    threading.Timer(0.02, bus.unsubscribe, args=(subscription,)).start()
+
+    assert subscription.get(timeout=5) is None
+    assert bus.publish(TRANSCRIPT_SEGMENT, 'tarde') == 0
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        EventBus().subscribe(TRANSCRIPT_SEGMENT, policy='ignorar')
@@ -0,0 +1,51 @@
+from frame_diff import ScreenFrame, TileCache, render_text_frame, split_tiles
+from ocr_service import OCRService
+
+LINES = [f"Punto {n} de la agenda" for n in range(8)]
+
+
+def test_tiles_cover_the_frame_in_reading_order():
+    frame = ScreenFrame(5, 3, bytes(range(15)))
+    tiles = split_tiles(frame, 2, 2)
+
+    assert [(tile.row, tile.col, tile.width, tile.height) for tile in tiles] == [
+        (0, 0, 2, 2), (0, 1, 2, 2), (0, 2, 1, 2),
+        (1, 0, 2, 1), (1, 1, 2, 1), (1, 2, 1, 1)]
+    assert tiles[1].pixels == bytes([2, 3, 7, 8])
+    assert tiles[5].pixels == bytes([14])
+    assert sum(len(tile.pixels) for tile in tiles) == 15
+
+
+def test_same_content_with_another_shape_is_another_tile():
+    wide = split_tiles(ScreenFrame(4, 1, b'\x00\x01\x00\x01'), 4, 1)[0]
+    tall = split_tiles(ScreenFrame(2, 2, b'\x00\x01\x00\x01'), 2, 2)[0]
+
+    assert wide.pixels == tall.pixels
+    assert wide.digest != tall.digest
+
+
+def test_tile_cache_evicts_the_least_recently_used():
+    cache = TileCache(max_entries=2)
+    cache.put(b'a', "uno")
+    cache.put(b'b', "dos")
+    assert cache.get(b'a') == "uno"
+    cache.put(b'c', "tres")
+
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == "uno"
+    assert cache.get_stats()['tile_cache_size'] == 2
+
+
+def test_only_dirty_tiles_are_recognized_again():
+    service = OCRService(seed=0, tile_size=(320, 120))
+    before = render_text_frame(LINES)
+    after = render_text_frame(LINES + ["Chat: ¿descuento?"])
+
+    assert service._recognize_frame(before) == "\n".join(LINES)
+    first = service.ocr_invocations
+    assert service._recognize_frame(after) == "\n".join(LINES + ["Chat: ¿descuento?"])
+
+    # La línea nueva solo toca el tile inferior izquierdo; el resto sale de la cache
+    assert service.ocr_invocations - first == 1
+    assert service._recognize_frame(after) == "\n".join(LINES + ["Chat: ¿descuento?"])
+    assert service.ocr_invocations - first == 1
@@ -0,0 +1,83 @@
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+import tracing
+from engine import PipelineEngine
+from metrics_server import CONTENT_TYPE, MetricsServer, MetricsWriter
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{([a-zA-Z_]+="(\\.|[^"\\])*",?)*\})? (\S+)$')
+
+
+def test_writer_follows_the_text_exposition_format():
+    out = MetricsWriter()
+    out.counter('ocr_captures', 3, "Capturas")
+    out.gauge('queue_depth', 1, "Cola", {'topics': 'a,b', 'policy': 'drop_oldest'})
+    out.gauge('queue_depth', 0, "Cola", {'topics': 'c"\\\n', 'policy': 'block'})
+    out.gauge('sin_valor', None, "Se omite")
+    out.histogram('stage_latency_seconds', (0.01, 0.1), [1, 3], 4, 0.5, "Latencia", {'stage': 'ocr'})
+
+    assert out.render().decode('utf-8').splitlines() == [
+        '# HELP cluely_ocr_captures_total Capturas',
+        '# TYPE cluely_ocr_captures_total counter',
+        'cluely_ocr_captures_total 3',
+        '# HELP cluely_queue_depth Cola',
+        '# TYPE cluely_queue_depth gauge',
+        'cluely_queue_depth{topics="a,b",policy="drop_oldest"} 1',
+        'cluely_queue_depth{topics="c\\"\\\\\\n",policy="block"} 0',
+        '# HELP cluely_stage_latency_seconds Latencia',
+        '# TYPE cluely_stage_latency_seconds histogram',
+        'cluely_stage_latency_seconds_bucket{stage="ocr",le="0.01"} 1',
+        'cluely_stage_latency_seconds_bucket{stage="ocr",le="0.1"} 3',
+        'cluely_stage_latency_seconds_bucket{stage="ocr",le="+Inf"} 4',
+        'cluely_stage_latency_seconds_sum{stage="ocr"} 0.5',
+        'cluely_stage_latency_seconds_count{stage="ocr"} 4',
+    ]
+
+
+@pytest.fixture
+def traced():
+    tracing.tracer.reset()
+    tracing.tracer.enabled = True
+    yield tracing.tracer
+    tracing.tracer.enabled = False
+    tracing.tracer.reset()
+
+
+def test_endpoint_serves_parseable_metrics(tmp_path, monkeypatch, traced):
+    monkeypatch.chdir(tmp_path)
+    engine = PipelineEngine()
+    server = MetricsServer(engine, port=0)
+    assert server.start()
+    try:
+        engine.feed_transcript("Cliente: ¿cuál es el precio?")
+        traced.record('ocr.recognize', 0.02)
+        traced.record('ocr.recognize', 40.0)
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            content_type = response.headers['Content-Type']
+            lines = response.read().decode('utf-8').splitlines()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(server.url.replace('/metrics', '/otra'), timeout=5)
+    finally:
+        server.stop()
+        engine.close()
+
+    assert content_type == CONTENT_TYPE
+    assert error.value.code == 404
+    declared = {line.split()[2] for line in lines if line.startswith('# TYPE')}
+    values = {}
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        family = re.sub(r'_(bucket|sum|count)$', '', match.group(1))
+        assert match.group(1) in declared or family in declared, line
+        values[line.rsplit(' ', 1)[0]] = float(match.group(5))
+
+    assert values['cluely_asr_segments_total'] == 1
+    buckets = [values[key] for key in values if key.startswith('cluely_stage_latency_seconds_bucket{stage="ocr.recognize"')]
+    assert buckets == sorted(buckets)
+    assert buckets[-2:] == [1, 2]  # 30 s no incluye la muestra de 40 s; +Inf sí
@@ -0,0 +1,20 @@
+from novelty import NoveltyDetector
+
+
+def test_keywords_match_with_or_without_accents():
+    assert NoveltyDetector(keywords=['decisión']).score([{'text': 'falta la decisión final'}]).cues == 1
+    assert NoveltyDetector(keywords=['decisión']).score([{'text': 'falta la decision final'}]).cues == 1
+
+
+def test_repeated_question_does_not_fire_again():
+    detector = NoveltyDetector(refractory_seconds=0, clock=lambda: 0.0)
+    question = [{'text': '¿Cuándo firmamos el contrato de soporte?'}]
+
+    assert detector.score(question).score >= detector.threshold
+    assert detector.score(question).score == 0
+
+
+def test_questions_on_screen_count_as_cues():
+    detector = NoveltyDetector()
+
+    assert detector.score(added_lines=['Chat (Ana): ¿tenéis descuento por volumen?']).cues == 2
@@ -0,0 +1,50 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ocr_preprocess import FramePreprocessor  # noqa: E402
+
+
+def test_grayscale_matches_bt601_without_stretching():
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+    preprocessor = FramePreprocessor()
+    preprocessor._allocate(6, 8)
+
+    gray = preprocessor._grayscale(rgb).astype(np.int32)
+    expected = rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+
+    assert np.abs(gray - expected).max() <= 1.5
+
+
+def test_wide_frames_are_reduced_by_block_means():
+    preprocessor = FramePreprocessor(target_width=2)
+    preprocessor._allocate(2, 4)
+    gray = np.array([[0, 100, 200, 40], [100, 200, 0, 40]], dtype=np.uint8)
+
+    small = preprocessor._downscale(gray)
+
+    assert preprocessor.factor == 2
+    assert small.tolist() == [[100, 70]]
+
+
+def test_text_is_binarized_against_the_background():
+    rgb = np.full((40, 60, 3), 230, dtype=np.uint8)
+    rgb[10:14, 5:55] = 40  # Una línea de "texto" oscuro
+    rgb[25:28, 5:30] = 60
+    preprocessor = FramePreprocessor()
+
+    output = preprocessor.process(rgb)
+
+    assert set(np.unique(output).tolist()) == {0, 255}
+    assert (output[10:14, 5:55] == 0).all()
+    assert (output[:10] == 255).all()
+
+
+def test_buffers_are_reused_for_the_same_resolution():
+    preprocessor = FramePreprocessor()
+    first = preprocessor.process(np.zeros((20, 30, 3), dtype=np.uint8))
+    second = preprocessor.process(np.full((20, 30, 3), 255, dtype=np.uint8))
+
+    assert first is second
+    assert preprocessor.process(np.zeros((10, 30, 4), dtype=np.uint8)).shape == (10, 30)
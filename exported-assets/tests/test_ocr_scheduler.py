@@ -0,0 +1,46 @@
+import pytest
+
+from ocr_scheduler import AdaptiveCaptureScheduler
+
+
+def test_stable_screen_backs_off_up_to_the_maximum():
+    scheduler = AdaptiveCaptureScheduler(base_interval=1.0, min_interval=0.5, max_interval=4.0,
+                                         backoff=2.0, cpu_budget=0)
+    intervals = []
+    now = 0.0
+    for _ in range(5):
+        assert scheduler.due(now)
+        scheduler.record(False, 0.01, now=now)
+        intervals.append(scheduler.current_interval)
+        assert not scheduler.due(now + scheduler.current_interval - 0.001)
+        now = scheduler.next_capture_time
+
+    assert intervals == [2.0, 4.0, 4.0, 4.0, 4.0]
+
+
+def test_change_returns_to_fast_sampling():
+    scheduler = AdaptiveCaptureScheduler(base_interval=8.0, min_interval=0.5, max_interval=8.0, cpu_budget=0)
+    scheduler.record(True, 0.01, now=100.0)
+
+    assert scheduler.current_interval == 0.5
+    assert scheduler.next_capture_time == 100.5
+    assert scheduler.get_stats()['changes'] == 1
+
+
+def test_slow_captures_respect_the_cpu_budget():
+    scheduler = AdaptiveCaptureScheduler(min_interval=0.5, max_interval=8.0, cpu_budget=0.1)
+    for step in range(3):
+        scheduler.record(True, 0.2, now=float(step))
+
+    # 200 ms por captura con un 10% de CPU: como mínimo 2 s entre capturas
+    assert scheduler.current_interval == pytest.approx(2.0)
+    assert scheduler.get_stats()['cpu_usage'] == pytest.approx(0.1)
+
+
+def test_reset_makes_the_next_capture_due_at_once():
+    scheduler = AdaptiveCaptureScheduler(cpu_budget=0)
+    scheduler.record(False, 0.01, now=50.0)
+    scheduler.reset()
+
+    assert scheduler.due(0.0)
+    assert scheduler.current_interval == scheduler.min_interval
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from frame_diff import render_text_frame
+from ocr_service import OCRService
+
+
+def test_failed_recognition_keeps_the_previous_screen_state():
+    service = OCRService(seed=0)
+    before = render_text_frame(["Participantes: Ana, Luis", "Agenda: presupuesto"])
+    after = render_text_frame(["Participantes: Ana, Luis", "Agenda: presupuesto", "Chat: ¿descuento?"])
+
+    service._mock_screen_frame = lambda: before
+    service.capture_screen_text_async().result()
+    state = service.get_screen_state()
+
+    # El OCR falla una vez con la pantalla nueva
+    recognize = service._recognize_frame
+    failures = [RuntimeError("tesseract no responde")]
+
+    def flaky(frame):
+        if failures:
+            raise failures.pop()
+        return recognize(frame)
+
+    service._recognize_frame = flaky
+    service._mock_screen_frame = lambda: after
+    assert service.capture_screen_text_async().exception() is not None
+    assert service.get_screen_state() is state
+    assert service.last_screen_text == "Participantes: Ana, Luis\nAgenda: presupuesto"
+
+    # El mismo frame se vuelve a reconocer en la siguiente captura
+    service.capture_screen_text_async().result()
+    assert "Chat: ¿descuento?" in service.last_screen_text
+    assert service.get_screen_state().version == state.version + 1
+
+
+def test_capture_loop_runs_as_a_coroutine_of_the_attached_loop():
+    loop = asyncio.new_event_loop()
+    service = OCRService(seed=0, capture_interval=0.01, min_capture_interval=0.01)
+    frame = render_text_frame(["Agenda: presupuesto"])
+    service._mock_screen_frame = lambda: frame
+    service.attach_loop(loop)
+
+    async def scenario():
+        service.start_capture_loop()
+        for _ in range(200):
+            if service.last_screen_text:
+                break
+            await asyncio.sleep(0.005)
+        service.stop_capture_loop()
+        await asyncio.sleep(0)
+
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+        service.shutdown()
+
+    assert service.last_screen_text == "Agenda: presupuesto"
+    assert not any(thread.name == 'ocr-loop' for thread in threading.enumerate())
+
+
+def test_capture_returns_the_last_result_while_ocr_runs_off_thread():
+    service = OCRService(use_mock=False, seed=0, capture_interval=0.0, min_capture_interval=0.0)
+    frame = render_text_frame(["Agenda: presupuesto"])
+    service._real_screen_capture = lambda: frame
+    release = threading.Event()
+    recognize = service._recognize_frame
+
+    def slow(frame):
+        release.wait(5)
+        return recognize(frame)
+
+    service._recognize_frame = slow
+    try:
+        pending = service.capture_screen_text_async()
+        assert service.capture_screen_text() == ""
+        assert service.capture_screen_text_async() is pending
+        assert not pending.done()
+
+        release.set()
+        assert pending.result(timeout=5) == "Agenda: presupuesto"
+        assert service.capture_screen_text() == "Agenda: presupuesto"
+    finally:
+        release.set()
+        service.shutdown()
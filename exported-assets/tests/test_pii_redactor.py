@@ -0,0 +1,52 @@
+import pytest
+
+from pii_redactor import PIIRedactor, placeholders
+
+TEXT = ("Ana Pérez (ana.perez+ventas@acme.es) pide el cargo en la tarjeta 4111 1111 1111 1111.\n"
+        "IBAN ES91 2100 0418 4502 0005 1332, móvil +34 612 345 678 o 612345678.\n"
+        "Presupuesto: 600.000.000 y pedido 1234567890123 (no son datos personales)")
+
+
+def test_redact_and_restore_round_trip():
+    redactor = PIIRedactor(terms={'Ana Pérez': 'PERSONA', 'acme': 'CLIENTE'})
+    redacted = redactor.redact(TEXT)
+
+    for value in ('ana.perez+ventas@acme.es', '4111 1111 1111 1111', 'ES91 2100 0418 4502 0005 1332',
+                  '+34 612 345 678', '612345678', 'Ana Pérez'):
+        assert value not in redacted
+    assert '600.000.000' in redacted and '1234567890123' in redacted
+    assert placeholders(redacted) == {'[PERSONA_1]', '[EMAIL_1]', '[TARJETA_1]', '[IBAN_1]',
+                                      '[TELEFONO_1]', '[TELEFONO_2]'}
+    assert redactor.restore(redacted) == TEXT
+
+
+def test_placeholders_are_stable_across_calls_and_case():
+    redactor = PIIRedactor(terms=['Acme'])
+    first = redactor.redact("Escribe a luis@acme.es sobre ACME")
+    second = redactor.redact("Luis@Acme.es confirmó; acme firma mañana\nEscribe a luis@acme.es sobre ACME")
+
+    assert first == "Escribe a [EMAIL_1] sobre [TERMINO_1]"
+    assert second == "[EMAIL_1] confirmó; [TERMINO_1] firma mañana\n" + first
+    stats = redactor.get_stats()
+    assert stats['values'] == 2
+    assert stats['lines_cached'] == 1  # La línea ya vista no se vuelve a analizar
+
+
+def test_invalid_checksums_are_not_redacted():
+    redactor = PIIRedactor()
+    text = "Tarjeta 4111 1111 1111 1112 e IBAN ES00 2100 0418 4502 0005 1332"
+    assert redactor.redact(text) == text
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 8])
+def test_streaming_restore_handles_placeholders_split_across_fragments(size):
+    redactor = PIIRedactor()
+    redacted = redactor.redact("Llama al 612345678 o escribe a ana@acme.es")
+    answer = f"Confirma con {redacted.split()[2]} y copia a {redacted.split()[-1]} [nota] hoy ["
+
+    restorer = redactor.restorer()
+    output = "".join(restorer.feed(answer[i:i + size]) for i in range(0, len(answer), size))
+    output += restorer.flush()
+
+    assert output == "Confirma con 612345678 y copia a ana@acme.es [nota] hoy ["
+    assert output == redactor.restore(answer)
@@ -0,0 +1,32 @@
+from screen_delta import ScreenState, line_id
+
+
+def test_state_deduplicates_and_normalizes_lines():
+    state = ScreenState.from_text("Agenda:  presupuesto\n\n  Agenda: presupuesto \nChat: hola\nChat: hola")
+
+    assert list(state.lines.values()) == ["Agenda: presupuesto", "Chat: hola"]
+    assert state.text == "Agenda: presupuesto\nChat: hola"
+    assert line_id("Chat: hola") in state.lines
+
+
+def test_diff_reports_added_removed_and_unchanged_in_screen_order():
+    previous = ScreenState.from_text("Participantes: Ana, Luis\nAgenda: presupuesto\nChat: hola", version=3)
+    current = ScreenState.from_text("Chat: ¿descuento?\nParticipantes: Ana, Luis\nChat:   hola", version=4)
+
+    delta = current.diff(previous, timestamp=12.5)
+
+    assert delta.added == ["Chat: ¿descuento?"]
+    assert delta.removed == ["Agenda: presupuesto"]
+    assert delta.unchanged == ["Participantes: Ana, Luis", "Chat: hola"]
+    assert delta.has_changes
+    assert delta.timestamp == 12.5
+    assert delta.to_dict() == {'version': 4, 'base_version': 3, 'added': ["Chat: ¿descuento?"],
+                               'removed': ["Agenda: presupuesto"], 'unchanged': 2}
+
+
+def test_reordered_lines_are_not_a_change():
+    previous = ScreenState.from_text("a\nb\nc")
+    current = ScreenState.from_text("c\na\nb")
+
+    assert current.same_lines(previous)
+    assert not current.diff(previous).has_changes
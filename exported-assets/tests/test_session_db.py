@@ -0,0 +1,76 @@
+import os
+import time
+
+from clock import VirtualClock
+from config import Config
+from engine import open_session_db
+from event_bus import EventBus, TRANSCRIPT_SEGMENT
+from ocr_service import OCRService
+from session_db import SCREEN, SessionDatabase
+
+
+def _config(tmp_path):
+    config = Config()
+    config.config['storage'].update(path=str(tmp_path / 's.db'))
+    return config
+
+
+def test_key_is_created_next_to_the_database(tmp_path, monkeypatch):
+    monkeypatch.delenv('CLUELY_DATA_KEY', raising=False)
+    (tmp_path / 'otro').mkdir()
+    monkeypatch.chdir(tmp_path / 'otro')
+    db = open_session_db(_config(tmp_path))
+    db.begin_session('demo')
+    db.add_note('presupuesto del contrato')
+    db.close()
+
+    assert os.path.exists(tmp_path / 'sessions.key')
+    assert not os.path.exists(tmp_path / 'otro' / 'sessions.key')
+
+
+def test_missing_key_is_not_regenerated(tmp_path, monkeypatch):
+    monkeypatch.delenv('CLUELY_DATA_KEY', raising=False)
+    monkeypatch.chdir(tmp_path)
+    db = open_session_db(_config(tmp_path))
+    db.begin_session('demo')
+    db.add_note('presupuesto del contrato')
+    db.close()
+    os.remove(tmp_path / 'sessions.key')
+
+    assert open_session_db(_config(tmp_path)) is None
+    assert not os.path.exists(tmp_path / 'sessions.key')
+
+
+def test_bus_events_belong_to_the_session_they_were_published_in(tmp_path):
+    bus = EventBus()
+    db = SessionDatabase(str(tmp_path / 's.db'))
+    db.attach(bus)
+    first = db.begin_session('primera')
+    bus.publish(TRANSCRIPT_SEGMENT, {'seq': 1, 'entry': {'timestamp': time.time(), 'text': 'hola'}})
+    db.end_session()
+    bus.publish(TRANSCRIPT_SEGMENT, {'seq': 2, 'entry': {'timestamp': time.time(), 'text': 'fuera'}})
+    second = db.begin_session('segunda')
+    db.flush(timeout=None)
+
+    assert [entry['text'] for entry in db.get_session_entries(first)] == ['hola']
+    assert db.get_session_entries(second) == []
+    db.close()
+
+
+def test_screen_entries_keep_the_capture_time(tmp_path):
+    clock = VirtualClock(epoch=time.time())
+    bus = EventBus()
+    db = SessionDatabase(str(tmp_path / 's.db'), clock=clock)
+    db.attach(bus)
+    session = db.begin_session('demo')
+    ocr = OCRService(event_bus=bus, clock=clock)
+
+    clock.advance(5)
+    ocr.ingest_screen_text("Agenda: presupuesto")
+    captured = clock.time()
+    clock.advance(40)  # El escritor vacía la cola mucho después
+    db.flush(timeout=None)
+
+    entries = db.get_session_entries(session, kinds=[SCREEN])
+    assert [(entry['timestamp'], entry['text']) for entry in entries] == [(captured, "Agenda: presupuesto")]
+    db.close()
@@ -0,0 +1,42 @@
+import pytest
+
+from session_notes import ChunkInterner, SessionNotes
+
+CONTEXT = ("Transcripción reciente:\nCliente: necesitamos el presupuesto antes del viernes\n"
+           "Pantalla:\nAgenda: renovación de licencias\nChat: ¿descuento por volumen?")
+
+
+def test_notes_round_trip_exactly():
+    notes = SessionNotes()
+    notes.add(1_700_000_000.0, CONTEXT, "Pregunta por el volumen")
+    notes.add(1_700_000_060.0, CONTEXT + "\n+ Nueva línea", "Confirma el viernes")
+
+    assert len(notes) == 2
+    assert notes[0].context == CONTEXT
+    assert notes[-1].context == CONTEXT + "\n+ Nueva línea"
+    assert [note.suggestion for note in notes] == ["Pregunta por el volumen", "Confirma el viernes"]
+    assert notes[1].to_dict()['context'] == CONTEXT + "\n+ Nueva línea"
+    with pytest.raises(IndexError):
+        notes[2]
+
+
+def test_chunks_do_not_depend_on_position():
+    interner = ChunkInterner()
+    shifted = interner.split("Hola a todos. " + CONTEXT)
+
+    assert "".join(shifted) == "Hola a todos. " + CONTEXT
+    # Tras el primer corte, el texto desplazado vuelve a producir los mismos trozos
+    assert set(interner.split(CONTEXT)[2:]) <= set(shifted)
+
+
+def test_repeated_context_is_stored_once():
+    notes = SessionNotes()
+    for minute in range(200):
+        notes.add(1_700_000_000.0 + 60 * minute, CONTEXT, "Pregunta por el volumen")
+    chunks = len(notes.interner)
+    notes.add(1_700_012_000.0, CONTEXT + "\nChat: ¿y el soporte?", "Pregunta por el soporte")
+
+    stats = notes.get_stats()
+    assert len(notes.interner) - chunks <= 3
+    assert stats['dedup_ratio'] > 4  # Por nota solo quedan ~15 referencias de 4 bytes
+    assert stats['bytes_per_hour'] > 0
@@ -0,0 +1,47 @@
+from event_bus import EventBus, SCREEN_DELTA, TRANSCRIPT_SEGMENT
+from screen_delta import ScreenState
+from session_replay import SessionPlayer, SessionRecorder, generate_session, load_session
+
+
+def test_generated_sessions_depend_only_on_the_seed(tmp_path):
+    paths = [tmp_path / name for name in ('a.jsonl', 'b.jsonl', 'c.jsonl')]
+    generate_session(str(paths[0]), minutes=3, seed=1)
+    generate_session(str(paths[1]), minutes=3, seed=1)
+    generate_session(str(paths[2]), minutes=3, seed=2)
+
+    assert paths[0].read_text(encoding='utf-8') == paths[1].read_text(encoding='utf-8')
+    assert paths[0].read_text(encoding='utf-8') != paths[2].read_text(encoding='utf-8')
+    header, events = load_session(str(paths[0]))
+    assert header['seed'] == 1
+    assert [event['t'] for event in events] == sorted(event['t'] for event in events)
+
+
+def test_replay_is_deterministic(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / 'sesion.jsonl')
+    generate_session(path, minutes=5, seed=3)
+
+    runs = [SessionPlayer(path, track_memory=False).run() for _ in range(2)]
+
+    assert runs[0]['suggestions'] > 0
+    assert runs[0]['suggestions'] == runs[1]['suggestions']
+    assert runs[0]['novelty'] == runs[1]['novelty']
+    assert runs[0]['ocr_invocations'] == runs[1]['ocr_invocations']
+    assert runs[0]['session_seconds'] <= 5 * 60
+
+
+def test_recorded_bus_events_load_back_in_order(tmp_path):
+    bus = EventBus()
+    path = str(tmp_path / 'grabada.jsonl')
+    recorder = SessionRecorder(bus, path, seed=7)
+    recorder.start()
+    bus.publish(TRANSCRIPT_SEGMENT, {'seq': 1, 'entry': {'text': 'hola', 'confidence': 0.9}})
+    bus.publish(SCREEN_DELTA, ScreenState.from_text("Agenda\nPresupuesto").diff(ScreenState()))
+    recorder.stop()
+
+    header, events = load_session(path)
+
+    assert header['seed'] == 7
+    assert [(event['type'], event.get('text'), event.get('lines')) for event in events] == [
+        ('transcript', 'hola', None), ('screen', None, ['Agenda', 'Presupuesto'])]
+    assert recorder.events == 2
@@ -0,0 +1,16 @@
+from suggestion_cache import SuggestionCache
+
+
+def test_clock_changes_still_hit():
+    cache = SuggestionCache()
+    cache.put("Reunión 12:30 - presupuesto de licencias para el equipo", "Pregunta por el plazo")
+
+    assert cache.get("Reunión 12:31 - presupuesto de licencias para el equipo") == "Pregunta por el plazo"
+
+
+def test_prices_and_dates_do_not_hit():
+    cache = SuggestionCache()
+    cache.put("Propuesta: 1.250 € por licencia, entrega el 17/10 con soporte incluido", "Acepta el precio")
+
+    assert cache.get("Propuesta: 1.990 € por licencia, entrega el 17/10 con soporte incluido") is None
+    assert cache.get("Propuesta: 1.250 € por licencia, entrega el 18/10 con soporte incluido") is None
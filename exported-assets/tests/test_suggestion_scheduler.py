@@ -0,0 +1,34 @@
+import asyncio
+
+from suggestion_scheduler import SuggestionScheduler
+
+
+class _Service:
+    def __init__(self):
+        self.closed = False
+
+    def stream_suggestion_async(self, context, playbook=None):
+        # Se guarda una referencia, así que el recolector de basura no lo cerraría
+        self.stream = self._stream()
+        return self.stream
+
+    async def _stream(self):
+        try:
+            for word in ("Pregunta", " por", " el", " plazo"):
+                yield word
+                await asyncio.sleep(0)
+        finally:
+            self.closed = True
+
+
+def test_abandoned_stream_is_closed_at_once():
+    service = _Service()
+    scheduler = SuggestionScheduler(service)
+    # Una generación más nueva al primer fragmento hace que el vuelo salga con break
+    scheduler.on_delta = lambda generation, delta: setattr(scheduler, '_generation', generation + 1)
+
+    async def run():
+        result = await scheduler.request_async("contexto")
+        return result, service.closed  # Antes de que el loop cierre los generadores pendientes
+
+    assert asyncio.run(run()) == (None, True)
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+import tracing
+from tracing import LatencyHistogram, Tracer
+
+
+def test_percentiles_stay_within_the_bucket_error():
+    histogram = LatencyHistogram()
+    rng = random.Random(0)
+    samples = sorted(rng.lognormvariate(-4, 1) for _ in range(10000))
+    for sample in samples:
+        histogram.record(sample)
+
+    for fraction in (0.5, 0.9, 0.99):
+        exact = samples[int(fraction * len(samples)) - 1]
+        # Límite superior de la cubeta: nunca por debajo y como mucho ~1.6% por encima
+        assert exact <= histogram.percentile(fraction) + 1e-6
+        assert histogram.percentile(fraction) <= exact * 1.02 + 1e-6
+
+
+def test_overflow_is_counted_apart_and_kept_in_max_and_mean():
+    histogram = LatencyHistogram(highest_seconds=1.0)
+    for _ in range(8):
+        histogram.record(0.010)
+    histogram.record(5.0)
+    histogram.record(30.0)
+
+    stats = histogram.to_dict()
+    assert stats['count'] == 10
+    assert stats['overflow'] == 2
+    assert sum(histogram.counts) == 8
+    assert stats['max_ms'] == 30000.0
+    assert stats['mean_ms'] == pytest.approx((8 * 10 + 5000 + 30000) / 10)
+    assert histogram.percentile(0.5) == pytest.approx(0.010, rel=0.02)
+    # Los percentiles que caen entre los desbordados devuelven el máximo real
+    assert histogram.percentile(0.99) == 30.0
+
+
+def test_cumulative_counts_overflow_only_above_the_real_maximum():
+    histogram = LatencyHistogram(highest_seconds=1.0)
+    histogram.record(0.001)
+    histogram.record(0.5)
+    histogram.record(3.0)
+
+    assert histogram.cumulative([0.0005, 0.01, 1.0, 2.5, 5.0]) == [0, 1, 2, 2, 3]
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span('ocr.recognize'):
+        pass
+    tracer.record('llm.ttft', 0.2)
+    assert tracer.span('x') is tracing._NULL_SPAN
+    assert tracer.snapshot()['stages'] == {}
+
+    tracer.enabled = True
+    with tracer.span('ocr.recognize'):
+        pass
+    tracer.record('llm.ttft', 0.2)
+    assert set(tracer.snapshot()['stages']) == {'ocr.recognize', 'llm.ttft'}
+    assert tracer.export([0.1, 1.0])['llm.ttft'][:2] == ([0, 1], 1)
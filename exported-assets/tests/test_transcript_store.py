@@ -0,0 +1,13 @@
+from transcript_store import TranscriptStore
+
+
+def test_spill_is_bounded_and_keeps_the_newest_entries():
+    store = TranscriptStore(capacity=4, spill_capacity=3)
+    for index in range(10):
+        store.append({'timestamp': float(index), 'text': str(index)})
+
+    assert len(store) == 7
+    assert store.spill_dropped == 3
+    assert [entry['text'] for entry in store.to_list()] == ['3', '4', '5', '6', '7', '8', '9']
+    assert [entry['text'] for entry in store.since(0)] == ['3', '4', '5', '6', '7', '8', '9']
+    assert [entry['text'] for entry in store.since(5)] == ['5', '6', '7', '8', '9']
@@ -0,0 +1,193 @@
+"""
+Tracing - Spans por etapa del pipeline agregados en histogramas tipo HDR
+Desactivado por defecto: span() devuelve un contexto vacío compartido y
+record() retorna en la primera comprobación
+"""
+import json
+import threading
+import time
+import logging
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_NULL_SPAN = nullcontext()
+
+
+class LatencyHistogram:
+    """Histograma de rango dinámico alto (estilo HdrHistogram) en microsegundos
+
+    Cubetas logarítmicas (una por potencia de 2) con sub-cubetas lineales:
+    error relativo acotado (~1.6% con sub_bucket_bits=7) y memoria fija.
+    Las muestras por encima de highest_seconds no caben en las cubetas: se
+    cuentan aparte (overflow) y entran con su valor real en total, media y max.
+    """
+
+    def __init__(self, highest_seconds=120.0, sub_bucket_bits=7):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half = self.sub_bucket_count // 2
+        self.highest = int(highest_seconds * 1_000_000)
+        self.counts = [0] * (self._index(self.highest) + 1)
+        self.count = 0
+        self.overflow = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.half + ((value >> shift) - self.half)
+
+    def _value_at(self, index: int) -> int:
+        """Límite superior (inclusive) de la cubeta: los percentiles nunca se subestiman"""
+        if index < self.sub_bucket_count:
+            return index
+        shift = (index - self.sub_bucket_count) // self.half + 1
+        top = (index - self.sub_bucket_count) % self.half + self.half
+        return ((top + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = max(int(seconds * 1_000_000), 0)
+        if value > self.highest:
+            self.overflow += 1
+        else:
+            self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> float:
+        """Percentil en segundos"""
+        if not self.count:
+            return 0.0
+        target = max(1, int(fraction * self.count + 0.5))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= target:
+                return min(self._value_at(index), self.max) / 1_000_000
+        return self.max / 1_000_000  # El percentil cae entre los desbordados
+
+    def cumulative(self, bounds) -> List[int]:
+        """Muestras <= cada límite (segundos, ascendentes), para histogramas de Prometheus"""
+        limits = [int(bound * 1_000_000) for bound in bounds]
+        result = [0] * len(limits)
+        position, seen = 0, 0
+        for index, bucket in enumerate(self.counts):
+            if not bucket:
+                continue
+            upper = self._value_at(index)
+            while position < len(limits) and limits[position] < upper:
+                result[position] = seen
+                position += 1
+            seen += bucket
+        for position in range(position, len(limits)):
+            # Los desbordados solo se sabe que caben bajo límites por encima del máximo real
+            result[position] = seen + (self.overflow if limits[position] >= self.max else 0)
+        return result
+
+    def to_dict(self) -> dict:
+        """Resumen en milisegundos"""
+        ms = lambda seconds: round(seconds * 1000, 3)
+        return {
+            'count': self.count,
+            'mean_ms': ms(self.total / self.count / 1_000_000) if self.count else 0.0,
+            'min_ms': ms((self.min or 0) / 1_000_000),
+            'p50_ms': ms(self.percentile(0.50)),
+            'p90_ms': ms(self.percentile(0.90)),
+            'p95_ms': ms(self.percentile(0.95)),
+            'p99_ms': ms(self.percentile(0.99)),
+            'max_ms': ms(self.max / 1_000_000),
+            'overflow': self.overflow
+        }
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'started')
+
+    def __init__(self, tracer: 'Tracer', name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def span(self, name: str):
+        """Medir el bloque with como una muestra de la etapa name"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float):
+        """Registrar una duración ya medida (p.ej. TTFT)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+        return {'started': self.started, 'elapsed_s': time.time() - self.started, 'stages': stages}
+
+    def export(self, bounds) -> Dict[str, tuple]:
+        """(acumulados por límite, número de muestras, suma en segundos) por etapa"""
+        with self._lock:
+            return {
+                name: (histogram.cumulative(bounds), histogram.count, histogram.total / 1_000_000)
+                for name, histogram in sorted(self.histograms.items())
+            }
+
+    def dump(self, path: Optional[str] = None) -> dict:
+        """Escribir el resumen en JSON (si hay ruta) y en el log; devuelve el resumen"""
+        snapshot = self.snapshot()
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2)
+        for name, stats in snapshot['stages'].items():
+            logger.info(
+                f"{name:<20} n={stats['count']:<6} p50 {stats['p50_ms']:.2f} ms  "
+                f"p95 {stats['p95_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms  max {stats['max_ms']:.2f} ms"
+                + (f"  ({stats['overflow']} fuera de rango)" if stats['overflow'] else "")
+            )
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.started = time.time()
+
+
+# Tracer global del proceso (como logging): los servicios lo usan sin inyección
+tracer = Tracer()
+
+
+def span(name: str):
+    return tracer.span(name)
+
+
+def record(name: str, seconds: float):
+    tracer.record(name, seconds)
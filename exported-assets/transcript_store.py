@@ -0,0 +1,174 @@
+"""
+Transcript Store - Almacén de transcripción indexado por tiempo
+Ring buffer acotado con búsqueda binaria sobre timestamps y un nivel de
+desbordamiento (spill), también acotado, para conservar la sesión completa
+(el historial de sesiones largas es cosa de SessionDatabase)
+"""
+import threading
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional
+
+
+class _WindowCache:
+    """Texto cacheado de una ventana "últimos N segundos" mantenido incrementalmente"""
+    __slots__ = ('start_seq', 'end_seq', 'parts', 'text')
+
+    def __init__(self, seq: int):
+        self.start_seq = seq
+        self.end_seq = seq
+        self.parts: List[str] = []
+        self.text = ""
+
+
+class TranscriptStore:
+    def __init__(self, capacity=2048, spill_capacity=50000):
+        if capacity <= 0:
+            raise ValueError("capacity debe ser mayor que 0")
+
+        self.capacity = capacity
+        self.spill_capacity = spill_capacity
+        self._lock = threading.Lock()
+
+        # Ring buffer: entradas y timestamps en arrays paralelos preasignados
+        self._entries: List[Optional[dict]] = [None] * capacity
+        self._timestamps = [0.0] * capacity
+        self._head = 0  # Índice físico de la entrada más antigua
+        self._size = 0
+        self._base_seq = 0  # Número de secuencia absoluto de la entrada más antigua
+
+        # Nivel de spill: entradas expulsadas del ring buffer; lleno, pierde las más antiguas
+        self._spill: deque = deque(maxlen=spill_capacity)
+        self.spill_dropped = 0
+
+        # Caches de ventanas recientes por duración en segundos
+        self._windows: Dict[float, _WindowCache] = {}
+
+    def __len__(self):
+        return len(self._spill) + self._size
+
+    @property
+    def next_seq(self) -> int:
+        """Número de secuencia que recibirá la próxima entrada"""
+        return self._base_seq + self._size
+
+    def append(self, entry: dict) -> int:
+        """Añadir entrada y devolver su número de secuencia"""
+        with self._lock:
+            timestamp = entry['timestamp']
+            # Mantener los timestamps monótonos para que la búsqueda binaria sea válida
+            if self._size and timestamp < self._timestamp_at(self._size - 1):
+                timestamp = self._timestamp_at(self._size - 1)
+
+            if self._size == self.capacity:
+                # Buffer lleno: mover la entrada más antigua al spill
+                if len(self._spill) == self.spill_capacity:
+                    self.spill_dropped += 1
+                self._spill.append(self._entries[self._head])
+                self._entries[self._head] = None
+                self._head = (self._head + 1) % self.capacity
+                self._size -= 1
+                self._base_seq += 1
+
+            index = (self._head + self._size) % self.capacity
+            self._entries[index] = entry
+            self._timestamps[index] = timestamp
+            self._size += 1
+            return self._base_seq + self._size - 1
+
+    def _timestamp_at(self, logical: int) -> float:
+        return self._timestamps[(self._head + logical) % self.capacity]
+
+    def _entry_at(self, logical: int) -> dict:
+        return self._entries[(self._head + logical) % self.capacity]
+
+    def _bisect_left(self, timestamp: float) -> int:
+        """Primer índice lógico con timestamp >= timestamp (O(log n))"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamp_at(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _bisect_right(self, timestamp: float) -> int:
+        """Primer índice lógico con timestamp > timestamp (O(log n))"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamp_at(mid) <= timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, start: float, end: float) -> List[dict]:
+        """Obtener entradas del ring buffer con start <= timestamp <= end"""
+        with self._lock:
+            first = self._bisect_left(start)
+            last = self._bisect_right(end)
+            return [self._entry_at(i) for i in range(first, last)]
+
+    def since(self, seq: int) -> List[dict]:
+        """Obtener entradas con número de secuencia >= seq"""
+        with self._lock:
+            if seq < self._base_seq:
+                # Lo que ya salió también del spill no se puede devolver
+                count = min(self._base_seq - seq, len(self._spill))
+                spilled = list(islice(self._spill, len(self._spill) - count, None))
+                first = 0
+            else:
+                spilled = []
+                first = seq - self._base_seq
+            return spilled + [self._entry_at(i) for i in range(first, self._size)]
+
+    def recent_text(self, seconds: float, now: float) -> str:
+        """Obtener el texto de los últimos N segundos desde la cache incremental"""
+        with self._lock:
+            cache = self._windows.get(seconds)
+            if cache is None:
+                cache = self._windows[seconds] = _WindowCache(self._base_seq)
+
+            start_seq = self._base_seq + self._bisect_left(now - seconds)
+            end_seq = self._base_seq + self._size
+            changed = False
+
+            # Descartar por la izquierda las entradas que salieron de la ventana
+            if start_seq > cache.start_seq:
+                drop = min(start_seq, cache.end_seq) - cache.start_seq
+                if drop > 0:
+                    del cache.parts[:drop]
+                    changed = True
+                cache.start_seq = start_seq
+                cache.end_seq = max(cache.end_seq, start_seq)
+
+            # Añadir por la derecha solo las entradas nuevas
+            if end_seq > cache.end_seq:
+                cache.parts.extend(
+                    self._entry_at(seq - self._base_seq)['text']
+                    for seq in range(cache.end_seq, end_seq)
+                )
+                cache.end_seq = end_seq
+                changed = True
+
+            if changed:
+                cache.text = " ".join(cache.parts)
+            return cache.text
+
+    def to_list(self) -> List[dict]:
+        """Obtener todas las entradas (spill + ring buffer) en orden"""
+        with self._lock:
+            return list(self._spill) + [self._entry_at(i) for i in range(self._size)]
+
+    def clear(self):
+        """Vaciar el almacén"""
+        with self._lock:
+            self._entries = [None] * self.capacity
+            self._timestamps = [0.0] * self.capacity
+            self._base_seq += self._size
+            self._head = 0
+            self._size = 0
+            self._spill.clear()
+            self._windows.clear()